@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Arecibo Message analysis pipeline.
+Runs the analysis steps in a single process over one shared loaded grid
+(and one memoized factorization) instead of launching a new interpreter
+per step.
+
+Usage:
+    python3 -m arecibo run                  # steps 1-6
+    python3 -m arecibo run --steps 2,4 --color
+    python3 -m arecibo run --steps 2 --render braille
+    python3 -m arecibo run --steps 1-6,complete --auto --pause-time 3
+    python3 -m arecibo run --page           # pause at every screenful
+    python3 -m arecibo run --profile        # per-stage timings + Chrome trace
+    python3 -m arecibo run -f noisy.txt --denoise majority --slip 2
+    python3 -m arecibo run --refresh-cache  # recompute cached step outputs
+    python3 -m arecibo cache clear
+    python3 -m arecibo batch captures/ --workers 8 -o results.jsonl
+    python3 -m arecibo convert arecibo-message.txt arecibo-message.arcb
+    python3 -m arecibo export arecibo-message.txt message.png --scale 8 --color --boxes
+    python3 -m arecibo merge capture1.txt capture2.txt capture3.txt -o consensus.arcb
+    python3 -m arecibo stream tcp:127.0.0.1:7700   # decode bits as they arrive
+    python3 -m arecibo record demo.cast --color   # paced recording, no real-time pauses
+    python3 -m arecibo bench --sizes 1e3,1e6 -o bench.json --compare baseline.json
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+
+import bitfile
+import cache
+import decode_analysis
+import denoise
+import pager
+import profiling
+import step1_analyze_structure
+import step2_visualize_patterns
+import step3_identify_sections
+import step4_find_human_figure
+import step5_decode_numbers
+import step6_decode_atomic_numbers
+import grid as grid_module
+from grid import MESSAGE_FILE, load_grid
+from render import MODES
+
+# Colors for output (same as run_analysis.sh)
+GREEN = '\033[0;32m'
+BLUE = '\033[0;34m'
+YELLOW = '\033[1;33m'
+NC = '\033[0m'  # No Color
+
+# Step id -> (module, description, accepts color flag, accepts render mode)
+STEPS = {
+    '1': (step1_analyze_structure, "Analyze Structure - Determine Grid Dimensions", False, False),
+    '2': (step2_visualize_patterns, "Visualize Patterns - Display Bitmap", True, True),
+    '3': (step3_identify_sections, "Identify Sections - Bit Density Analysis", False, False),
+    '4': (step4_find_human_figure, "Find Human Figure - Pattern Recognition", True, False),
+    '5': (step5_decode_numbers, "Decode Numbers - Attempt Number Decoding", False, False),
+    '6': (step6_decode_atomic_numbers, "Decode Atomic Numbers - Attempt Element Decoding", False, False),
+    'complete': (decode_analysis, "Complete Analysis - All Steps Combined", True, False),
+}
+
+# Subcommands implemented by their own module: name -> (module, help). The
+# module (and what it imports, e.g. asyncio or multiprocessing) is loaded
+# only when its subcommand runs; it provides add_<name>_arguments and
+# run_<name> (batch and export are run by run_batch_command and the export
+# branch of main).
+COMMANDS = {
+    'batch': ('batch', "Decode many message files on a process pool"),
+    'export': ('export', "Write the bitmap as PBM, PGM, PPM, PNG or SVG"),
+    'merge': ('merge', "Merge repeated captures into a consensus by aligned voting"),
+    'stream': ('stream', "Decode a message live from a socket, FIFO or stdin"),
+    'record': ('record', "Write a paced asciinema recording offline, on a virtual clock"),
+    'view': ('viewer', "Browse a large message in an interactive pan/zoom viewer"),
+    'bench': ('bench', "Time every stage on synthetic messages"),
+}
+
+
+def parse_steps(spec):
+    """Parse a step list such as '1-6', '2,4' or '1-3,complete' into step ids."""
+    steps = []
+    for part in spec.split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        if part in ('c', 'complete'):
+            steps.append('complete')
+        elif '-' in part:
+            start, _, end = part.partition('-')
+            if not (start.isdigit() and end.isdigit()) or int(start) > int(end):
+                raise ValueError(f"Invalid step range: {part}")
+            steps.extend(str(i) for i in range(int(start), int(end) + 1))
+        else:
+            steps.append(part)
+    unknown = [s for s in steps if s not in STEPS]
+    if unknown:
+        raise ValueError(f"Unknown step(s): {', '.join(unknown)}")
+    return steps
+
+
+def pause(auto_mode, pause_time, screen=None, sleep=time.sleep):
+    """
+    Pause between steps: timed in auto mode, wait for Enter otherwise.
+    With a pager (`screen`), the step after the pause starts a fresh page.
+    """
+    print("")
+    if auto_mode:
+        print(f"{YELLOW}Waiting {pause_time} seconds before next step...{NC}")
+        sys.stdout.flush()
+        sleep(pause_time)
+    else:
+        print(f"{YELLOW}Press Enter to continue to next step...{NC}")
+        sys.stdout.flush()
+        sys.stdin.readline()
+    if screen is not None:
+        screen.new_page()
+    print("")
+
+
+def run_step(step_id, grid, color_output=False, result_cache=None, content_hash=None, mode='full'):
+    """
+    Run one step with its banner; the grid is shared across steps.
+    With a cache, the step output is replayed when this message, step,
+    color setting and render mode were analysed before.
+    Returns True when the output was replayed from the cache.
+    """
+    module, description, accepts_color, accepts_mode = STEPS[step_id]
+    label = "Complete" if step_id == 'complete' else step_id
+    print(f"{GREEN}========================================{NC}")
+    print(f"{GREEN}STEP {label}: {description}{NC}")
+    print(f"{GREEN}========================================{NC}")
+    print("")
+
+    def compute():
+        if accepts_mode:
+            return module.run(grid, color_output, mode)
+        if accepts_color:
+            return module.run(grid, color_output)
+        return module.run(grid)
+
+    cached = False
+    if result_cache is None:
+        compute()
+    else:
+        key = result_cache.key(content_hash or cache.message_hash(grid), step_id,
+                               color=color_output and accepts_color,
+                               mode=mode if accepts_mode else 'full')
+        hits = result_cache.hits
+        result_cache.replay(key, compute)
+        cached = result_cache.hits > hits
+    print("")
+    print(f"{GREEN}✓ Step {label} completed successfully{NC}")
+    sys.stdout.flush()
+    return cached
+
+
+def run_pipeline(steps, path=MESSAGE_FILE, color_output=False, pause_mode='none', pause_time=3,
+                 spill_path=None, result_cache=None, mode='full', screen=None, profiler=None,
+                 filters=(), max_slip=0, sleep=time.sleep, verify=False):
+    """
+    Load the message once and run the given steps in order (paged when
+    given a pager, with every stage recorded when given a profiler).
+    With filters or a slip bound the grid is denoised before the first step.
+    Timed pauses call `sleep`. With verify, a packed file's CRC-32 is checked on load.
+    """
+    profiler = profiler or profiling.Profiler(enabled=False)
+    with profiler.instrumented(grid_module, 'get_dimensions', 'factorize', bits=lambda n: n):
+        with profiler.stage('load', path=path) as info:
+            grid = load_grid(path, spill_path, verify)
+            info['bits'] = len(grid)
+        if filters or max_slip:
+            with profiler.stage('denoise', bits=len(grid), filters=','.join(filters), slip=max_slip):
+                grid, report = denoise.denoise(grid, filters, max_slip)
+            if report is not None:
+                print(f"Re-aligned {len(report.slipped_rows)} of {report.rows} rows ({report.cols} columns)")
+        content_hash = None
+        if result_cache is not None and result_cache.enabled:
+            with profiler.stage('message hash', bits=len(grid)):
+                content_hash = cache.message_hash(grid)
+        for index, step_id in enumerate(steps):
+            if index > 0 and pause_mode != 'none':
+                with profiler.stage('pause'):
+                    pause(pause_mode == 'auto', pause_time, screen, sleep)
+            with profiler.stage(f"step {step_id}", bits=len(grid), cprofile=True) as info:
+                info['cached'] = run_step(step_id, grid, color_output, result_cache, content_hash, mode)
+    if screen is not None:
+        profiler.add_total('pager (writing)', screen.write_seconds)
+        profiler.add_total('pager (waiting)', screen.wait_seconds)
+    return grid
+
+
+def build_parser(command=None):
+    """
+    Build the command-line parser. Of the module subcommands (COMMANDS) only
+    `command`'s module is imported and its arguments added; the others are
+    listed by name and help.
+    """
+    parser = argparse.ArgumentParser(prog='arecibo', description="Arecibo Message analysis pipeline")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Run analysis steps in one process")
+    run_parser.add_argument('--steps', default='1-6',
+                            help="Steps to run, e.g. '1-6', '2,4', '1-6,complete' (default: 1-6)")
+    run_parser.add_argument('-f', '--file', default=MESSAGE_FILE,
+                            help=f"Message file (default: {MESSAGE_FILE})")
+    run_parser.add_argument('-c', '--color', action='store_true',
+                            help="Enable colored terminal output for visualizations")
+    run_parser.add_argument('--render', choices=MODES, default='full',
+                            help="Bitmap rendering: one character per bit, half blocks (2 rows "
+                                 "per line) or braille (2 × 4 bits per character) (default: full)")
+    run_parser.add_argument('--denoise', metavar='FILTERS', default='',
+                            help=f"Filter bit flips before the steps: comma-separated, from "
+                                 f"{', '.join(denoise.FILTERS)} (e.g. 'majority')")
+    run_parser.add_argument('--slip', type=int, default=0,
+                            help="Re-align rows shifted by up to this many slipped bits (default: 0)")
+    run_parser.add_argument('-a', '--auto', action='store_true',
+                            help="Pause between steps with a timed wait")
+    run_parser.add_argument('-t', '--pause-time', type=int, default=3,
+                            help="Pause time in seconds for auto mode (default: 3)")
+    run_parser.add_argument('-p', '--pause', action='store_true',
+                            help="Wait for Enter between steps")
+    run_parser.add_argument('--page', action='store_true',
+                            help="Page the output at terminal height (timed advance with --auto)")
+    run_parser.add_argument('--page-debug', action='store_true',
+                            help="Report page size and page breaks on stderr")
+    run_parser.add_argument('--profile', action='store_true',
+                            help="Record wall/CPU time, allocations and bits per stage; print a summary "
+                                 "and write a Chrome trace")
+    run_parser.add_argument('--profile-trace', metavar='FILE', default=profiling.DEFAULT_TRACE,
+                            help=f"Chrome trace-event output (default: {profiling.DEFAULT_TRACE})")
+    run_parser.add_argument('--profile-dir', metavar='DIR', default=None,
+                            help="Also run each step under cProfile and dump its statistics to DIR")
+    run_parser.add_argument('--spill', metavar='FILE', default=None,
+                            help="Pack bits into FILE and memory-map it (for captures larger than memory)")
+    run_parser.add_argument('--verify', action='store_true',
+                            help=f"Check the CRC-32 of a packed {bitfile.EXTENSION} message before running")
+    add_cache_arguments(run_parser)
+
+    cache_parser = subparsers.add_parser('cache', help="Inspect or clear the step output cache")
+    cache_parser.add_argument('action', choices=['info', 'clear'], help="Show cache usage or remove all entries")
+    cache_parser.add_argument('--cache-dir', default=None,
+                              help=f"Cache directory (default: {cache.default_directory()})")
+
+    convert_parser = subparsers.add_parser('convert', help=f"Convert a .txt message to packed {bitfile.EXTENSION}")
+    convert_parser.add_argument('input', help="Message file of '0'/'1' characters")
+    convert_parser.add_argument('output', help=f"Packed output file ({bitfile.EXTENSION})")
+    convert_parser.add_argument('--rows', type=int, default=None, help="Override the chosen rows")
+    convert_parser.add_argument('--cols', type=int, default=None, help="Override the chosen columns")
+
+    for name, (module_name, help_text) in COMMANDS.items():
+        command_parser = subparsers.add_parser(name, help=help_text)
+        if name == 'export':
+            command_parser.add_argument('input', help="Message file (.txt or .arcb)")
+        if name == command:
+            module = importlib.import_module(module_name)
+            getattr(module, f"add_{name}_arguments")(command_parser)
+    return parser
+
+
+def selected_command(argv):
+    """The subcommand named in `argv` (its first non-option argument), or None."""
+    return next((arg for arg in argv if not arg.startswith('-')), None)
+
+
+def add_cache_arguments(parser):
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Do not read or write cached step outputs")
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help="Recompute every step and overwrite its cached output")
+    parser.add_argument('--cache-dir', default=None,
+                        help=f"Cache directory (default: {cache.default_directory()})")
+    parser.add_argument('--cache-size', type=int, default=cache.MAX_BYTES >> 20,
+                        help=f"Cache size bound in MB (default: {cache.MAX_BYTES >> 20})")
+
+
+def cache_from_args(args):
+    """Build the step output cache selected by the command-line flags."""
+    return cache.ResultCache(args.cache_dir, args.cache_size << 20,
+                             enabled=not args.no_cache, refresh=args.refresh_cache)
+
+
+def run_cache_command(args):
+    """Show cache usage or clear it; returns the exit code."""
+    result_cache = cache.ResultCache(args.cache_dir)
+    if args.action == 'clear':
+        print(f"Removed {result_cache.clear()} cached step output(s) from {result_cache.directory}")
+    else:
+        entries = result_cache.entries()
+        total = sum(size for _, size, _ in entries)
+        print(f"{result_cache.directory}: {len(entries)} entries, {total / 1024:.1f} KB "
+              f"(limit {result_cache.max_bytes >> 20} MB)")
+    return 0
+
+
+def run_batch_command(args):
+    """Decode every input file and write JSON lines; returns the exit code."""
+    import batch
+
+    paths = batch.expand_inputs(args.inputs, args.pattern)
+    if not paths:
+        print(f"{YELLOW}Error: no message files found{NC}", file=sys.stderr)
+        return 1
+    workers = args.workers or os.cpu_count()
+    if args.output == '-':
+        ok, errors = batch.run_batch(paths, sys.stdout, workers, args.chunksize)
+    else:
+        with open(args.output, 'w') as output:
+            ok, errors = batch.run_batch(paths, output, workers, args.chunksize)
+    print(f"Decoded {ok} file(s), {errors} error(s)", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser(selected_command(argv))
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        try:
+            steps = parse_steps(args.steps)
+            filters = denoise.parse_filters(args.denoise)
+        except ValueError as e:
+            parser.error(str(e))
+        pause_mode = 'auto' if args.auto else 'prompt' if args.pause else 'none'
+        profiler = profiling.Profiler(enabled=args.profile or bool(args.profile_dir),
+                                      cprofile_dir=args.profile_dir)
+        try:
+            if args.page:
+                with pager.paged(args.auto, args.pause_time, args.page_debug) as screen:
+                    run_pipeline(steps, args.file, args.color, pause_mode, args.pause_time, args.spill,
+                                 cache_from_args(args), args.render, screen, profiler, filters, args.slip,
+                                 verify=args.verify)
+                    profiler.report(args.profile_trace)
+            else:
+                run_pipeline(steps, args.file, args.color, pause_mode, args.pause_time, args.spill,
+                             cache_from_args(args), args.render, profiler=profiler, filters=filters,
+                             max_slip=args.slip, verify=args.verify)
+                profiler.report(args.profile_trace)
+        except (OSError, ValueError) as e:  # unreadable or corrupted message file
+            print(f"{YELLOW}Error: {e}{NC}", file=sys.stderr)
+            return 1
+        finally:
+            profiler.stop()
+    elif args.command == 'cache':
+        return run_cache_command(args)
+    elif args.command == 'batch':
+        return run_batch_command(args)
+    elif args.command == 'export':
+        import export
+
+        try:
+            grid = load_grid(args.input)
+        except (OSError, ValueError) as e:
+            print(f"{YELLOW}Error: {e}{NC}", file=sys.stderr)
+            return 1
+        return export.run_export(grid, args)
+    elif args.command in COMMANDS:
+        module = importlib.import_module(COMMANDS[args.command][0])
+        return getattr(module, f"run_{args.command}")(args)
+    elif args.command == 'convert':
+        try:
+            grid = load_grid(args.input, verify=True)
+        except (OSError, ValueError) as e:
+            print(f"{YELLOW}Error: {e}{NC}", file=sys.stderr)
+            return 1
+        if args.rows or args.cols:
+            cols = args.cols or len(grid) // args.rows
+            rows = args.rows or len(grid) // cols
+            if rows * cols != len(grid):
+                parser.error(f"{rows}×{cols} does not match message length {len(grid)}")
+            grid = grid.with_shape(rows, cols)
+        header = bitfile.write_grid(grid, args.output)
+        print(f"Wrote {args.output}: {header.rows} rows × {header.cols} columns, "
+              f"{header.length} bits, CRC-32 {header.checksum:08x}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Content-aware grid width detection.
+Scores every candidate row width at once from the FFT autocorrelation of
+the bitstream (O(n log n)). When the stream is cut into rows of the right
+width, bits line up vertically, so the autocorrelation peaks at that lag -
+even for noisy or padded streams whose length is not an exact product.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from get_dimensions import divisors
+from grid import BitGrid
+
+# Need at least this many rows before a width can show vertical structure
+MIN_ROWS = 4
+
+# A divisor of a strong width is preferred when it scores at least this
+# fraction as well (multiples of the true width line up as strongly)
+FUNDAMENTAL_TOLERANCE = 0.9
+
+# Number of top-scoring widths examined per requested result
+POOL_FACTOR = 4
+
+WidthScore = namedtuple('WidthScore', ['width', 'score', 'rows', 'remainder'])
+
+
+def _as_signal(bits):
+    """Return the stream as a mean-centred float array."""
+    if isinstance(bits, BitGrid):
+        bits = bits.span(0, len(bits))
+    signal = np.asarray(bits, dtype=np.float64).reshape(-1)
+    return signal - signal.mean()
+
+
+def autocorrelation(bits):
+    """
+    Normalized autocorrelation of a bitstream for every lag 0..n-1.
+    Each lag is divided by its number of overlapping bits so long lags are
+    not penalized, then scaled so lag 0 is 1.0.
+    """
+    signal = _as_signal(bits)
+    n = signal.size
+    if n == 0:
+        return np.zeros(0)
+    size = 1 << (2 * n - 1).bit_length()
+    spectrum = np.fft.rfft(signal, size)
+    ac = np.fft.irfft(spectrum * np.conj(spectrum), size)[:n]
+    ac /= n - np.arange(n)
+    if ac[0] > 0:
+        ac /= ac[0]
+    return ac
+
+
+def score_widths(ac, min_width=2, max_width=None, harmonics=3):
+    """
+    Score every width in [min_width, max_width] by averaging the
+    autocorrelation at the width and its first few multiples, which
+    suppresses isolated noise peaks at long lags.
+    """
+    n = ac.size
+    if max_width is None:
+        max_width = n // MIN_ROWS
+    max_width = min(max_width, n - 1)
+    widths = np.arange(min_width, max_width + 1)
+    if widths.size == 0:
+        return widths, np.zeros(0)
+    total = np.zeros(widths.size)
+    used = np.zeros(widths.size)
+    for k in range(1, harmonics + 1):
+        lags = widths * k
+        valid = lags < n
+        total[valid] += ac[lags[valid]]
+        used[valid] += 1
+    return widths, total / np.maximum(used, 1)
+
+
+def detect_widths(bits, min_width=MIN_ROWS, max_width=None, top=10, harmonics=3, ac=None):
+    """
+    Return up to `top` row widths where vertical structure lines up best,
+    best first, as WidthScore(width, score, rows, remainder). Widths need not
+    divide the stream length; `remainder` is the number of leftover bits.
+    `ac` may pass in the stream's autocorrelation when it is already known.
+    """
+    if ac is None:
+        ac = autocorrelation(bits)
+    n = ac.size
+    widths, scores = score_widths(ac, min_width, max_width, harmonics)
+    if widths.size == 0:
+        return []
+    pool = min(top * POOL_FACTOR, widths.size)
+    best = np.argpartition(-scores, pool - 1)[:pool]
+    best = best[np.lexsort((widths[best], -scores[best]))]
+
+    # Every multiple of the true width lines up too; fold each strong width
+    # onto its smallest divisor that scores nearly as well
+    results = []
+    seen = set()
+    for i in best:
+        width = int(widths[i])
+        for d in divisors(width):
+            j = d - min_width
+            if 0 <= j < widths.size and scores[i] > 0 and scores[j] >= scores[i] * FUNDAMENTAL_TOLERANCE:
+                width = d
+                break
+        if width in seen:
+            continue
+        seen.add(width)
+        j = width - min_width
+        results.append(WidthScore(width, float(scores[j]), n // width, n % width))
+    results.sort(key=lambda r: (-r.score, r.width))
+    return results[:top]
+
+
+if __name__ == "__main__":
+    grid = BitGrid.load()
+    print(f"Autocorrelation width estimates for {len(grid)} bits:")
+    for estimate in detect_widths(grid, top=5):
+        print(f"  width {estimate.width:5d}: score {estimate.score:.3f} "
+              f"({estimate.rows} rows, {estimate.remainder} leftover bits)")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Batch decoding of many message files.
+Each file goes through the dimension, section, component, number and
+atomic-number stages on a process pool and produces one JSON-lines
+record. Records are written in input order; a file that fails to parse is
+recorded as an error without aborting the rest of the run.
+"""
+
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from autocorrelation import detect_widths
+from components import find_components, find_figure
+from get_dimensions import get_dimensions
+from grid import load_grid
+from sections import find_layout
+from step3_identify_sections import find_density_sections
+from step5_decode_numbers import decode_numbers
+from step6_decode_atomic_numbers import decode_atomic_numbers
+
+DEFAULT_PATTERN = '*.txt'
+
+
+def expand_inputs(inputs, pattern=DEFAULT_PATTERN):
+    """Expand directories and glob patterns into a sorted, de-duplicated file list."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, pattern))
+        else:
+            matches = glob.glob(item) or [item]
+        paths.extend(sorted(p for p in matches if not os.path.isdir(p)))
+    seen = set()
+    return [p for p in paths if not (p in seen or seen.add(p))]
+
+
+def decode_grid(grid, shape=None):
+    """
+    Run the decoding stages on a loaded grid and return a JSON-ready record.
+    The grid is arranged as `shape` (rows, cols), or by factorization if not given.
+    """
+    if len(grid) == 0:
+        raise ValueError("empty message")
+    if not grid.is_binary:
+        raise ValueError("message is not a 0/1 bitstream")
+    rows, cols = shape or get_dimensions(len(grid))
+    grid = grid.with_shape(rows, cols)
+    layout = find_layout(grid)
+    dense, sparse = find_density_sections(layout.row_counts)
+    _, components = find_components(grid)
+    figure = find_figure(components)
+    return {
+        'bits': len(grid),
+        'ones': grid.ones,
+        'rows': rows,
+        'cols': cols,
+        'width_estimates': [w._asdict() for w in detect_widths(grid, top=3)],
+        'sections': {
+            'dense': dense,
+            'sparse': sparse,
+            'separators': layout.separators,
+            'bars': layout.bars,
+            'header': layout.header,
+            'footer': layout.footer,
+            'blocks': [b._asdict() for b in layout.blocks],
+        },
+        'components': len(components),
+        'figure': figure._asdict() if figure is not None else None,
+        'numbers': decode_numbers(grid),
+        'atomic_numbers': decode_atomic_numbers(grid),
+    }
+
+
+def decode_file(path):
+    """Decode one file; errors are returned in the record instead of raised."""
+    try:
+        grid = load_grid(path, verify=True)  # packed .arcb files keep the shape from their header
+        record = decode_grid(grid, grid.shape)
+        return {'file': path, 'status': 'ok', **record}
+    except Exception as e:  # one bad capture must not abort the batch
+        return {'file': path, 'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+
+
+def add_batch_arguments(parser):
+    parser.add_argument('inputs', nargs='+', help="Message files, directories or glob patterns")
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN,
+                        help=f"File pattern used inside directories (default: {DEFAULT_PATTERN})")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Worker processes (default: CPU count; 1 runs in-process)")
+    parser.add_argument('--chunksize', type=int, default=1,
+                        help="Files handed to a worker at a time (default: 1)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="JSON-lines output file (default: stdout)")
+
+
+def run_batch(paths, output=sys.stdout, workers=None, chunksize=1):
+    """
+    Decode every path and write one JSON line per file, in input order.
+    Returns (ok_count, error_count).
+    """
+    ok = errors = 0
+    if workers == 1:
+        results = map(decode_file, paths)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(decode_file, paths, chunksize=max(1, chunksize))
+    try:
+        for record in results:
+            output.write(json.dumps(record) + '\n')
+            if record['status'] == 'ok':
+                ok += 1
+            else:
+                errors += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    output.flush()
+    return ok, errors
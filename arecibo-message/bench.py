@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the analysis stages.
+Generates synthetic messages - the Arecibo layout scaled up, random noise,
+and prime and semiprime lengths - from 10^3 up to 10^9 bits, writes each to
+disk, and times every stage on it (load, get_dimensions, denoise, render,
+density/sections, figure search, number and atomic-number decoding). Each
+stage is timed over a few runs (best run reported) and run once more under
+tracemalloc for its peak memory. Results are written to JSON, and a
+previous results file can be compared to flag regressions.
+
+Usage:
+    python3 bench.py                                   # 10^3 - 10^6 bits
+    python3 bench.py --sizes 1e3,1e5,1e7 --kinds noise,arecibo -o bench.json
+    python3 bench.py --compare baseline.json           # exit 1 on regressions
+    python3 -m arecibo bench --max-bits 1e9
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+
+import numpy as np
+
+import bitfile
+import get_dimensions as dimensions
+from components import find_components, find_figure
+from denoise import filter_grid
+from grid import MESSAGE_FILE, BitGrid, load_grid
+from render import render_full
+from sections import find_layout
+from step5_decode_numbers import decode_numbers
+from step6_decode_atomic_numbers import decode_atomic_numbers
+
+KINDS = ('arecibo', 'noise', 'prime', 'semiprime')
+DEFAULT_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+
+# Messages up to this size are written as '0'/'1' text, larger ones as packed .arcb
+TEXT_MAX_BITS = 10 ** 8
+
+# Bits generated per block, so the unpacked message is never resident as a whole
+BLOCK_BITS = 1 << 24
+
+# Runs per stage; the best is reported
+REPEAT = 3
+
+# A stage slower than the baseline by more than this share is a regression
+THRESHOLD = 0.25
+
+# Stages whose timings are this short are too noisy to flag
+MIN_SECONDS = 1e-3
+
+Stage = namedtuple('Stage', ['name', 'function', 'max_bits'])
+Result = namedtuple('Result', ['kind', 'bits', 'rows', 'cols', 'stage', 'seconds', 'runs',
+                               'peak_bytes', 'skipped'])
+
+
+# -- synthetic messages -------------------------------------------------------
+
+def _pack_blocks(blocks, length):
+    """Pack 0/1 blocks (each a multiple of 8 bits except the last) into one flat grid."""
+    packed = np.concatenate([np.packbits(block.reshape(-1)) for block in blocks] or [np.zeros(0, np.uint8)])
+    return BitGrid(packed, length)
+
+
+def _noise_blocks(length, rng, density):
+    step = BLOCK_BITS
+    for start in range(0, length, step):
+        yield (rng.random(min(step, length - start)) < density).astype(np.uint8)
+
+
+def noise(length, seed=0, density=0.5):
+    """Random bits with the given share of ones."""
+    rng = np.random.default_rng(seed)
+    return _pack_blocks(_noise_blocks(length, rng, density), length)
+
+
+def arecibo(length, source=MESSAGE_FILE):
+    """
+    The Arecibo message scaled up: every bit becomes a factor × factor
+    square, with factor chosen so the result has about `length` bits.
+    """
+    bits = load_grid(source).to_array()
+    factor = max(1, round((length / bits.size) ** 0.5))
+    rows = bits.repeat(factor, axis=1)
+    # Source rows per block, so every block holds a whole number of bytes
+    per_block = max(8, BLOCK_BITS // (rows.shape[1] * factor) // 8 * 8)
+    blocks = (rows[i:i + per_block].repeat(factor, axis=0) for i in range(0, bits.shape[0], per_block))
+    return _pack_blocks(blocks, bits.size * factor * factor)
+
+
+def next_prime(n):
+    """Smallest prime >= n."""
+    n = max(2, n)
+    while not dimensions.is_prime(n):
+        n += 1
+    return n
+
+
+def prime(length, seed=0):
+    """Noise whose length is the next prime: only 1×N shapes exist."""
+    return noise(next_prime(length), seed)
+
+
+def semiprime(length, seed=0):
+    """Noise whose length is p × q with p ≈ 3q (like 73 × 23), near `length` bits."""
+    q = next_prime(max(2, round((length / 3) ** 0.5)))
+    p = next_prime(max(q + 1, length // q))
+    return noise(p * q, seed)
+
+
+GENERATORS = {'arecibo': arecibo, 'noise': noise, 'prime': prime, 'semiprime': semiprime}
+
+
+def write_message(grid, directory, name):
+    """Write a generated message as text (or .arcb when large); returns the path."""
+    if len(grid) > TEXT_MAX_BITS:
+        path = os.path.join(directory, name + bitfile.EXTENSION)
+        bitfile.write_grid(grid.with_shape(*dimensions.get_dimensions(len(grid))), path)
+        return path
+    path = os.path.join(directory, name + '.txt')
+    with open(path, 'wb') as f:
+        for start in range(0, len(grid), BLOCK_BITS):
+            f.write((grid.span(start, min(len(grid), start + BLOCK_BITS)) + ord('0')).tobytes())
+        f.write(b'\n')
+    return path
+
+
+# -- stages -------------------------------------------------------------------
+
+def _clear_caches():
+    """Forget memoized factorizations, so every run measures the full work."""
+    dimensions.factorize.cache_clear()
+    dimensions.candidate_dimensions.cache_clear()
+
+
+def _load(case):
+    _clear_caches()
+    return load_grid(case['path'])
+
+
+def _dimensions(case):
+    _clear_caches()
+    return dimensions.get_dimensions(len(case['grid']))
+
+
+def _figure(case):
+    return find_figure(find_components(case['grid'])[1])
+
+
+STAGES = [
+    Stage('load', _load, None),
+    Stage('get_dimensions', _dimensions, None),
+    Stage('denoise', lambda case: filter_grid(case['grid']), 10 ** 8),
+    Stage('render', lambda case: render_full(case['grid']), 10 ** 8),
+    Stage('sections', lambda case: find_layout(case['grid']), None),
+    Stage('figure', _figure, 10 ** 8),
+    Stage('numbers', lambda case: decode_numbers(case['grid']), 10 ** 6),
+    Stage('atomic_numbers', lambda case: decode_atomic_numbers(case['grid']), 10 ** 5),
+]
+
+
+def measure(function, case, repeat=REPEAT, memory=True):
+    """(best seconds, peak traced bytes) of `function(case)`."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(case)
+        best = min(best, time.perf_counter() - started)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            function(case)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def run_case(kind, size, directory, stages=STAGES, repeat=REPEAT, memory=True, seed=0, report=None):
+    """Generate one message, write it and time every stage on it; returns Results."""
+    generated = GENERATORS[kind](size) if kind == 'arecibo' else GENERATORS[kind](size, seed)
+    path = write_message(generated, directory, f"{kind}-{size}")
+    case = {'path': path}
+    case['grid'] = _load(case)
+    rows, cols = case['grid'].shape
+    results = []
+    for stage in stages:
+        if stage.max_bits is not None and len(generated) > stage.max_bits:
+            result = Result(kind, len(generated), rows, cols, stage.name, None, 0, None, True)
+        else:
+            seconds, peak = measure(stage.function, case, repeat, memory)
+            result = Result(kind, len(generated), rows, cols, stage.name, seconds, repeat, peak, False)
+        results.append(result)
+        if report:
+            report(result)
+    os.remove(path)
+    return results
+
+
+# -- results ------------------------------------------------------------------
+
+def revision():
+    """Short git revision of the working tree, or None outside a checkout."""
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment():
+    return {
+        'revision': revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def max_rss_bytes():
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def compare(results, baseline, threshold=THRESHOLD, min_seconds=MIN_SECONDS):
+    """
+    Stages slower than in `baseline` (a loaded results file) by more than
+    `threshold`. Returns (kind, bits, stage, old seconds, new seconds) tuples.
+    """
+    old = {(r['kind'], r['bits'], r['stage']): r['seconds'] for r in baseline['results'] if not r['skipped']}
+    regressions = []
+    for r in results:
+        before = old.get((r.kind, r.bits, r.stage))
+        if r.skipped or before is None or max(before, r.seconds) < min_seconds:
+            continue
+        if r.seconds > before * (1 + threshold):
+            regressions.append((r.kind, r.bits, r.stage, before, r.seconds))
+    return regressions
+
+
+def parse_sizes(spec):
+    """Parse sizes such as '1e3,1e6,5000' into bit counts."""
+    return [int(float(part)) for part in spec.split(',') if part.strip()]
+
+
+def print_result(r):
+    if r.skipped:
+        print(f"  {r.kind:9s} {r.bits:>12,d} {r.stage:15s}  skipped")
+        return
+    memory = f"{r.peak_bytes / 2 ** 20:10.1f} MB" if r.peak_bytes is not None else ""
+    print(f"  {r.kind:9s} {r.bits:>12,d} {r.stage:15s} {r.seconds * 1000:12.3f} ms{memory}")
+    sys.stdout.flush()
+
+
+def add_bench_arguments(parser):
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help="Message sizes in bits, e.g. '1e3,1e6' (default: 10^3 - 10^6)")
+    parser.add_argument('--max-bits', default=None,
+                        help="Add every power of ten above the sizes up to this many bits, e.g. 1e9")
+    parser.add_argument('--kinds', default=','.join(KINDS), help=f"Generators (default: {','.join(KINDS)})")
+    parser.add_argument('--stages', default=None, help="Stages to time (default: all)")
+    parser.add_argument('-r', '--repeat', type=int, default=REPEAT, help=f"Runs per stage (default: {REPEAT})")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc peak-memory run")
+    parser.add_argument('-o', '--output', default=None, help="Write results to this JSON file")
+    parser.add_argument('--compare', metavar='JSON', default=None,
+                        help="Baseline results; exit 1 if a stage got slower by more than --threshold")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help=f"Allowed slowdown as a fraction (default: {THRESHOLD})")
+    parser.add_argument('--workdir', default=None, help="Directory for generated messages (default: a temp dir)")
+
+
+def run_bench(args):
+    """Run the benchmark for parsed command-line arguments; returns the exit code."""
+    sizes = parse_sizes(args.sizes)
+    if args.max_bits:
+        limit = int(float(args.max_bits))
+        power = 10 ** len(str(max(sizes or [1])))
+        while power <= limit:
+            sizes.append(power)
+            power *= 10
+    kinds = [k.strip() for k in args.kinds.split(',') if k.strip()]
+    unknown = [k for k in kinds if k not in GENERATORS]
+    if unknown:
+        print(f"Error: unknown kind(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    stages = STAGES
+    if args.stages:
+        names = [s.strip() for s in args.stages.split(',')]
+        stages = [s for s in STAGES if s.name in names]
+
+    print(f"Benchmarking {len(kinds)} generator(s) × {len(sizes)} size(s), best of {args.repeat} run(s)")
+    results = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as directory:
+        for size in sorted(set(sizes)):
+            for kind in kinds:
+                results.extend(run_case(kind, size, directory, stages, args.repeat, not args.no_memory,
+                                        report=print_result))
+
+    if args.output:
+        document = {'environment': environment(), 'max_rss_bytes': max_rss_bytes(),
+                    'results': [r._asdict() for r in results]}
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=1)
+        print(f"Wrote {len(results)} result(s) to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        base_rev = baseline.get('environment', {}).get('revision')
+        print(f"\nCompared with {args.compare} (revision {base_rev}): {len(regressions)} regression(s)")
+        for kind, bits, stage, before, after in regressions:
+            print(f"  {kind} {bits:,d} {stage}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms "
+                  f"({after / before - 1:+.0%})")
+        if regressions:
+            return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis stages on synthetic messages")
+    add_bench_arguments(parser)
+    return run_bench(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
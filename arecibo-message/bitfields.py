@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Exhaustive bit-field decoder search.
+Enumerates every reading of a bit grid - direction (along rows or down
+columns) × bit order × field width × position × run of consecutive
+fields - decodes all fields of one width at once as a dot product with
+powers of two, and ranks the readings by how well their values match a
+target vocabulary (e.g. the atomic numbers {1, 6, 7, 8, 15}).
+
+Two layouts are searched:
+  stacked - one field per line at a fixed offset, over consecutive lines
+            (e.g. the first 5 bits of rows 0-9)
+  chained - consecutive fields along a single line
+            (e.g. row 11 split into 4-bit groups)
+"""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from sections import top_k
+
+DIRECTIONS = ('row', 'column')
+ORDERS = ('msb', 'lsb')
+LAYOUTS = ('stacked', 'chained')
+
+DEFAULT_WIDTHS = range(2, 13)
+MIN_COUNT = 3
+MAX_COUNT = 16
+
+# Values that neither count for nor against a reading (blank spacer fields)
+NEUTRAL = (0,)
+
+# Upper bound on hits/misses per reading; used to fold the ranking into one sort key
+MAX_SCORE = 1 << 20
+
+# Hypotheses kept from each (direction, order, width, layout, count) slice
+KEEP_PER_SLICE = 64
+
+# Region is inclusive: rows row_start..row_end, columns col_start..col_end
+Hypothesis = namedtuple('Hypothesis', ['direction', 'order', 'layout', 'width',
+                                       'row_start', 'row_end', 'col_start', 'col_end',
+                                       'values', 'hits', 'distinct', 'score'])
+SearchResult = namedtuple('SearchResult', ['hypotheses', 'searched', 'seconds'])
+
+
+def field_values(bits, width, order='msb'):
+    """
+    Decode every `width`-bit window of every row at once.
+    Returns a (rows, cols - width + 1) int64 array; entry [i, j] reads
+    row i, columns j..j+width-1 (left bit most significant for 'msb').
+    """
+    powers = 1 << np.arange(width - 1, -1, -1, dtype=np.int64)
+    if order == 'lsb':
+        powers = powers[::-1]
+    windows = sliding_window_view(np.asarray(bits, dtype=np.uint8), width, axis=1)
+    return windows @ powers
+
+
+def _sequences(values, width, layout):
+    """
+    Arrange field values into sequences searched for runs, padded with -1.
+    Returns (sequences, meta) where meta[k] = (line, first offset, offset step,
+    line step) locates element t of sequence k at (line + t*line step,
+    first offset + t*offset step).
+    """
+    lines, offsets = values.shape
+    if layout == 'stacked':
+        meta = [(0, p, 0, 1) for p in range(offsets)]
+        return values.T, meta
+    length = -(-offsets // width)
+    sequences = np.full((lines * width, length), -1, dtype=np.int64)
+    meta = []
+    for phase in range(min(width, offsets)):
+        chain = values[:, phase::width]
+        sequences[phase * lines:(phase + 1) * lines, :chain.shape[1]] = chain
+        meta.extend((line, phase, width, 0) for line in range(lines))
+    return sequences[:len(meta)], meta
+
+
+def _prefix(mask):
+    """Row-wise prefix sums with a leading zero column."""
+    counts = np.zeros((mask.shape[0], mask.shape[1] + 1), dtype=np.int64)
+    np.cumsum(mask, axis=1, out=counts[:, 1:])
+    return counts
+
+
+def search(bits, vocabulary, widths=DEFAULT_WIDTHS, directions=DIRECTIONS, orders=ORDERS,
+           layouts=LAYOUTS, min_count=MIN_COUNT, max_count=MAX_COUNT, neutral=NEUTRAL, top=10,
+           origin=(0, 0)):
+    """
+    Rank every reading of `bits` against `vocabulary`.
+    Readings rank by the number of distinct vocabulary values they cover,
+    then by fewest values outside the vocabulary, then by most values in
+    it (values in `neutral` count as neither); the reported score is hits
+    minus misses. Regions are given in grid coordinates, with bits[0, 0]
+    at `origin`. Returns a SearchResult with the `top` hypotheses, the
+    number of hypotheses scored and the elapsed time.
+    """
+    started = time.perf_counter()
+    bits = np.asarray(bits, dtype=np.uint8)
+    vocab = np.array(sorted(vocabulary), dtype=np.int64)
+    neutral = np.array([v for v in neutral if v not in set(vocab.tolist())], dtype=np.int64)
+    score_base = MAX_SCORE + 1
+    searched = 0
+    candidates = []
+
+    for direction in directions:
+        grid = bits if direction == 'row' else bits.T
+        for order in orders:
+            for width in widths:
+                if width > grid.shape[1] or grid.shape[0] == 0:
+                    continue
+                values = field_values(grid, width, order)
+                for layout in layouts:
+                    sequences, meta = _sequences(values, width, layout)
+                    valid = sequences >= 0
+                    hit_counts = _prefix(np.isin(sequences, vocab))
+                    neutral_counts = _prefix(np.isin(sequences, neutral))
+                    invalid_counts = _prefix(~valid)
+                    value_counts = [_prefix(sequences == v) for v in vocab.tolist()]
+                    length = sequences.shape[1]
+                    for count in range(min_count, min(max_count, MAX_SCORE, length) + 1):
+                        hits = hit_counts[:, count:] - hit_counts[:, :-count]
+                        misses = count - hits - (neutral_counts[:, count:] - neutral_counts[:, :-count])
+                        ok = (invalid_counts[:, count:] - invalid_counts[:, :-count]) == 0
+                        distinct = sum(((c[:, count:] - c[:, :-count]) > 0).astype(np.int64)
+                                       for c in value_counts)
+                        keys = (distinct * score_base + (MAX_SCORE - misses)) * score_base + hits
+                        keys = np.where(ok, keys, np.iinfo(np.int64).min)
+                        searched += int(ok.sum())
+                        for flat, key in top_k(keys.reshape(-1), KEEP_PER_SLICE):
+                            if key == np.iinfo(np.int64).min:
+                                continue
+                            k, start = divmod(flat, keys.shape[1])
+                            candidates.append((key, direction, order, layout, width, count,
+                                               meta[k], start, sequences[k, start:start + count]))
+
+    candidates.sort(key=lambda c: -c[0])  # stable: keeps search order among ties
+    hypotheses = []
+    for key, direction, order, layout, width, count, meta, start, decoded in candidates[:top]:
+        line, offset, offset_step, line_step = meta
+        first_line = line + start * line_step
+        last_line = first_line + (count - 1) * line_step
+        first_bit = offset + start * offset_step
+        last_bit = first_bit + (count - 1) * offset_step + width - 1
+        if direction == 'row':
+            region = (first_line, last_line, first_bit, last_bit)
+        else:
+            region = (first_bit, last_bit, first_line, last_line)
+        region = (region[0] + origin[0], region[1] + origin[0], region[2] + origin[1], region[3] + origin[1])
+        in_vocab = np.isin(decoded, vocab)
+        hits = int(in_vocab.sum())
+        misses = count - hits - int(np.isin(decoded, neutral).sum())
+        distinct = len(set(decoded[in_vocab].tolist()))
+        hypotheses.append(Hypothesis(direction, order, layout, width, *region, decoded.tolist(),
+                                     hits, distinct, hits - misses))
+    return SearchResult(hypotheses, searched, time.perf_counter() - started)
+
+
+def describe(h):
+    """One-line description of a hypothesis."""
+    reading = {'row': 'left to right' if h.order == 'msb' else 'right to left',
+               'column': 'top to bottom' if h.order == 'msb' else 'bottom to top'}[h.direction]
+    return (f"rows {h.row_start}-{h.row_end}, cols {h.col_start}-{h.col_end}: "
+            f"{h.width}-bit {h.direction} fields {reading}, {h.layout}")
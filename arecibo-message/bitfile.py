@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Packed binary message container (.arcb).
+A fixed 64-byte header (length, rows/cols, bit order, checksum) followed
+by the bits packed 8 per byte with every row starting on a byte boundary.
+The loader memory-maps the payload, so opening is constant time and a
+region read (e.g. rows 40-54) only touches the pages that hold it.
+The payload CRC-32 is checked on request (grid.load_grid(..., verify=True)),
+which convert, batch and `arecibo run --verify` do.
+
+Usage:
+    python3 bitfile.py arecibo-message.txt arecibo-message.arcb
+"""
+
+import struct
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+MAGIC = b'ARCB'
+VERSION = 1
+EXTENSION = '.arcb'
+
+BIT_ORDER_MSB_FIRST = 0
+LAYOUT_ROW_ALIGNED = 1
+
+# magic, version, bit order, layout, header size, length, rows, cols, row bytes, CRC-32
+HEADER_FORMAT = '<4sHBBIQQQQI16x'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+Header = namedtuple('Header', ['version', 'bit_order', 'layout', 'header_size',
+                               'length', 'rows', 'cols', 'row_bytes', 'checksum'])
+
+
+def is_bitfile(path):
+    """True if the file starts with the .arcb magic bytes."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def read_header(path):
+    """Read and validate the header of an .arcb file."""
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE or raw[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path}: not an {EXTENSION} packed message file")
+    header = Header(*struct.unpack(HEADER_FORMAT, raw)[1:])
+    if header.version != VERSION:
+        raise ValueError(f"{path}: unsupported {EXTENSION} version {header.version}")
+    if header.bit_order != BIT_ORDER_MSB_FIRST or header.layout != LAYOUT_ROW_ALIGNED:
+        raise ValueError(f"{path}: unsupported bit order/layout ({header.bit_order}, {header.layout})")
+    if header.rows * header.cols != header.length:
+        raise ValueError(f"{path}: header shape {header.rows}×{header.cols} does not match length {header.length}")
+    return header
+
+
+def open_payload(path):
+    """Return (header, read-only memory map of the packed rows)."""
+    header = read_header(path)
+    size = header.rows * header.row_bytes
+    if size == 0:
+        return header, np.zeros(0, dtype=np.uint8)
+    payload = np.memmap(path, dtype=np.uint8, mode='r', offset=header.header_size, shape=(size,))
+    return header, payload
+
+
+def verify(path):
+    """Recompute the payload CRC-32 and compare it with the header."""
+    header, payload = open_payload(path)
+    return _crc32(payload) == header.checksum
+
+
+def _crc32(payload, block=1 << 24):
+    crc = 0
+    for start in range(0, payload.size, block):
+        crc = zlib.crc32(payload[start:start + block], crc)
+    return crc
+
+
+def write_grid(grid, path):
+    """
+    Write a BitGrid (already shaped rows × cols) as a row-aligned .arcb file.
+    Rows are packed block by block, so the unpacked grid is never resident.
+    """
+    row_bytes = (grid.cols + 7) // 8
+    crc = 0
+    with open(path, 'wb') as f:
+        f.write(bytes(HEADER_SIZE))
+        for _, block in grid.iter_row_blocks():
+            packed = np.packbits(block, axis=1)
+            crc = zlib.crc32(packed, crc)
+            f.write(packed.tobytes())
+        f.seek(0)
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, BIT_ORDER_MSB_FIRST, LAYOUT_ROW_ALIGNED,
+                            HEADER_SIZE, len(grid), grid.rows, grid.cols, row_bytes, crc))
+    return read_header(path)
+
+
+if __name__ == "__main__":
+    import sys
+
+    from grid import load_grid
+
+    if len(sys.argv) != 3:
+        print(f"Usage: {sys.argv[0]} INPUT.txt OUTPUT{EXTENSION}", file=sys.stderr)
+        sys.exit(1)
+    header = write_grid(load_grid(sys.argv[1]), sys.argv[2])
+    print(f"Wrote {sys.argv[2]}: {header.rows} rows × {header.cols} columns, "
+          f"{header.length} bits, CRC-32 {header.checksum:08x}")
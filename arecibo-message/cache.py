@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of analysis stage outputs.
+Each stage's printed output is stored under a key made from a hash of the
+message bits and shape, the stage id, its parameters and a fingerprint of
+the analysis code, so a repeated run replays the output instead of
+recomputing it. Wall-clock timings in the output ("... in 27 ms (...)") are
+stored as "(cached)", since a replay did not measure them. The cache is bounded in size: entries are touched on every
+hit and the least recently used ones are evicted first.
+
+Location: $ARECIBO_CACHE_DIR, else $XDG_CACHE_HOME/arecibo, else ~/.cache/arecibo
+"""
+
+import contextlib
+import glob
+import hashlib
+import io
+import os
+import re
+import sys
+import tempfile
+
+import numpy as np
+
+# Default size bound for all entries together
+MAX_BYTES = 64 << 20
+
+ENTRY_SUFFIX = '.out'
+
+# Bump to invalidate every existing entry after a format change
+CACHE_VERSION = 2
+
+# A timing to the end of its line, e.g. " in 27 ms (30,074,593/s)"
+TIMING = re.compile(r' in [\d.,]+ m?s\b.*$', re.MULTILINE)
+
+
+def default_directory():
+    """Cache directory from the environment, following the XDG convention."""
+    if os.environ.get('ARECIBO_CACHE_DIR'):
+        return os.environ['ARECIBO_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'arecibo')
+
+
+def message_hash(grid):
+    """
+    SHA-256 of the grid's shape and bits, packed row by row, so the same
+    message hashes the same whether it came from text or an .arcb file.
+    """
+    digest = hashlib.sha256(f"{grid.rows}x{grid.cols}:{len(grid)}:".encode('ascii'))
+    for _, block in grid.iter_row_blocks():
+        digest.update(np.packbits(block, axis=1).tobytes())
+    return digest.hexdigest()
+
+
+_code_fingerprint = None
+
+
+def code_fingerprint():
+    """SHA-256 of the analysis sources, so editing any module invalidates its cached outputs."""
+    global _code_fingerprint
+    if _code_fingerprint is None:
+        digest = hashlib.sha256(f"v{CACHE_VERSION}".encode('ascii'))
+        here = os.path.dirname(os.path.abspath(__file__))
+        for path in sorted(glob.glob(os.path.join(here, '*.py'))):
+            with open(path, 'rb') as f:
+                digest.update(os.path.basename(path).encode() + b'\0' + f.read())
+        _code_fingerprint = digest.hexdigest()
+    return _code_fingerprint
+
+
+class ResultCache:
+    """
+    Size-bounded LRU store of stage outputs, one file per entry.
+    `enabled=False` bypasses the cache; `refresh=True` ignores existing
+    entries and overwrites them with fresh results.
+    """
+
+    def __init__(self, directory=None, max_bytes=MAX_BYTES, enabled=True, refresh=False):
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, content_hash, stage, **params):
+        """Entry key for one stage of one message under the given parameters."""
+        parts = [content_hash, code_fingerprint(), str(stage)]
+        parts += [f"{name}={params[name]!r}" for name in sorted(params)]
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Return the stored text for `key`, or None; a hit marks the entry as recently used."""
+        if not self.enabled:
+            return None
+        if self.refresh:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                text = f.read().decode('utf-8')
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def put(self, key, text):
+        """Store `text` under `key` (atomically), then evict down to the size bound."""
+        if not self.enabled:
+            return
+        data = text.encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            return  # a read-only or full cache must not break the analysis
+        self.evict()
+
+    def entries(self):
+        """(mtime, size, path) of every entry, least recently used first."""
+        found = []
+        for path in glob.glob(os.path.join(self.directory, '*' + ENTRY_SUFFIX)):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found.append((st.st_mtime, st.st_size, path))
+        return sorted(found)
+
+    def evict(self):
+        """Remove least recently used entries until the total size fits the bound."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            total -= size
+
+    def clear(self):
+        """Remove every entry; returns the number removed."""
+        removed = 0
+        for _, _, path in self.entries():
+            with contextlib.suppress(OSError):
+                os.remove(path)
+                removed += 1
+        return removed
+
+    def replay(self, key, compute):
+        """
+        Write the cached output for `key` to stdout, or call `compute()`
+        (which prints the stage output), store what it printed (with its
+        timings replaced by "(cached)") and echo it.
+        """
+        if not self.enabled:
+            compute()
+            return
+        text = self.get(key)
+        if text is None:
+            buffer = io.StringIO()
+            with contextlib.redirect_stdout(buffer):
+                compute()
+            text = buffer.getvalue()
+            self.put(key, TIMING.sub(' (cached)', text))
+        sys.stdout.write(text)
+        sys.stdout.flush()
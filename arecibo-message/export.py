@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Image export for decoded grids.
+Writes the bitmap straight from the packed bit buffer to PBM (P4), PGM
+(P5), PPM (P6), PNG and SVG, with integer scaling, the section colour
+overlay (render.section_colors) and component bounding boxes. PNG files
+are encoded without dependencies: palette scanlines compressed with zlib,
+wrapped in CRC-checked chunks. Images are built as palette-index arrays
+with NumPy, so a frame costs a few array operations and one compress call.
+
+Usage:
+    python3 export.py out.png --scale 8 --color --boxes
+    python3 -m arecibo export arecibo-message.txt out.svg --color
+"""
+
+import argparse
+import os
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+from components import find_components, find_figure, row_runs
+from grid import MESSAGE_FILE, load_grid
+from render import BLUE, CYAN, GREEN, RED, WHITE, YELLOW, section_colors
+from sections import find_layout
+
+FORMATS = ('pbm', 'pgm', 'ppm', 'png', 'svg')
+
+# Palette indices: background, plain bits, then one entry per section colour
+BACKGROUND = (0, 0, 0)
+FOREGROUND = (255, 255, 255)
+BOX = (255, 0, 255)
+
+# RGB for the terminal colours of the section overlay
+SECTION_RGB = {
+    CYAN: (0, 200, 255),
+    GREEN: (0, 200, 80),
+    YELLOW: (255, 210, 0),
+    RED: (255, 60, 60),
+    BLUE: (80, 110, 255),
+    WHITE: FOREGROUND,
+}
+
+PALETTE = [BACKGROUND, FOREGROUND, BOX] + [rgb for rgb in SECTION_RGB.values() if rgb != FOREGROUND]
+BACKGROUND_INDEX, FOREGROUND_INDEX, BOX_INDEX = 0, 1, 2
+SECTION_INDEX = {color: PALETTE.index(rgb) for color, rgb in SECTION_RGB.items()}
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# zlib level for PNG data (6 is the zlib default; 1 favours speed for many frames)
+PNG_LEVEL = 6
+
+
+def overlays(grid, color=False, boxes=False):
+    """Row colour indices and component boxes for a grid, as selected by the flags."""
+    row_colors, box_list = None, []
+    if color or boxes:
+        _, components = find_components(grid)
+        if color:
+            colors, _ = section_colors(grid, find_layout(grid), find_figure(components))
+            row_colors = np.array([SECTION_INDEX[c] for c in colors], dtype=np.uint8)
+        if boxes:
+            box_list = [(c.row_start, c.row_end, c.col_start, c.col_end) for c in components]
+    return row_colors, box_list
+
+
+def _draw_boxes(index, boxes, scale):
+    """Outline each (row_start, row_end, col_start, col_end) box one pixel outside its cells."""
+    height, width = index.shape
+    for r0, r1, c0, c1 in boxes:
+        top, bottom = r0 * scale - 1, (r1 + 1) * scale
+        left, right = c0 * scale - 1, (c1 + 1) * scale
+        cols = slice(max(left, 0), min(right, width - 1) + 1)
+        rows = slice(max(top, 0), min(bottom, height - 1) + 1)
+        for r in (top, bottom):
+            if 0 <= r < height:
+                index[r, cols] = BOX_INDEX
+        for c in (left, right):
+            if 0 <= c < width:
+                index[rows, c] = BOX_INDEX
+    return index
+
+
+def image_index(grid, scale=1, row_colors=None, boxes=()):
+    """
+    Palette-index image of the grid: (rows * scale, cols * scale) uint8.
+    Set bits take their row's colour index (FOREGROUND_INDEX without
+    `row_colors`), clear bits the background.
+    """
+    index = np.empty((grid.rows, grid.cols), dtype=np.uint8)
+    for start, block in grid.iter_row_blocks():
+        stop = start + block.shape[0]
+        ink = FOREGROUND_INDEX if row_colors is None else row_colors[start:stop, None]
+        np.multiply(block, ink, out=index[start:stop], casting='unsafe')
+    if scale > 1:
+        index = index.repeat(scale, axis=0).repeat(scale, axis=1)
+    if boxes:
+        _draw_boxes(index, boxes, scale)
+    return index
+
+
+def _palette_array(palette=PALETTE):
+    return np.array(palette, dtype=np.uint8)
+
+
+def pbm_bytes(grid, scale=1):
+    """Binary PBM (P4): set bits are black, rows packed 8 pixels per byte."""
+    header = f"P4\n{grid.cols * scale} {grid.rows * scale}\n".encode('ascii')
+    if scale == 1 and grid.row_bytes is not None:
+        return header + grid.packed_rows.tobytes()
+    return header + np.packbits(image_index(grid, scale) > 0, axis=1).tobytes()
+
+
+def pgm_bytes(index, palette=PALETTE):
+    """Binary PGM (P5): palette colours as grey levels (Rec. 601 luma)."""
+    rgb = _palette_array(palette).astype(np.float64)
+    grey = np.rint(rgb @ [0.299, 0.587, 0.114]).astype(np.uint8)
+    header = f"P5\n{index.shape[1]} {index.shape[0]}\n255\n".encode('ascii')
+    return header + grey[index].tobytes()
+
+
+def ppm_bytes(index, palette=PALETTE):
+    """Binary PPM (P6): 8-bit RGB pixels."""
+    header = f"P6\n{index.shape[1]} {index.shape[0]}\n255\n".encode('ascii')
+    return header + _palette_array(palette)[index].tobytes()
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def png_bytes(index, palette=PALETTE, level=PNG_LEVEL):
+    """
+    Palette PNG (colour type 3). Images using only the first two palette
+    entries are stored 1 bit per pixel, others 8; every scanline uses
+    filter 0 and the whole image is one zlib stream.
+    """
+    height, width = index.shape
+    used = int(index.max()) + 1 if index.size else 1
+    if used <= 2:
+        depth, rows = 1, np.packbits(index, axis=1)
+    else:
+        depth, rows = 8, index
+    scanlines = np.zeros((height, rows.shape[1] + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rows
+    header = struct.pack('>IIBBBBB', width, height, depth, 3, 0, 0, 0)
+    plte = _palette_array(palette[:max(used, 2)]).tobytes()
+    return (PNG_SIGNATURE + _png_chunk(b'IHDR', header) + _png_chunk(b'PLTE', plte)
+            + _png_chunk(b'IDAT', zlib.compress(scanlines.tobytes(), level)) + _png_chunk(b'IEND', b''))
+
+
+def _hex(rgb):
+    return '#%02x%02x%02x' % rgb
+
+
+def svg_text(grid, scale=1, row_colors=None, boxes=()):
+    """
+    SVG with one rectangle per horizontal run of set bits, grouped by
+    colour, and unfilled rectangles for the boxes.
+    """
+    width, height = grid.cols * scale, grid.rows * scale
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+           f'viewBox="0 0 {width} {height}" shape-rendering="crispEdges">\n',
+           f'<rect width="{width}" height="{height}" fill="{_hex(BACKGROUND)}"/>\n']
+    groups = {}
+    for start, block in grid.iter_row_blocks():
+        run_rows, starts, ends = row_runs(block)
+        run_rows = run_rows + start
+        ink = (np.full(run_rows.size, FOREGROUND_INDEX) if row_colors is None
+               else row_colors[run_rows])
+        for color in np.unique(ink).tolist():
+            pick = ink == color
+            groups.setdefault(color, []).extend(
+                f'<rect x="{c * scale}" y="{r * scale}" width="{(e - c) * scale}" height="{scale}"/>'
+                for r, c, e in zip(run_rows[pick].tolist(), starts[pick].tolist(), ends[pick].tolist()))
+    for color in sorted(groups):
+        out.append(f'<g fill="{_hex(PALETTE[color])}">\n')
+        out.append('\n'.join(groups[color]) + '\n</g>\n')
+    if boxes:
+        out.append(f'<g fill="none" stroke="{_hex(BOX)}" stroke-width="1">\n')
+        for r0, r1, c0, c1 in boxes:
+            out.append(f'<rect x="{c0 * scale - 0.5}" y="{r0 * scale - 0.5}" '
+                       f'width="{(c1 - c0 + 1) * scale + 1}" height="{(r1 - r0 + 1) * scale + 1}"/>\n')
+        out.append('</g>\n')
+    out.append('</svg>\n')
+    return ''.join(out)
+
+
+def format_for(path):
+    """Image format from a file extension."""
+    fmt = os.path.splitext(path)[1].lower().lstrip('.')
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown image format: {path} (expected one of {', '.join(FORMATS)})")
+    return fmt
+
+
+def image_bytes(grid, fmt, scale=1, color=False, boxes=False):
+    """Encode a grid as one image in the given format."""
+    if scale < 1:
+        raise ValueError(f"Scale must be a positive integer, got {scale}")
+    if fmt == 'pbm':
+        if color or boxes:
+            raise ValueError("PBM is black and white only; use pgm, ppm, png or svg for overlays")
+        return pbm_bytes(grid, scale)
+    row_colors, box_list = overlays(grid, color, boxes)
+    if fmt == 'svg':
+        return svg_text(grid, scale, row_colors, box_list).encode('utf-8')
+    index = image_index(grid, scale, row_colors, box_list)
+    return {'pgm': pgm_bytes, 'ppm': ppm_bytes, 'png': png_bytes}[fmt](index)
+
+
+def export(grid, path, scale=1, color=False, boxes=False, fmt=None):
+    """Write the grid to `path` (format from the extension unless given); returns the bytes written."""
+    data = image_bytes(grid, fmt or format_for(path), scale, color, boxes)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def add_export_arguments(parser):
+    parser.add_argument('output', help=f"Image file ({', '.join('.' + f for f in FORMATS)})")
+    parser.add_argument('-s', '--scale', type=int, default=1, help="Pixels per bit (default: 1)")
+    parser.add_argument('-c', '--color', action='store_true', help="Colour the detected sections")
+    parser.add_argument('-b', '--boxes', action='store_true', help="Outline the connected components")
+
+
+def run_export(grid, args):
+    """Export for parsed command-line arguments; returns the exit code."""
+    try:
+        size = export(grid, args.output, args.scale, args.color, args.boxes)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {args.output}: {grid.cols * args.scale}×{grid.rows * args.scale} pixels, {size} bytes")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the message bitmap as an image")
+    add_export_arguments(parser)
+    parser.add_argument('-f', '--file', default=MESSAGE_FILE, help=f"Message file (default: {MESSAGE_FILE})")
+    args = parser.parse_args()
+    try:
+        grid = load_grid(args.file)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return run_export(grid, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
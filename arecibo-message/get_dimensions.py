@@ -1,44 +1,173 @@
 #!/usr/bin/env python3
 """
-Helper function to determine grid dimensions from binary data length.
-Returns (rows, cols) tuple.
+Helper functions to determine grid dimensions from binary data length.
+Factorizes the length (small-prime wheel + Pollard-rho), generates every
+divisor pair from the prime factorization and ranks the candidate
+(rows, cols) shapes. Results are memoized per length so every pipeline
+stage reuses the same factorization.
 """
 
-def get_dimensions(data_length):
-    """Determine grid dimensions from data length by factorization."""
-    n = data_length
-    
-    # Factor analysis
-    factors = []
-    for i in range(1, int(n**0.5) + 1):
-        if n % i == 0:
-            factors.append((i, n // i))
-            if i != n // i:
-                factors.append((n // i, i))
-    factors.sort()
-    
-    # Find reasonable aspect ratios (excluding 1×N and N×1)
-    reasonable = []
-    for r, c in factors:
-        if r == 1 or c == 1:
+import math
+import random
+from collections import namedtuple
+from functools import lru_cache
+
+# Aspect ratios between 1:4 and 4:1 are considered reasonable for a bitmap
+MIN_RATIO = 1 / 4
+
+# Trial-divide by these primes before falling back to Pollard-rho
+SMALL_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+WHEEL_LIMIT = 1 << 16
+
+# Deterministic Miller-Rabin bases for all n < 3.3 * 10^24
+MILLER_RABIN_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+Candidate = namedtuple('Candidate', ['rows', 'cols', 'ratio', 'reasonable'])
+
+
+def is_prime(n):
+    """Deterministic Miller-Rabin primality test."""
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in MILLER_RABIN_BASES:
+        if a % n == 0:
             continue
-        ratio = r/c if r <= c else c/r
-        if 1/4 <= ratio <= 4:  # Inclusive range
-            reasonable.append((r, c))
-    
-    if reasonable:
-        # Prefer taller format (more rows) for bitmap images
-        return max(reasonable, key=lambda x: x[0])
-    else:
-        # Fallback: closest to square, excluding 1×N
-        non_trivial = [(r, c) for r, c in factors if r > 1 and c > 1]
-        if non_trivial:
-            return min(non_trivial, key=lambda x: abs(x[0]/x[1] - 1))
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _pollard_rho(n):
+    """Find a non-trivial factor of composite n (Brent's variant)."""
+    if n % 2 == 0:
+        return 2
+    rng = random.Random(n)
+    while True:
+        y, c, m = rng.randrange(1, n), rng.randrange(1, n), 128
+        g, r, q = 1, 1, 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = math.gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % n
+                g = math.gcd(abs(x - ys), n)
+        if g != n:
+            return g
+
+
+def _wheel_divide(n, factors):
+    """Strip small factors using a 2·3·5 wheel; return the unfactored cofactor."""
+    for p in (2, 3, 5):
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+    increments = (4, 2, 4, 2, 4, 6, 2, 6)
+    p, i = 7, 0
+    while p <= WHEEL_LIMIT and p * p <= n:
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+        p += increments[i]
+        i = (i + 1) % 8
+    return n
+
+
+@lru_cache(maxsize=None)
+def factorize(n):
+    """Return the prime factorization of n as a sorted tuple of (prime, exponent)."""
+    if n < 1:
+        raise ValueError(f"Cannot factorize {n}")
+    factors = {}
+    n = _wheel_divide(n, factors)
+    pending = [n] if n > 1 else []
+    while pending:
+        m = pending.pop()
+        if is_prime(m):
+            factors[m] = factors.get(m, 0) + 1
         else:
-            return factors[1] if len(factors) > 1 else factors[0]
+            d = _pollard_rho(m)
+            pending.extend((d, m // d))
+    return tuple(sorted(factors.items()))
+
+
+def divisors(n):
+    """Return all divisors of n in ascending order, built from its factorization."""
+    divs = [1]
+    for p, e in factorize(n):
+        divs = [d * p ** k for d in divs for k in range(e + 1)]
+    return sorted(divs)
+
+
+def factor_pairs(n):
+    """Return every (rows, cols) pair with rows × cols == n, sorted by rows."""
+    return [(d, n // d) for d in divisors(n)]
+
+
+def aspect_ratio(rows, cols):
+    """Ratio of the shorter side to the longer side (1.0 is square)."""
+    return rows / cols if rows <= cols else cols / rows
+
+
+@lru_cache(maxsize=None)
+def candidate_dimensions(data_length):
+    """
+    Rank every possible grid shape for a message of data_length bits.
+    Best candidate first: reasonable aspect ratios (taller preferred), then
+    other non-trivial shapes closest to square, then 1×N / N×1.
+    """
+    n = data_length
+    pairs = factor_pairs(n)
+    candidates = []
+    for r, c in pairs:
+        ratio = aspect_ratio(r, c)
+        trivial = r == 1 or c == 1
+        candidates.append(Candidate(r, c, ratio, not trivial and ratio >= MIN_RATIO))
+
+    reasonable = sorted((c for c in candidates if c.reasonable), key=lambda c: -c.rows)
+    other = sorted((c for c in candidates if not c.reasonable and c.rows > 1 and c.cols > 1),
+                   key=lambda c: abs(c.rows / c.cols - 1))
+    # Trivial shapes: the original fallback picked the second factor pair (N×1)
+    trivial = [c for c in candidates if c.rows == 1 or c.cols == 1]
+    trivial.sort(key=lambda c: c.cols)
+    return tuple(reasonable + other + trivial)
+
+
+def get_dimensions(data_length):
+    """Determine grid dimensions from data length by factorization."""
+    best = candidate_dimensions(data_length)[0]
+    return best.rows, best.cols
+
 
 if __name__ == "__main__":
     # Test with arecibo message
-    data = open('arecibo-message.txt').read().strip()
-    rows, cols = get_dimensions(len(data))
+    from grid import BitGrid
+
+    grid = BitGrid.load()
+    rows, cols = get_dimensions(len(grid))
     print(f"Determined dimensions: {rows} rows × {cols} columns")
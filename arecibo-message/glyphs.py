@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Template-matching glyph recognizer.
+Small bitmap templates (generated, or cut from a labelled grid) are slid
+across the grid and scored at every position by the share of template
+cells that agree with the grid. All templates of one shape are scored
+together: window sums come from an integral image, and the template/window
+correlations are a single matrix product of the unrolled windows with the
+stacked templates, so thousands of templates need no Python loop over
+positions or templates. Exact matching of small templates reads every
+window as an integer code and looks it up among the template codes.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Arecibo numbers: each column holds 3 bits (top bit most significant),
+# least significant column first, with a marker bit under the first column
+DIGIT_ROWS = 3
+
+# Blank columns required on each side of a number
+MARGIN = 1
+
+# Upper bound on the number of values held per matrix-product block
+BLOCK_ELEMENTS = 1 << 24
+
+# Templates up to this many cells are matched exactly by integer code lookup
+EXACT_MAX_AREA = 62
+
+Template = namedtuple('Template', ['label', 'bits'])
+Match = namedtuple('Match', ['label', 'row', 'col', 'height', 'width', 'score', 'template'])
+
+
+def number_template(value, digit_rows=DIGIT_ROWS, margin=MARGIN):
+    """Bitmap of `value` written the way the Arecibo header writes numbers."""
+    columns = []
+    while True:
+        columns.append([(value >> (digit_rows - 1 - k)) & 1 for k in range(digit_rows)])
+        value >>= digit_rows
+        if value == 0:
+            break
+    bits = np.zeros((digit_rows + 1, len(columns) + 2 * margin), dtype=np.uint8)
+    bits[:digit_rows, margin:margin + len(columns)] = np.array(columns, dtype=np.uint8).T
+    bits[digit_rows, margin] = 1
+    return bits
+
+
+def number_templates(values=range(1, 11), digit_rows=DIGIT_ROWS, margin=MARGIN):
+    """Templates for the header numbers, labelled with their values."""
+    return [Template(v, number_template(v, digit_rows, margin)) for v in values]
+
+
+def learn_templates(bits, regions):
+    """Cut templates from a labelled grid: `regions` maps label -> (row_start, row_end, col_start, col_end), inclusive."""
+    bits = np.asarray(bits, dtype=np.uint8)
+    return [Template(label, bits[r0:r1 + 1, c0:c1 + 1].copy()) for label, (r0, r1, c0, c1) in regions.items()]
+
+
+def box_sums(bits, height, width):
+    """Number of ones in every height × width window (integral image)."""
+    integral = np.zeros((bits.shape[0] + 1, bits.shape[1] + 1), dtype=np.int64)
+    np.cumsum(np.cumsum(bits, axis=0, dtype=np.int64), axis=1, out=integral[1:, 1:])
+    return (integral[height:, width:] - integral[:-height, width:]
+            - integral[height:, :-width] + integral[:-height, :-width])
+
+
+def _score_group(bits, kernels, min_score):
+    """
+    Agreement counts of same-shape templates at every position:
+    agree = 2 * sum(t*g) - sum(g) + sum(1 - t). Yields (template, row, col, agree)
+    arrays for the positions scoring at least `min_score`.
+    """
+    n, height, width = kernels.shape
+    area = height * width
+    windows = sliding_window_view(bits, (height, width))
+    ones = box_sums(bits, height, width).astype(np.float32)
+    flat = kernels.reshape(n, area).astype(np.float32).T
+    blank = (area - kernels.reshape(n, area).sum(axis=1)).astype(np.float32)
+    needed = np.ceil(min_score * area - 1e-9)
+    out_cols = windows.shape[1]
+    step = max(1, BLOCK_ELEMENTS // ((area + n) * out_cols))
+    for start in range(0, windows.shape[0], step):
+        # Counts stay below 2**24, so float32 arithmetic is exact
+        agree = windows[start:start + step].reshape(-1, area).astype(np.float32) @ flat
+        agree *= 2
+        agree -= ones[start:start + step].reshape(-1, 1)
+        agree += blank
+        pos, which = np.nonzero(agree >= needed)
+        rows, cols = divmod(pos, out_cols)
+        yield which, rows + start, cols, agree[pos, which].astype(np.int64)
+
+
+def _exact_group(bits, kernels):
+    """
+    Exact matches only: every window and template is read as one integer
+    code, and window codes are looked up among the sorted template codes.
+    Yields the same (template, row, col, agree) arrays as _score_group.
+    """
+    n, height, width = kernels.shape
+    area = height * width
+    powers = 1 << np.arange(area, dtype=np.int64)
+    codes = kernels.reshape(n, area).astype(np.int64) @ powers
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    windows = sliding_window_view(bits, (height, width))
+    out_cols = windows.shape[1]
+    step = max(1, BLOCK_ELEMENTS // (area * out_cols))
+    for start in range(0, windows.shape[0], step):
+        window_codes = windows[start:start + step].reshape(-1, area).astype(np.int64) @ powers
+        lo = np.searchsorted(sorted_codes, window_codes, side='left')
+        hi = np.searchsorted(sorted_codes, window_codes, side='right')
+        counts = hi - lo
+        pos = np.repeat(np.arange(window_codes.size), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        which = order[np.repeat(lo, counts) + offsets]
+        rows, cols = divmod(pos, out_cols)
+        yield which, rows + start, cols, np.full(pos.size, area, dtype=np.int64)
+
+
+def match_templates(bits, templates, min_score=1.0, pad=MARGIN):
+    """
+    Every position where a template agrees with at least `min_score` of
+    its cells. The grid is surrounded by `pad` blank cells, so templates
+    with blank margins also match at the edges. Positions are grid
+    coordinates of the template's top-left cell.
+    """
+    bits = np.pad(np.asarray(bits, dtype=np.uint8), pad)
+    groups = {}
+    for index, template in enumerate(templates):
+        groups.setdefault(template.bits.shape, []).append(index)
+
+    matches = []
+    for (height, width), indices in groups.items():
+        if height > bits.shape[0] or width > bits.shape[1]:
+            continue
+        kernels = np.stack([templates[i].bits for i in indices])
+        if min_score >= 1 and height * width <= EXACT_MAX_AREA:
+            scored = _exact_group(bits, kernels)
+        else:
+            scored = _score_group(bits, kernels, min_score)
+        for which, rows, cols, agree in scored:
+            for w, r, c, a in zip(which.tolist(), rows.tolist(), cols.tolist(), agree.tolist()):
+                index = indices[w]
+                matches.append(Match(templates[index].label, r - pad, c - pad, height, width,
+                                     a / (height * width), index))
+    matches.sort(key=lambda m: (m.row, m.col, m.template))
+    return matches
+
+
+def resolve(matches, templates):
+    """
+    Keep the best non-overlapping matches: higher scores first, then
+    templates with more set bits, so a glyph is not also read as the
+    smaller glyphs it contains. Returns matches in reading order.
+    """
+    ranked = sorted(matches, key=lambda m: (-m.score, -int(templates[m.template].bits.sum()), m.row, m.col))
+    claimed = set()
+    kept = []
+    for m in ranked:
+        rs, cs = np.nonzero(templates[m.template].bits)
+        cells = set(zip((rs + m.row).tolist(), (cs + m.col).tolist()))
+        if cells & claimed:
+            continue
+        claimed |= cells
+        kept.append(m)
+    return sorted(kept, key=lambda m: (m.row, m.col))
+
+
+def read_numbers(bits, values=range(1, 11), min_score=1.0):
+    """Recognize the header numbers in `bits`; returns the resolved matches in reading order."""
+    templates = number_templates(values)
+    return resolve(match_templates(bits, templates, min_score), templates)
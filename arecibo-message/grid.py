@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Shared bit grid used by all analysis scripts.
+Loads the message once into a bit-packed NumPy array (8 bits per byte)
+and exposes row/column/region slicing, popcounts and transposes as
+vectorized operations.
+"""
+
+import numpy as np
+
+import bitfile
+from get_dimensions import get_dimensions
+from ingest import CHUNK_SIZE, read_message
+
+MESSAGE_FILE = 'arecibo-message.txt'
+
+# Number of set bits in every possible byte value
+POPCOUNT_TABLE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+# Rows are unpacked in blocks of roughly this many bits so whole-grid
+# operations never hold more than a bounded amount of unpacked data
+BLOCK_BITS = 1 << 22
+
+ASCII_ZERO = ord('0')
+ASCII_ONE = ord('1')
+
+
+def popcount(packed):
+    """Count set bits in a packed uint8 array."""
+    return int(POPCOUNT_TABLE[packed].sum(dtype=np.int64))
+
+
+def bits_to_int(bits):
+    """Read a sequence of 0/1 values (most significant bit first) as an integer."""
+    bits = np.asarray(bits, dtype=np.uint8)
+    if bits.size == 0:
+        return 0
+    pad = (-bits.size) % 8
+    packed = np.packbits(bits)
+    return int.from_bytes(packed.tobytes(), 'big') >> pad
+
+
+def bits_to_str(bits, one='1', zero='0'):
+    """Render a sequence of 0/1 values as text."""
+    bits = np.asarray(bits, dtype=np.uint8)
+    text = (bits.astype(bool) + np.uint8(ASCII_ZERO)).astype(np.uint8).tobytes().decode('ascii')
+    return text.translate({ASCII_ZERO: zero, ASCII_ONE: one})
+
+
+class BitGrid:
+    """
+    Bit-packed message arranged as a rows × cols grid.
+    Bits are packed as one flat stream by default. With `row_bytes`, every
+    row starts on a byte boundary (padded to `row_bytes` bytes), so packed
+    rows and columns are zero-copy views of the buffer.
+    """
+
+    def __init__(self, packed, length, rows=None, cols=None, is_binary=True, row_bytes=None):
+        self.packed = np.ascontiguousarray(packed, dtype=np.uint8)
+        self.length = length
+        self.is_binary = is_binary
+        if rows is None or cols is None:
+            rows, cols = 1, length
+        self.rows = rows
+        self.cols = cols
+        self.row_bytes = row_bytes
+        self._ones = None
+
+    @classmethod
+    def from_text(cls, text):
+        """Build a grid from a string of '0'/'1' characters."""
+        raw = np.frombuffer(text.encode('latin-1', errors='replace'), dtype=np.uint8)
+        ones = raw == ASCII_ONE
+        is_binary = bool((ones | (raw == ASCII_ZERO)).all())
+        return cls(np.packbits(ones), raw.size, is_binary=is_binary)
+
+    @classmethod
+    def from_bits(cls, bits, rows=None, cols=None):
+        """Build a grid from an array of 0/1 values (1-D or 2-D)."""
+        bits = np.asarray(bits, dtype=np.uint8)
+        if bits.ndim == 2 and rows is None:
+            rows, cols = bits.shape
+        flat = bits.reshape(-1)
+        return cls(np.packbits(flat != 0), flat.size, rows, cols)
+
+    @classmethod
+    def load(cls, path=MESSAGE_FILE, chunk_size=CHUNK_SIZE, spill_path=None):
+        """
+        Load a message file of '0'/'1' characters, streaming it in chunks.
+        With `spill_path`, the packed bits are memory-mapped from that file.
+        """
+        result = read_message(path, chunk_size, spill_path)
+        grid = cls(result.packed, result.length, is_binary=result.is_binary)
+        grid._ones = result.ones
+        return grid
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def shape(self):
+        return (self.rows, self.cols)
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a packed .arcb file (see bitfile.py) in constant time."""
+        header, payload = bitfile.open_payload(path)
+        return cls(payload, header.length, header.rows, header.cols, row_bytes=header.row_bytes)
+
+    def with_shape(self, rows, cols):
+        """Return a view of the same bits arranged as rows × cols."""
+        if self.row_bytes is not None and (rows, cols) != self.shape:
+            # Row padding depends on the width, so a new shape needs the flat stream
+            grid = BitGrid(self.flat_packed(), self.length, rows, cols, self.is_binary)
+        else:
+            grid = BitGrid(self.packed, self.length, rows, cols, self.is_binary, self.row_bytes)
+        grid._ones = self._ones
+        return grid
+
+    def flat_packed(self, block_bits=BLOCK_BITS):
+        """
+        The bits packed back to back (no row padding). Row-aligned rows are
+        repacked a block of 8k rows at a time, so every block ends on a byte
+        boundary and the grid is never unpacked whole.
+        """
+        if self.row_bytes is None:
+            return self.packed
+        if self.cols % 8 == 0:
+            return self.packed[:self.length // 8]  # no padding: already flat
+        flat = np.empty((self.length + 7) // 8, dtype=np.uint8)
+        rows_per_block = max(8, block_bits // max(1, self.cols) // 8 * 8)
+        for start in range(0, self.rows, rows_per_block):
+            stop = min(self.rows, start + rows_per_block)
+            packed = np.packbits(self.region(start, stop).reshape(-1))
+            first = start * self.cols // 8
+            flat[first:first + packed.size] = packed
+        return flat
+
+    def row_aligned(self):
+        """Return a copy of this grid with every row padded to a byte boundary."""
+        row_bytes = (self.cols + 7) // 8
+        packed = np.empty((self.rows, row_bytes), dtype=np.uint8)
+        for start, block in self.iter_row_blocks():
+            packed[start:start + block.shape[0]] = np.packbits(block, axis=1)
+        grid = BitGrid(packed.reshape(-1), self.length, self.rows, self.cols, self.is_binary, row_bytes)
+        grid._ones = self._ones
+        return grid
+
+    # -- counts -----------------------------------------------------------
+
+    @property
+    def ones(self):
+        """Total number of '1' bits (cached)."""
+        if self._ones is None:
+            self._ones = popcount(self.packed)
+        return self._ones
+
+    @property
+    def zeros(self):
+        return self.length - self.ones
+
+    # -- bit access -------------------------------------------------------
+
+    @property
+    def packed_rows(self):
+        """Zero-copy rows × row_bytes view of a row-aligned buffer."""
+        if self.row_bytes is None:
+            raise ValueError("packed_rows requires a row-aligned grid (see row_aligned())")
+        return self.packed[:self.rows * self.row_bytes].reshape(self.rows, self.row_bytes)
+
+    def packed_column(self, j):
+        """
+        Zero-copy view of the bytes holding column j in a row-aligned grid,
+        plus the shift that extracts its bit: (view >> shift) & 1.
+        """
+        return self.packed_rows[:, j // 8], 7 - j % 8
+
+    def span(self, start, stop):
+        """Unpack bits [start, stop) of the flat stream as a uint8 array."""
+        start = max(0, start)
+        stop = min(self.length, stop)
+        if stop <= start:
+            return np.zeros(0, dtype=np.uint8)
+        if self.row_bytes is not None:
+            first_row = start // self.cols
+            bits = self.region(first_row, -(-stop // self.cols)).reshape(-1)
+            offset = start - first_row * self.cols
+            return bits[offset:offset + (stop - start)]
+        first_byte = start // 8
+        last_byte = (stop + 7) // 8
+        bits = np.unpackbits(self.packed[first_byte:last_byte])
+        offset = start - first_byte * 8
+        return bits[offset:offset + (stop - start)]
+
+    def row(self, i):
+        """Bits of row i."""
+        return self.span(i * self.cols, (i + 1) * self.cols)
+
+    def region(self, row_start, row_stop, col_start=0, col_stop=None):
+        """2-D uint8 array of rows [row_start, row_stop) × cols [col_start, col_stop)."""
+        if col_stop is None:
+            col_stop = self.cols
+        row_start = max(0, row_start)
+        row_stop = min(self.rows, row_stop)
+        if row_stop <= row_start:
+            return np.zeros((0, max(0, col_stop - col_start)), dtype=np.uint8)
+        if self.row_bytes is not None:
+            # Unpack only the byte columns that hold [col_start, col_stop)
+            first_byte = col_start // 8
+            last_byte = (col_stop + 7) // 8
+            bits = np.unpackbits(self.packed_rows[row_start:row_stop, first_byte:last_byte], axis=1)
+            offset = col_start - first_byte * 8
+            return bits[:, offset:offset + (col_stop - col_start)]
+        bits = self.span(row_start * self.cols, row_stop * self.cols)
+        bits = bits.reshape(row_stop - row_start, self.cols)
+        return bits[:, col_start:col_stop]
+
+    def column(self, j, row_start=0, row_stop=None):
+        """Bits of column j, top to bottom, over rows [row_start, row_stop)."""
+        if row_stop is None:
+            row_stop = self.rows
+        if self.row_bytes is not None:
+            view, shift = self.packed_column(j)
+            return (view[row_start:row_stop] >> shift) & 1
+        return np.ascontiguousarray(self.region(row_start, row_stop, j, j + 1)[:, 0])
+
+    def iter_row_blocks(self, block_bits=BLOCK_BITS):
+        """Yield (first_row, 2-D bit block) pairs covering the whole grid."""
+        rows_per_block = max(1, block_bits // max(1, self.cols))
+        for start in range(0, self.rows, rows_per_block):
+            stop = min(self.rows, start + rows_per_block)
+            yield start, self.region(start, stop)
+
+    def to_array(self):
+        """Unpack the full grid as a rows × cols uint8 array."""
+        return self.region(0, self.rows)
+
+    # -- vectorized statistics --------------------------------------------
+
+    def row_counts(self):
+        """Number of '1' bits in every row."""
+        counts = np.zeros(self.rows, dtype=np.int64)
+        for start, block in self.iter_row_blocks():
+            counts[start:start + block.shape[0]] = block.sum(axis=1, dtype=np.int64)
+        return counts
+
+    def column_counts(self):
+        """Number of '1' bits in every column."""
+        counts = np.zeros(self.cols, dtype=np.int64)
+        for _, block in self.iter_row_blocks():
+            counts += block.sum(axis=0, dtype=np.int64)
+        return counts
+
+    def transpose(self):
+        """Return the cols × rows grid with rows and columns swapped."""
+        return BitGrid.from_bits(self.to_array().T)
+
+
+def load_grid(path=MESSAGE_FILE, spill_path=None, verify=False):
+    """
+    Load the message and arrange it using the factorization-derived dimensions.
+    Packed .arcb files are memory-mapped in constant time and keep the shape
+    from their header; with verify=True their payload CRC-32 is checked
+    first (one pass over the file), so a corrupted file is rejected.
+    """
+    if bitfile.is_bitfile(path):
+        if verify and not bitfile.verify(path):
+            raise ValueError(f"{path}: payload does not match the header CRC-32 (corrupted file)")
+        return BitGrid.open(path)
+    grid = BitGrid.load(path, spill_path=spill_path)
+    rows, cols = get_dimensions(len(grid))
+    return grid.with_shape(rows, cols)
+
+
+def save_grid(grid, path):
+    """
+    Write a grid to `path`: a packed .arcb file when the name ends in
+    bitfile.EXTENSION, otherwise '0'/'1' text (written in blocks).
+    """
+    if path.endswith(bitfile.EXTENSION):
+        bitfile.write_grid(grid, path)
+        return
+    with open(path, 'wb') as f:
+        for start in range(0, len(grid), BLOCK_BITS):
+            f.write((grid.span(start, min(len(grid), start + BLOCK_BITS)) + ASCII_ZERO).tobytes())
+        f.write(b'\n')
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Incremental re-analysis of a grid that is edited or appended to.
+Instead of recomputing every step after a change, the analysis keeps its
+state up to date and touches only what the change can affect:
+
+  row/column popcounts - adjusted by the delta of every changed cell
+  mirror symmetry      - per-row mismatch counts recomputed for dirty
+                         rows only; the sliding-window totals for the
+                         windows that contain them
+  sections             - the layout is rebuilt from the maintained
+                         popcounts (O(rows + cols), no bits read); the
+                         blocks of a band are recomputed only when the
+                         band has dirty rows
+  components           - only the components within one cell of a change
+                         are relabelled, inside their joint bounding box
+  decode windows       - the header numbers are re-read only when the
+                         header moves or one of its rows changes; the
+                         atomic-number decode (whose search spans the
+                         whole grid) is recomputed lazily on request
+
+So the cost of an update grows with the size of the change (and of the
+components it touches), not with the size of the grid.
+
+Usage:
+    python3 incremental.py --demo 200        # random edits: incremental vs full timing
+    python3 incremental.py --watch arecibo-message.txt
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from components import analyze, find_components, find_figure, label
+from grid import MESSAGE_FILE, BitGrid, load_grid
+from sections import BLANK_MAX, band_blocks, find_layout, header_range, layout_from_profiles
+from step5_decode_numbers import decode_number_rows
+from step6_decode_atomic_numbers import decode_atomic_numbers
+from symmetry import WINDOW_ROWS, SymmetryMap, axis_overlaps, mirror_mismatches
+
+# Seconds between checks of the watched file
+WATCH_INTERVAL = 0.5
+
+UpdateStats = namedtuple('UpdateStats', ['cells', 'rows', 'relabelled', 'seconds'])
+
+# 3 × 3 neighbourhood offsets
+_NEIGHBOURS = np.array([(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)])
+
+
+class IncrementalAnalysis:
+    """
+    Analysis state of one grid (an owned, unpacked copy of its bits).
+    Edit it with set_cells(), write(), flip() or append_rows(); read the
+    results with layout(), components(), figure(), symmetry(), numbers()
+    and atomic_numbers().
+    """
+
+    def __init__(self, grid, window=WINDOW_ROWS):
+        self.bits = grid.to_array().copy()
+        self.window_rows = window
+        self.row_counts = self.bits.sum(axis=1, dtype=np.int64)
+        self.col_counts = self.bits.sum(axis=0, dtype=np.int64)
+        self.row_mismatches = mirror_mismatches(self.bits)
+        self.window_totals = self._window_sums(np.arange(self._window_count()))
+        self.labels, count = label(self.bits)
+        self._components = {}
+        self._first = {}
+        self._add_components(self.labels, count, 0, 0, 1)
+        self.next_label = count + 1
+        self._band_blocks = {}
+        self._layout = None
+        self._numbers = None      # (header range, readings)
+        self._atomic = None
+        self.last_update = None
+
+    @property
+    def shape(self):
+        return self.bits.shape
+
+    def grid(self):
+        """The current bits as a BitGrid."""
+        return BitGrid.from_bits(self.bits)
+
+    # -- edits --------------------------------------------------------------
+
+    def set_cells(self, rows, cols, values):
+        """Set cells (rows[i], cols[i]) to values[i]; returns UpdateStats."""
+        started = time.perf_counter()
+        rows = np.asarray(rows, dtype=np.int64).reshape(-1)
+        cols = np.asarray(cols, dtype=np.int64).reshape(-1)
+        values = np.broadcast_to(np.asarray(values, dtype=np.uint8), rows.shape) != 0
+        # Last write wins for repeated cells, and unchanged cells are no-ops
+        flat = rows * self.bits.shape[1] + cols
+        _, last = np.unique(flat[::-1], return_index=True)
+        keep = flat.size - 1 - last
+        rows, cols, values = rows[keep], cols[keep], values[keep]
+        changed = self.bits[rows, cols] != values
+        return self._apply(rows[changed], cols[changed], values[changed].astype(np.uint8), started)
+
+    def write(self, row, col, patch):
+        """Overwrite the block at (row, col) with a 2-D patch of bits."""
+        patch = np.asarray(patch, dtype=np.uint8)
+        r, c = np.indices(patch.shape)
+        return self.set_cells(r.reshape(-1) + row, c.reshape(-1) + col, patch.reshape(-1))
+
+    def flip(self, rows, cols):
+        """Invert the given cells."""
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        return self.set_cells(rows, cols, 1 - self.bits[rows, cols])
+
+    def append_rows(self, patch):
+        """Add rows at the bottom (width must match); they count as changed from blank."""
+        started = time.perf_counter()
+        patch = np.asarray(patch, dtype=np.uint8).reshape(-1, self.bits.shape[1])
+        old_rows, cols = self.bits.shape
+        added = patch.shape[0]
+        self.bits = np.vstack((self.bits, np.zeros_like(patch)))
+        self.labels = np.vstack((self.labels, np.zeros(patch.shape, dtype=self.labels.dtype)))
+        self.row_counts = np.concatenate((self.row_counts, np.zeros(added, dtype=np.int64)))
+        self.row_mismatches = np.vstack((self.row_mismatches,
+                                         np.zeros((added, self.row_mismatches.shape[1]), dtype=np.int64)))
+        windows = self._window_count()
+        if min(self.window_rows, old_rows) != min(self.window_rows, old_rows + added):
+            self.window_totals = self._window_sums(np.arange(windows))  # the window size itself grew
+        else:
+            self.window_totals = np.vstack((self.window_totals, np.zeros(
+                (windows - self.window_totals.shape[0], self.window_totals.shape[1]), dtype=np.int64)))
+        self._layout = None
+        r, c = np.nonzero(patch)
+        stats = self._apply(r + old_rows, c, np.ones(r.size, dtype=np.uint8), started,
+                            extra_rows=np.arange(old_rows, old_rows + added))
+        return stats
+
+    # -- update -------------------------------------------------------------
+
+    def _apply(self, rows, cols, values, started, extra_rows=None):
+        """Write the changed cells and bring every maintained result up to date."""
+        self.bits[rows, cols] = values
+        delta = values.astype(np.int64) * 2 - 1
+        np.add.at(self.row_counts, rows, delta)
+        np.add.at(self.col_counts, cols, delta)
+        dirty = np.unique(rows)
+        if extra_rows is not None:
+            dirty = np.union1d(dirty, extra_rows)
+        relabelled = 0
+        if dirty.size:
+            self._update_symmetry(dirty)
+            relabelled = self._update_components(rows, cols)
+            self._invalidate(dirty)
+        self.last_update = UpdateStats(int(rows.size), int(dirty.size), relabelled,
+                                       time.perf_counter() - started)
+        return self.last_update
+
+    def _window_count(self):
+        return self.bits.shape[0] - min(self.window_rows, self.bits.shape[0]) + 1 if self.bits.shape[0] else 0
+
+    def _window_sums(self, windows):
+        """Mismatch totals of the given windows (rows w .. w + window - 1)."""
+        size = min(self.window_rows, self.bits.shape[0])
+        totals = np.zeros((windows.size, self.row_mismatches.shape[1]), dtype=np.int64)
+        for k in range(size):
+            totals += self.row_mismatches[windows + k]
+        return totals
+
+    def _update_symmetry(self, dirty):
+        self.row_mismatches[dirty] = mirror_mismatches(self.bits[dirty])
+        size = min(self.window_rows, self.bits.shape[0])
+        windows = np.unique((dirty[:, None] - np.arange(size)[None, :]).reshape(-1))
+        windows = windows[(windows >= 0) & (windows < self.window_totals.shape[0])]
+        self.window_totals[windows] = self._window_sums(windows)
+
+    def _add_components(self, labels, count, row0, col0, first_label):
+        """Record the components of a (sub-)label image whose labels start at first_label."""
+        if not count:
+            return
+        rows, cols = self.bits.shape
+        r, c = np.nonzero(labels)
+        ids = labels[r, c]
+        r, c = r + row0, c + col0
+        # Centroids from absolute coordinates, so they match a full labelling exactly
+        sum_rows = np.bincount(ids, weights=r, minlength=count + 1)
+        sum_cols = np.bincount(ids, weights=c, minlength=count + 1)
+        first = np.full(count + 1, rows * cols, dtype=np.int64)
+        np.minimum.at(first, ids, r * cols + c)
+        for comp in analyze(labels, count):
+            j = comp.label
+            k = j + first_label - 1
+            self._components[k] = comp._replace(
+                label=k, row_start=comp.row_start + row0, row_end=comp.row_end + row0,
+                col_start=comp.col_start + col0, col_end=comp.col_end + col0,
+                centroid_row=float(sum_rows[j] / comp.area), centroid_col=float(sum_cols[j] / comp.area))
+            self._first[k] = int(first[j])
+
+    def _update_components(self, rows, cols):
+        """
+        Relabel the components within one cell of a changed cell. Every
+        other component is unaffected: it touches neither a changed cell
+        nor (since it was separate before) any pixel of those components.
+        """
+        if rows.size == 0:
+            return 0
+        height, width = self.bits.shape
+        nr = np.clip(rows[:, None] + _NEIGHBOURS[:, 0], 0, height - 1).reshape(-1)
+        nc = np.clip(cols[:, None] + _NEIGHBOURS[:, 1], 0, width - 1).reshape(-1)
+        affected = np.unique(self.labels[nr, nc])
+        affected = affected[affected > 0]
+        boxes = [self._components[k] for k in affected.tolist()]
+        r0 = min([int(rows.min())] + [c.row_start for c in boxes])
+        r1 = max([int(rows.max())] + [c.row_end for c in boxes]) + 1
+        c0 = min([int(cols.min())] + [c.col_start for c in boxes])
+        c1 = max([int(cols.max())] + [c.col_end for c in boxes]) + 1
+        old = self.labels[r0:r1, c0:c1]
+        mask = np.isin(old, affected)
+        mask[rows - r0, cols - c0] = True
+        mask &= self.bits[r0:r1, c0:c1] != 0
+        sub, count = label(mask)
+        old[np.isin(old, affected)] = 0
+        old[sub > 0] = sub[sub > 0] + (self.next_label - 1)
+        for k in affected.tolist():
+            del self._components[k]
+            del self._first[k]
+        self._add_components(sub, count, r0, c0, self.next_label)
+        self.next_label += count
+        return int(old.size)
+
+    def _invalidate(self, dirty):
+        self._layout = None
+        self._atomic = None
+        for start, end in list(self._band_blocks):
+            if np.any((dirty >= start) & (dirty <= end)):
+                del self._band_blocks[(start, end)]
+        if self._numbers is not None:
+            first, last = self._numbers[0]
+            if np.any((dirty >= first) & (dirty <= last)):
+                self._numbers = None
+
+    # -- results ------------------------------------------------------------
+
+    def _blocks(self, start, end):
+        if (start, end) not in self._band_blocks:
+            band = BitGrid.from_bits(self.bits[start:end + 1])
+            self._band_blocks[(start, end)] = [b._replace(row_start=start, row_end=end)
+                                               for b in band_blocks(band, 0, end - start, BLANK_MAX)]
+        return self._band_blocks[(start, end)]
+
+    def layout(self):
+        """The sections layout (as sections.find_layout) from the maintained popcounts."""
+        if self._layout is None:
+            self._layout = layout_from_profiles(self.row_counts.copy(), self.col_counts.copy(), self._blocks)
+        return self._layout
+
+    def components(self):
+        """Components as find_components returns them: labelled 1..n in reading order."""
+        ordered = sorted(self._components, key=self._first.get)
+        return [self._components[k]._replace(label=i) for i, k in enumerate(ordered, 1)]
+
+    def figure(self):
+        return find_figure(self.components())
+
+    def symmetry(self):
+        """The mirror heat-map (as symmetry.symmetry_map) from the maintained mismatch counts."""
+        cols = self.bits.shape[1]
+        overlaps = axis_overlaps(cols)
+        size = min(self.window_rows, self.bits.shape[0])
+        return SymmetryMap(np.arange(2 * cols - 1) / 2, overlaps, self.row_mismatches,
+                           1.0 - self.row_mismatches / overlaps, size,
+                           1.0 - self.window_totals / (overlaps * size))
+
+    def numbers(self):
+        """Header readings (as step5_decode_numbers.decode_numbers), re-read only when the header changed."""
+        header = self.layout().header or (0, min(10, self.bits.shape[0]) - 1)
+        if self._numbers is None or self._numbers[0] != header:
+            first, last = header
+            self._numbers = (header, decode_number_rows(self.bits[first:last + 1], first))
+        return self._numbers[1]
+
+    def atomic_numbers(self):
+        """Atomic-number readings; recomputed on request after any change."""
+        if self._atomic is None:
+            self._atomic = decode_atomic_numbers(self.grid())
+        return self._atomic
+
+
+# -- command line ---------------------------------------------------------------
+
+def full_analysis(grid):
+    """The results IncrementalAnalysis maintains, computed from scratch."""
+    layout = find_layout(grid)
+    _, components = find_components(grid)
+    first, last = header_range(grid, layout)
+    return (layout, components, find_figure(components), mirror_mismatches(grid.to_array()),
+            decode_number_rows(grid.region(first, last + 1), first))
+
+
+def check(analysis):
+    """True when every maintained result equals a full recomputation."""
+    layout, components, figure, mismatches, numbers = full_analysis(analysis.grid())
+    current = analysis.layout()
+    return (all(np.array_equal(a, b) if isinstance(a, np.ndarray) else a == b
+                for a, b in zip(current, layout))
+            and analysis.components() == components and analysis.figure() == figure
+            and np.array_equal(analysis.row_mismatches, mismatches) and analysis.numbers() == numbers)
+
+
+def demo(grid, edits, seed=0):
+    """Apply random single-cell flips, timing the update against a full re-analysis."""
+    rng = np.random.default_rng(seed)
+    analysis = IncrementalAnalysis(grid)
+    rows, cols = analysis.shape
+    incremental = 0.0
+    for _ in range(edits):
+        stats = analysis.flip(rng.integers(0, rows, 1), rng.integers(0, cols, 1))
+        started = time.perf_counter()
+        analysis.layout()
+        analysis.figure()
+        analysis.numbers()
+        incremental += stats.seconds + time.perf_counter() - started
+    started = time.perf_counter()
+    full_analysis(analysis.grid())
+    full = time.perf_counter() - started
+    print(f"{edits} single-bit edits on a {rows}×{cols} grid:")
+    print(f"  incremental update + results: {incremental / max(edits, 1) * 1000:8.3f} ms per edit")
+    print(f"  full re-analysis:             {full * 1000:8.3f} ms")
+    print(f"  results match a full re-analysis: {check(analysis)}")
+
+
+def describe(analysis):
+    layout = analysis.layout()
+    figure = analysis.figure()
+    where = f"rows {figure.row_start}-{figure.row_end}" if figure else "not found"
+    digits = analysis.numbers()['digits']
+    print(f"  {analysis.shape[0]}×{analysis.shape[1]}: {len(layout.bands)} bands, bars {layout.bars}, "
+          f"header {layout.header}, figure {where}, numbers {digits}")
+
+
+def watch(path, interval=WATCH_INTERVAL):
+    """Re-analyse `path` whenever it changes, updating only what the edit touched."""
+    analysis = IncrementalAnalysis(load_grid(path))
+    print(f"Watching {path}")
+    describe(analysis)
+    mtime = os.stat(path).st_mtime
+    while True:
+        time.sleep(interval)
+        try:
+            current = os.stat(path).st_mtime
+            if current == mtime:
+                continue
+            mtime = current
+            new = BitGrid.load(path)
+        except OSError:
+            continue
+        rows, cols = analysis.shape
+        if len(new) < rows * cols or len(new) % cols:
+            analysis = IncrementalAnalysis(load_grid(path))
+            print(f"{path}: shape changed, analysed from scratch")
+        else:
+            bits = new.span(0, len(new)).reshape(-1, cols)
+            r, c = np.nonzero(bits[:rows] != analysis.bits)
+            stats = analysis.set_cells(r, c, bits[r, c])
+            appended = bits.shape[0] - rows
+            if appended:
+                stats = analysis.append_rows(bits[rows:])
+            print(f"{path}: {r.size} cell(s) changed, {appended} row(s) appended, "
+                  f"updated in {stats.seconds * 1000:.2f} ms")
+        describe(analysis)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental re-analysis of an edited message")
+    parser.add_argument('-f', '--file', default=MESSAGE_FILE, help=f"Message file (default: {MESSAGE_FILE})")
+    parser.add_argument('--demo', type=int, metavar='N', default=None,
+                        help="Apply N random edits and compare with a full re-analysis")
+    parser.add_argument('--watch', action='store_true', help="Re-analyse the file whenever it changes")
+    args = parser.parse_args()
+    if args.watch:
+        try:
+            watch(args.file)
+        except KeyboardInterrupt:
+            return 0
+    demo(load_grid(args.file), args.demo if args.demo is not None else 100)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Streaming ingest for message files larger than memory.
+Reads the '0'/'1' text in fixed-size chunks, validates it, counts ones and
+packs the bits on the fly (8 per byte) into an in-memory buffer or an
+mmap-backed file, so the ASCII text is never resident as a whole.
+Whitespace (line wrapping, trailing newline) is skipped.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+# Characters read per chunk
+CHUNK_SIZE = 1 << 20
+
+ASCII_ZERO = ord('0')
+ASCII_ONE = ord('1')
+
+# Bytes skipped anywhere in the stream (tab, newlines, vertical tab, form feed, space)
+WHITESPACE_TABLE = np.zeros(256, dtype=bool)
+WHITESPACE_TABLE[[9, 10, 11, 12, 13, 32]] = True
+
+IngestResult = namedtuple('IngestResult', ['packed', 'length', 'ones', 'is_binary'])
+
+
+def iter_text_chunks(f, chunk_size=CHUNK_SIZE):
+    """Yield raw byte chunks from a binary file object."""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_bit_chunks(chunks, stats=None):
+    """
+    Convert raw text chunks into uint8 arrays of 0/1 values.
+    If `stats` (a dict) is given, it accumulates 'length', 'ones' and
+    'is_binary' as the stream is consumed.
+    """
+    for chunk in chunks:
+        raw = np.frombuffer(chunk, dtype=np.uint8)
+        raw = raw[~WHITESPACE_TABLE[raw]]
+        if raw.size == 0:
+            continue
+        ones = raw == ASCII_ONE
+        if stats is not None:
+            stats['length'] = stats.get('length', 0) + raw.size
+            stats['ones'] = stats.get('ones', 0) + int(np.count_nonzero(ones))
+            if stats.get('is_binary', True) and not (ones | (raw == ASCII_ZERO)).all():
+                stats['is_binary'] = False
+        yield ones.view(np.uint8)
+
+
+class PackedWriter:
+    """Packs a stream of 0/1 arrays 8 bits per byte into memory or a spill file."""
+
+    def __init__(self, spill_path=None):
+        self.spill_path = spill_path
+        self._file = open(spill_path, 'wb') if spill_path else None
+        self._buffer = bytearray()
+        self._carry = np.zeros(0, dtype=np.uint8)
+
+    def write(self, bits):
+        if self._carry.size:
+            bits = np.concatenate((self._carry, bits))
+        full = bits.size // 8 * 8
+        self._emit(np.packbits(bits[:full]))
+        self._carry = bits[full:].copy()
+
+    def _emit(self, packed):
+        if self._file:
+            self._file.write(packed.tobytes())
+        else:
+            self._buffer += packed.tobytes()
+
+    def close(self):
+        """Flush the final partial byte and return the packed uint8 array."""
+        if self._carry.size:
+            self._emit(np.packbits(self._carry))
+            self._carry = np.zeros(0, dtype=np.uint8)
+        if self._file:
+            self._file.close()
+            self._file = None
+            size = _file_size(self.spill_path)
+            if size == 0:
+                return np.zeros(0, dtype=np.uint8)
+            return np.memmap(self.spill_path, dtype=np.uint8, mode='r', shape=(size,))
+        return np.frombuffer(self._buffer, dtype=np.uint8)
+
+
+def _file_size(path):
+    with open(path, 'rb') as f:
+        return f.seek(0, 2)
+
+
+def read_message(path, chunk_size=CHUNK_SIZE, spill_path=None):
+    """
+    Stream a message file into packed bits.
+    With `spill_path`, the packed bits go to that file and come back as a
+    read-only memory map, so memory use stays bounded by the chunk size.
+    """
+    stats = {}
+    writer = PackedWriter(spill_path)
+    try:
+        with open(path, 'rb') as f:
+            for bits in iter_bit_chunks(iter_text_chunks(f, chunk_size), stats):
+                writer.write(bits)
+    finally:
+        packed = writer.close()
+    return IngestResult(packed, stats.get('length', 0), stats.get('ones', 0), stats.get('is_binary', True))
+
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Merge repeated receptions of the same message into one consensus grid.
+Each capture may be partial (starting or ending anywhere in the message)
+and corrupted by flipped bits. Captures are read one at a time: each is
+aligned against the running consensus by FFT cross-correlation (the lag
+where its ±1 signal best matches the consensus), then its bits are added
+to per-bit vote sums and the capture is dropped. Only the vote sums are
+kept, so memory grows with the message length, not with the number of
+captures.
+
+Votes are either plain majority (every capture weighs 1) or confidence
+weighted: a capture's bit error rate p is estimated from its disagreement
+with the consensus so far, and its votes weigh log((1 - p) / p), the
+optimal weight for independent errors. The confidence of a bit is the
+fraction of vote weight on the winning side (0 where no capture covers it).
+
+Usage:
+    python3 merge.py capture1.txt capture2.txt capture3.txt -o consensus.arcb
+    python3 -m arecibo merge captures/*.txt -o consensus.txt --confidence confidence.png
+"""
+
+import argparse
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+import bitfile
+import export
+from get_dimensions import get_dimensions
+from grid import BitGrid, save_grid
+
+METHODS = ('weighted', 'majority')
+
+# Error rate assumed for the first capture, which has nothing to be compared with
+PRIOR_ERROR = 0.05
+
+# Error rates are clamped to this floor so a perfect capture gets a finite weight
+MIN_ERROR = 1e-3
+
+CaptureReport = namedtuple('CaptureReport', ['name', 'length', 'offset', 'overlap', 'error', 'weight'])
+
+
+def _signal(bits):
+    """Bits as a ±1 float signal."""
+    return bits.astype(np.float64) * 2 - 1
+
+
+def best_lag(frame, capture):
+    """
+    Position in `frame` (a float signal, 0 where unknown) at which the ±1
+    `capture` signal correlates best; negative when the capture starts
+    before the frame. Every lag is scored at once by one FFT cross-correlation.
+    """
+    size = 1 << (frame.size + capture.size - 1).bit_length()
+    corr = np.fft.irfft(np.fft.rfft(frame, size) * np.conj(np.fft.rfft(capture, size)), size)
+    lags = np.concatenate([np.arange(frame.size), np.arange(-(capture.size - 1), 0)])
+    values = np.concatenate([corr[:frame.size], corr[size - capture.size + 1:]])
+    return int(lags[np.argmax(values)])
+
+
+def capture_weight(error, method):
+    """Vote weight of a capture with estimated bit error rate `error`."""
+    if method == 'majority':
+        return 1.0
+    if error >= 0.5:
+        return 0.0  # no better than chance: misaligned, inverted or not this message
+    error = max(error, MIN_ERROR)
+    return float(np.log((1 - error) / error))
+
+
+class Merger:
+    """
+    Streaming consensus of aligned captures. Holds two float32 arrays over
+    the merged frame: the vote weight for 1 and the total vote weight.
+    The frame grows when a capture extends past either end.
+    """
+
+    def __init__(self, method='weighted', prior_error=PRIOR_ERROR):
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method} (expected {', '.join(METHODS)})")
+        self.method = method
+        self.prior_error = prior_error
+        self.ones = np.zeros(0, dtype=np.float32)
+        self.total = np.zeros(0, dtype=np.float32)
+        self.start = 0  # position of frame bit 0 relative to the first capture
+        self.reports = []
+
+    def __len__(self):
+        return self.total.size
+
+    def _frame_signal(self):
+        """Consensus as a signal in [-1, 1]: the weighted vote margin of every bit."""
+        signal = np.zeros(self.total.size, dtype=np.float64)
+        covered = self.total > 0
+        signal[covered] = (2 * self.ones[covered] - self.total[covered]) / self.total[covered]
+        return signal
+
+    def _extend(self, before, after):
+        if before or after:
+            self.ones = np.pad(self.ones, (before, after))
+            self.total = np.pad(self.total, (before, after))
+            self.start -= before
+
+    def add(self, bits, name=None):
+        """Align one capture (a BitGrid or 0/1 array), add its votes, and return its CaptureReport."""
+        if isinstance(bits, BitGrid):
+            bits = bits.span(0, len(bits))
+        bits = np.asarray(bits, dtype=np.uint8).reshape(-1)
+        name = name or f"capture {len(self.reports) + 1}"
+        if not bits.size:
+            report = CaptureReport(name, 0, None, 0, None, 0.0)
+            self.reports.append(report)
+            return report
+        if self.total.size:
+            lag = best_lag(self._frame_signal(), _signal(bits))
+        else:
+            lag = 0
+        self._extend(max(0, -lag), max(0, lag + bits.size - self.total.size))
+        lag = max(lag, 0)
+        window = slice(lag, lag + bits.size)
+
+        covered = self.total[window] > 0
+        overlap = int(covered.sum())
+        if overlap:
+            consensus = 2 * self.ones[window][covered] > self.total[window][covered]
+            error = float(np.count_nonzero(consensus != bits[covered].astype(bool))) / overlap
+        else:
+            error = self.prior_error
+        weight = capture_weight(error, self.method)
+        if weight > 0:
+            self.ones[window] += weight * bits
+            self.total[window] += weight
+        report = CaptureReport(name, int(bits.size), lag + self.start, overlap,
+                               error if overlap else None, weight)
+        self.reports.append(report)
+        return report
+
+    def consensus(self):
+        """The merged bits as a flat BitGrid (ties and uncovered bits are 0)."""
+        return BitGrid.from_bits(2 * self.ones > self.total)
+
+    def confidence(self):
+        """Per-bit confidence: share of the vote weight on the winning side, 0 where uncovered."""
+        confidence = np.zeros(self.total.size, dtype=np.float32)
+        covered = self.total > 0
+        confidence[covered] = np.maximum(self.ones[covered], self.total[covered] - self.ones[covered]) \
+            / self.total[covered]
+        return confidence
+
+
+def read_capture(path):
+    """Load one capture file (.arcb or '0'/'1' text) as a flat grid."""
+    if bitfile.is_bitfile(path):
+        return BitGrid.open(path)
+    grid = BitGrid.load(path)
+    if not grid.is_binary:
+        raise ValueError("message is not a 0/1 bitstream")
+    return grid
+
+
+def merge_files(paths, method='weighted'):
+    """Merge capture files, reading one at a time; returns the Merger."""
+    merger = Merger(method)
+    for path in paths:
+        merger.add(read_capture(path), path)
+    return merger
+
+
+def write_confidence(confidence, rows, cols, path):
+    """
+    Write the confidence map: .npy keeps the float values, image formats
+    (see export.py) map confidence 0..1 to grey levels 0..255.
+    """
+    shaped = confidence.reshape(rows, cols)
+    if path.endswith('.npy'):
+        np.save(path, shaped)
+        return
+    fmt = export.format_for(path)
+    if fmt not in ('pgm', 'png'):
+        raise ValueError(f"Confidence maps are written as .npy, .pgm or .png, not .{fmt}")
+    grey = [(level, level, level) for level in range(256)]
+    index = np.rint(shaped * 255).astype(np.uint8)
+    data = export.pgm_bytes(index, grey) if fmt == 'pgm' else export.png_bytes(index, grey)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def add_merge_arguments(parser):
+    parser.add_argument('inputs', nargs='+', help="Capture files (.txt or .arcb), merged in order")
+    parser.add_argument('-o', '--output', required=True,
+                        help=f"Consensus message ({bitfile.EXTENSION} for a packed file, otherwise '0'/'1' text)")
+    parser.add_argument('--method', choices=METHODS, default='weighted',
+                        help="Per-bit voting: weighted by each capture's estimated error rate, "
+                             "or plain majority (default: weighted)")
+    parser.add_argument('--confidence', metavar='FILE', default=None,
+                        help="Write the per-bit confidence map (.npy, .pgm or .png)")
+
+
+def run_merge(args):
+    """Merge for parsed command-line arguments; returns the exit code."""
+    merger = Merger(args.method)
+    for path in args.inputs:
+        try:
+            report = merger.add(read_capture(path), path)
+        except (OSError, ValueError) as e:
+            print(f"Error: {path}: {e}", file=sys.stderr)
+            return 1
+        if not report.length:
+            print(f"{report.name}: empty, skipped")
+            continue
+        error = f"{report.error:6.2%}" if report.error is not None else "     -"
+        print(f"{report.name}: {report.length:,} bits at offset {report.offset:+,}, "
+              f"error {error}, weight {report.weight:.2f}")
+    consensus = merger.consensus()
+    rows, cols = get_dimensions(len(consensus))
+    consensus = consensus.with_shape(rows, cols)
+    save_grid(consensus, args.output)
+    confidence = merger.confidence()
+    uncovered = int(np.count_nonzero(confidence == 0))
+    print(f"Wrote {args.output}: {rows} rows × {cols} columns, mean confidence "
+          f"{confidence.mean():.3f}, {uncovered:,} bits not covered")
+    if args.confidence:
+        try:
+            write_confidence(confidence, rows, cols, args.confidence)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"Wrote {args.confidence}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge repeated captures of a message by aligned voting")
+    add_merge_arguments(parser)
+    return run_merge(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
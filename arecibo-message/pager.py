@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Built-in pager for the analysis pipeline.
+Replaces the line-counting bash loop (page_output in run_analysis.sh):
+the terminal size is read once with shutil.get_terminal_size(), output is
+buffered in memory, and every line is measured by its display width with
+ANSI escapes stripped, so long and coloured lines wrap-count correctly.
+Each page is emitted with a single write. In auto mode the pager advances
+after a timed sleep; otherwise it waits for Enter.
+
+Usage:
+    with paged(auto=False, pause_time=3) as pager:
+        ...  # everything printed is paged
+"""
+
+import contextlib
+import math
+import re
+import shutil
+import sys
+import time
+import unicodedata
+
+# Colors for the prompt (same as run_analysis.sh)
+YELLOW = '\033[1;33m'
+NC = '\033[0m'  # No Color
+
+# CSI / OSC escape sequences, which take no room on screen
+ANSI_ESCAPE = re.compile(r'\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])')
+
+# Size used when the output is not a terminal
+FALLBACK_SIZE = (80, 24)
+
+# Lines taken by the prompt: a blank line and "Press Enter to continue..."
+PROMPT_LINES = 2
+
+PROMPT = f"\n{YELLOW}Press Enter to continue...{NC}\n"
+
+
+def strip_ansi(text):
+    """Text with ANSI escape sequences removed."""
+    return ANSI_ESCAPE.sub('', text)
+
+
+def display_width(line):
+    """Columns a line occupies on screen: escapes take none, wide (East Asian) characters two."""
+    text = strip_ansi(line).expandtabs(8)
+    if text.isascii():
+        return len(text)
+    width = 0
+    for ch in text:
+        if unicodedata.combining(ch) or unicodedata.category(ch) in ('Mn', 'Me', 'Cf'):
+            continue
+        width += 2 if unicodedata.east_asian_width(ch) in ('W', 'F') else 1
+    return width
+
+
+def screen_rows(line, columns):
+    """Terminal rows taken by one line once it wraps at `columns`."""
+    return max(1, math.ceil(display_width(line) / max(1, columns)))
+
+
+def page_size(rows):
+    """Lines of output per page on a terminal of `rows` lines (room is kept for the prompt)."""
+    return max(1, rows - PROMPT_LINES)
+
+
+class Pager:
+    """
+    File-like writer that pages text onto `stream`.
+    Complete lines are collected until the next one would overflow the
+    page; the page is then written at once and the pager waits (sleeps
+    `pause_time` seconds in auto mode, reads a line from `input_stream`
+    otherwise) before starting the next page. `sleep` replaces time.sleep
+    for the auto-mode pause (record.py passes a virtual clock).
+    """
+
+    def __init__(self, stream=None, auto=False, pause_time=3, input_stream=None, size=None, debug=False,
+                 sleep=None):
+        self.stream = stream or sys.stdout
+        self.auto = auto
+        self.pause_time = pause_time
+        self.sleep = sleep or time.sleep
+        self.input_stream = input_stream or sys.stdin
+        self.debug = debug
+        self.columns, rows = size or shutil.get_terminal_size(FALLBACK_SIZE)
+        self.page_lines = page_size(rows)
+        self.pages = 0
+        self.write_seconds = 0.0  # time spent measuring and writing output
+        self.wait_seconds = 0.0   # time spent paused between pages
+        self._page = []       # complete lines of the current page, not yet written
+        self._used = 0        # screen rows used on the current page
+        self._pending = ''    # text after the last newline
+        self._shown = 0       # characters of _pending already written by flush()
+        if debug:
+            print(f"[DEBUG] Terminal size: {self.columns}×{rows}, page size: {self.page_lines} lines",
+                  file=sys.stderr)
+
+    def write(self, text):
+        started = time.perf_counter()
+        lines = (self._pending + text).split('\n')
+        self._pending = lines.pop()
+        for line in lines:
+            rows = screen_rows(line, self.columns)
+            if self._used and self._used + rows > self.page_lines:
+                self._emit()
+                self._wait()
+            self._page.append(line[self._shown:] + '\n')
+            self._shown = 0
+            self._used += rows
+        self.write_seconds += time.perf_counter() - started
+        return len(text)
+
+    def _emit(self):
+        """Write the buffered page with one write."""
+        if self._page:
+            self.stream.write(''.join(self._page))
+            self._page = []
+        self.stream.flush()
+
+    def _wait(self):
+        """Pause between pages, then start a new one."""
+        started = time.perf_counter()
+        self.pages += 1
+        if self.debug:
+            print(f"[DEBUG] PAUSING after page {self.pages} ({self._used} lines)", file=sys.stderr)
+        if self.auto:
+            self.sleep(self.pause_time)
+        else:
+            self.stream.write(PROMPT)
+            self.stream.flush()
+            self.input_stream.readline()
+        self._used = 0
+        waited = time.perf_counter() - started
+        self.wait_seconds += waited
+        self.write_seconds -= waited  # _wait runs inside write()
+
+    def new_page(self):
+        """Start counting a fresh page (after the caller has paused the screen itself)."""
+        self.flush()
+        self._used = 0
+
+    def flush(self):
+        """Write everything buffered so far, including an unfinished line, without pausing."""
+        self._emit()
+        if len(self._pending) > self._shown:
+            self.stream.write(self._pending[self._shown:])
+            self._shown = len(self._pending)
+            self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+    def isatty(self):
+        return self.stream.isatty()
+
+    @property
+    def encoding(self):
+        return getattr(self.stream, 'encoding', 'utf-8')
+
+
+@contextlib.contextmanager
+def paged(auto=False, pause_time=3, debug=False):
+    """Page everything printed inside the block onto the current stdout."""
+    pager = Pager(sys.stdout, auto, pause_time, debug=debug)
+    try:
+        with contextlib.redirect_stdout(pager):
+            yield pager
+    finally:
+        pager.close()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Per-stage profiling for the analysis pipeline (`arecibo run --profile`).
+Every stage records wall time, CPU time, memory allocated while it ran
+(tracemalloc peak above the level at its start) and the number of bits it
+processed. Stages nest, and functions can be instrumented in place (e.g.
+the factorization inside load_grid), so the time of Python startup, file
+reading, factorization, each step and the pager can be told apart. At the
+end a summary table is printed and a Chrome trace-event JSON file is
+written (open it in chrome://tracing or https://ui.perfetto.dev).
+Optionally each top-level stage is also run under cProfile and its
+statistics dumped to a .prof file (view with `python3 -m pstats`).
+"""
+
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+DEFAULT_TRACE = 'arecibo-trace.json'
+
+# Frames kept per tracemalloc allocation; 1 keeps the overhead low
+TRACEMALLOC_FRAMES = 1
+
+
+def process_start_time():
+    """
+    Wall-clock time (time.time() scale) at which this process started,
+    from /proc on Linux; None where that is not available.
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/stat') as f:
+            boot = next(int(line.split()[1]) for line in f if line.startswith('btime '))
+        return boot + int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, StopIteration):
+        return None
+
+
+class _Frame:
+    __slots__ = ('name', 'start', 'cpu', 'memory', 'peak', 'args')
+
+    def __init__(self, name, start, cpu, memory, args):
+        self.name = name
+        self.start = start
+        self.cpu = cpu
+        self.memory = memory
+        self.peak = memory
+        self.args = args
+
+
+class Profiler:
+    """
+    Records nested stages. With `enabled=False` every method is a no-op,
+    so callers can profile unconditionally.
+    """
+
+    def __init__(self, enabled=True, memory=True, cprofile_dir=None):
+        self.enabled = enabled
+        self.memory = memory and enabled
+        self.cprofile_dir = cprofile_dir if enabled else None
+        self.records = []     # (name, depth, start, wall, cpu, allocated, bits, args)
+        self.totals = {}      # name -> seconds, for time accumulated outside stages
+        self._stack = []
+        self._cprofile_count = 0
+        self.origin = time.perf_counter()
+        self.origin_wall = time.time()
+        if not enabled:
+            return
+        started = process_start_time()
+        if started is not None and started < self.origin_wall:
+            # Interpreter startup and imports, up to the creation of the profiler
+            startup = self.origin_wall - started
+            self.records.append(('startup', 0, -startup, startup, time.process_time(), None, 0,
+                                 {'note': 'interpreter start to profiler creation'}))
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    @contextlib.contextmanager
+    def stage(self, name, bits=0, cprofile=False, **args):
+        """
+        Time the block as stage `name`; extra keyword arguments go into the
+        trace. The block receives the argument dict and may add to it (a
+        'bits' entry sets the bit count once it is known).
+        """
+        if not self.enabled:
+            yield args
+            return
+        memory = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            memory = current
+        profile = None
+        if cprofile and self.cprofile_dir and not self._stack:
+            profile = cProfile.Profile()
+        frame = _Frame(name, time.perf_counter(), time.process_time(), memory, args)
+        self._stack.append(frame)
+        if profile is not None:
+            profile.enable()
+        try:
+            yield args
+        finally:
+            if profile is not None:
+                profile.disable()
+            wall = time.perf_counter() - frame.start
+            cpu = time.process_time() - frame.cpu
+            self._stack.pop()
+            allocated = None
+            if self.memory:
+                peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+                allocated = peak - frame.memory
+                if self._stack:
+                    self._stack[-1].peak = max(self._stack[-1].peak, peak)
+            if profile is not None:
+                args['cprofile'] = self._dump(profile, name)
+            bits = args.pop('bits', bits)
+            self.records.append((name, len(self._stack), frame.start - self.origin, wall, cpu,
+                                 allocated, bits, args))
+
+    def _dump(self, profile, name):
+        os.makedirs(self.cprofile_dir, exist_ok=True)
+        self._cprofile_count += 1
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', name).strip('-').lower()
+        path = os.path.join(self.cprofile_dir, f"{self._cprofile_count:02d}-{slug}.prof")
+        profile.dump_stats(path)
+        return path
+
+    @contextlib.contextmanager
+    def instrumented(self, owner, attribute, name=None, bits=None):
+        """
+        Record every call of owner.attribute (a module or class function) as
+        a stage; `bits`, if given, computes the bit count from the call's arguments.
+        """
+        if not self.enabled:
+            yield
+            return
+        original = getattr(owner, attribute)
+
+        @functools.wraps(original)
+        def wrapper(*a, **k):
+            with self.stage(name or attribute, bits(*a, **k) if bits else 0):
+                return original(*a, **k)
+
+        setattr(owner, attribute, wrapper)
+        try:
+            yield
+        finally:
+            setattr(owner, attribute, original)
+
+    def add_total(self, name, seconds):
+        """Account time measured elsewhere (e.g. by the pager) under `name`."""
+        if self.enabled:
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+    # -- output -----------------------------------------------------------
+
+    def summary(self):
+        """Summary table text: one line per stage, nested stages indented."""
+        lines = [f"{'Stage':34s} {'Wall ms':>10s} {'CPU ms':>10s} {'Alloc KB':>10s} {'Bits':>12s}",
+                 "-" * 80]
+        total = sum(r[3] for r in self.records if r[1] == 0)
+        for name, depth, start, wall, cpu, allocated, bits, args in sorted(self.records, key=lambda r: (r[2], r[1])):
+            label = ('  ' * depth + name)[:34]
+            alloc = f"{allocated / 1024:10.1f}" if allocated is not None else f"{'':10s}"
+            note = " (cached)" if args.get('cached') else ""
+            lines.append(f"{label:34s} {wall * 1000:10.3f} {cpu * 1000:10.3f} {alloc} {bits:12,d}{note}")
+        for name, seconds in self.totals.items():
+            lines.append(f"{name:34s} {seconds * 1000:10.3f}")
+        lines.append("-" * 80)
+        lines.append(f"{'Total (top-level stages)':34s} {total * 1000:10.3f}")
+        return '\n'.join(lines)
+
+    def trace_events(self):
+        """Chrome trace events: one complete ('X') event per stage, timestamps in µs."""
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': 'arecibo'}}]
+        startup = next((r[3] for r in self.records if r[0] == 'startup'), 0.0)
+        for name, depth, start, wall, cpu, allocated, bits, args in self.records:
+            event_args = {'cpu_ms': round(cpu * 1000, 3), 'bits': bits, **args}
+            if name == 'startup':
+                event_args = dict(args)
+            if allocated is not None:
+                event_args['allocated_bytes'] = allocated
+            events.append({'name': name, 'cat': 'stage', 'ph': 'X', 'pid': pid, 'tid': 0,
+                           'ts': round((start + startup) * 1e6, 1), 'dur': round(wall * 1e6, 1),
+                           'args': event_args})
+        end = max((r[2] + r[3] for r in self.records), default=0.0) + startup
+        for name, seconds in self.totals.items():
+            events.append({'name': name, 'cat': 'total', 'ph': 'C', 'pid': pid, 'tid': 0,
+                           'ts': round(end * 1e6, 1), 'args': {'ms': round(seconds * 1000, 3)}})
+        return events
+
+    def write_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, f)
+
+    def report(self, trace_path=None, stream=None):
+        """Print the summary and write the trace file (if a path is given)."""
+        if not self.enabled:
+            return
+        stream = stream or sys.stdout
+        stream.write("\nProfile:\n" + self.summary() + "\n")
+        if trace_path:
+            self.write_trace(trace_path)
+            stream.write(f"Trace written to {trace_path}\n")
+        if self.cprofile_dir:
+            stream.write(f"cProfile statistics in {self.cprofile_dir}/ (python3 -m pstats FILE)\n")
+        stream.flush()
+
+    def stop(self):
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Offline recorder for paced demo output.
+Runs the pipeline once, exactly as run_analysis_auto.sh would, but against
+a virtual clock: the pager splits the output into pages at the recording's
+terminal size, and every pause (between pages and between steps) advances
+the clock instead of sleeping. Each page becomes one output event of an
+asciinema v2 .cast file, stamped with the virtual time it would have
+appeared at. A recording that takes minutes in a real terminal is written
+in well under a second.
+
+The timings the steps print (hypotheses scored per second) read the same
+virtual clock, which advances TICK seconds per reading, so a recording is
+byte-for-byte the same on every run.
+
+Usage:
+    python3 record.py demo.cast
+    python3 -m arecibo record demo.cast --color --size 100x30 --pause-time 5
+    asciinema play demo.cast
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import types
+
+import bitfields
+from grid import MESSAGE_FILE
+from pager import Pager
+from render import MODES
+
+# Terminal size of the recording (columns, rows)
+DEFAULT_SIZE = (100, 30)
+
+# Steps run_analysis_auto.sh runs
+DEFAULT_STEPS = '1-6,complete'
+
+# Seconds the virtual clock advances every time a step reads it
+TICK = 0.001
+
+# Seconds the last page stays on screen
+HOLD_TIME = 3.0
+
+# Modules whose printed timings read the virtual clock instead of time
+TIMED_MODULES = (bitfields,)
+
+
+class VirtualClock:
+    """Time that passes only when the recording sleeps (or a step reads the clock)."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+    def perf_counter(self):
+        self.now += TICK
+        return self.now
+
+
+class CastWriter:
+    """
+    File-like sink collecting asciinema output events. Text is stamped
+    with the clock's current time; newlines become CR LF as a terminal
+    would emit them.
+    """
+
+    def __init__(self, clock, columns, rows):
+        self.clock = clock
+        self.columns = columns
+        self.rows = rows
+        self.events = []
+
+    def write(self, text):
+        if text:
+            self.events.append((round(self.clock.now, 6), 'o', text.replace('\n', '\r\n')))
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return True
+
+    @property
+    def encoding(self):
+        return 'utf-8'
+
+    def header(self, title=None):
+        header = {'version': 2, 'width': self.columns, 'height': self.rows,
+                  'env': {'TERM': 'xterm-256color'}}
+        if title:
+            header['title'] = title
+        return header
+
+    def dump(self, f, title=None):
+        """Write the .cast file: the header line, then one JSON array per event."""
+        f.write(json.dumps(self.header(title), ensure_ascii=False) + '\n')
+        for event in self.events:
+            f.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+
+@contextlib.contextmanager
+def virtual_timings(clock, modules=TIMED_MODULES):
+    """Make the given modules read `clock` where they would read the time module."""
+    saved = [(module, module.time) for module in modules]
+    for module in modules:
+        module.time = types.SimpleNamespace(perf_counter=clock.perf_counter)
+    try:
+        yield
+    finally:
+        for module, original in saved:
+            module.time = original
+
+
+def record(steps=DEFAULT_STEPS, path=MESSAGE_FILE, size=DEFAULT_SIZE, pause_time=3, color_output=False,
+           mode='full', hold_time=HOLD_TIME):
+    """Run the pipeline on a virtual clock; returns the CastWriter holding the recording."""
+    # arecibo imports this module for its 'record' subcommand
+    from arecibo import parse_steps, run_pipeline
+
+    clock = VirtualClock()
+    columns, rows = size
+    cast = CastWriter(clock, columns, rows)
+    screen = Pager(cast, auto=True, pause_time=pause_time, size=size, sleep=clock.sleep)
+    with virtual_timings(clock), contextlib.redirect_stdout(screen):
+        run_pipeline(parse_steps(steps), path, color_output, 'auto', pause_time, mode=mode,
+                     screen=screen, sleep=clock.sleep)
+        screen.close()
+    clock.sleep(hold_time)
+    cast.events.append((round(clock.now, 6), 'o', ''))
+    return cast
+
+
+def write_frames(cast, directory):
+    """Write every output event as its own numbered frame file (text with ANSI colours)."""
+    os.makedirs(directory, exist_ok=True)
+    for index, (_, _, text) in enumerate(e for e in cast.events if e[2]):
+        with open(os.path.join(directory, f"frame-{index + 1:04d}.ans"), 'w', encoding='utf-8') as f:
+            f.write(text.replace('\r\n', '\n'))
+
+
+def parse_size(spec):
+    """Parse a terminal size such as '100x30'."""
+    columns, sep, rows = spec.lower().partition('x')
+    if not sep or not columns.isdigit() or not rows.isdigit() or int(columns) < 1 or int(rows) < 3:
+        raise ValueError(f"Invalid terminal size: {spec} (expected COLUMNSxROWS, e.g. 100x30)")
+    return int(columns), int(rows)
+
+
+def add_record_arguments(parser):
+    parser.add_argument('output', help="asciinema v2 recording to write (.cast)")
+    parser.add_argument('-f', '--file', default=MESSAGE_FILE, help=f"Message file (default: {MESSAGE_FILE})")
+    parser.add_argument('--steps', default=DEFAULT_STEPS, help=f"Steps to record (default: {DEFAULT_STEPS})")
+    parser.add_argument('-c', '--color', action='store_true', help="Record coloured output")
+    parser.add_argument('--render', choices=MODES, default='full', help="Bitmap rendering (default: full)")
+    parser.add_argument('--size', default=f"{DEFAULT_SIZE[0]}x{DEFAULT_SIZE[1]}",
+                        help=f"Terminal size COLUMNSxROWS (default: {DEFAULT_SIZE[0]}x{DEFAULT_SIZE[1]})")
+    parser.add_argument('-t', '--pause-time', type=float, default=3,
+                        help="Virtual seconds between pages and steps (default: 3)")
+    parser.add_argument('--title', default=None, help="Title stored in the recording")
+    parser.add_argument('--frames', metavar='DIR', default=None,
+                        help="Also write every page as a numbered frame file in DIR")
+
+
+def run_record(args):
+    """Write a recording for parsed command-line arguments; returns the exit code."""
+    try:
+        size = parse_size(args.size)
+        cast = record(args.steps, args.file, size, args.pause_time, args.color, args.render)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    with open(args.output, 'w', encoding='utf-8') as f:
+        cast.dump(f, args.title)
+    if args.frames:
+        write_frames(cast, args.frames)
+    pages = sum(1 for e in cast.events if e[2])
+    print(f"Wrote {args.output}: {pages} pages, {cast.events[-1][0]:.1f} s of virtual time", file=sys.stderr)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record paced pipeline output as an asciinema cast, offline")
+    add_record_arguments(parser)
+    return run_record(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Buffered terminal renderer for bit grids.
+Packed bytes are translated through precomputed lookup tables (byte ->
+8 glyph code points), so a whole block of rows becomes text in a few
+array operations. Row colours are computed once from the section layout,
+and each frame is written with a single sys.stdout.write.
+
+Modes:
+  full   - one character per bit ('█' / ' ')
+  half   - two rows per character ('▀', '▄', '█')
+  braille - 2 × 4 bits per character (U+2800 block)
+"""
+
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+# ANSI color codes
+RESET = '\033[0m'
+CYAN = '\033[96m'      # Numbers (header)
+GREEN = '\033[92m'     # Atomic numbers (between header and last bar)
+YELLOW = '\033[93m'    # DNA structure (dense bars)
+RED = '\033[91m'       # Human figure
+BLUE = '\033[94m'      # Bottom section (footer)
+WHITE = '\033[97m'     # Other data
+
+COLOR_NAMES = {CYAN: "Cyan", GREEN: "Green", YELLOW: "Yellow", RED: "Red", BLUE: "Blue", WHITE: "White"}
+
+MODES = ('full', 'half', 'braille')
+
+# Rows and columns of bits drawn by one character cell in each mode
+CELL_SHAPE = {'full': (1, 1), 'half': (2, 1), 'braille': (4, 2)}
+
+HALF_BLOCKS = np.array([ord(c) for c in ' ▄▀█'], dtype=np.uint32)  # index: top * 2 + bottom
+
+# Braille dot bit for each (row, col) of the 4 × 2 cell
+BRAILLE_BASE = 0x2800
+BRAILLE_DOTS = np.array([[0x01, 0x08], [0x02, 0x10], [0x04, 0x20], [0x40, 0x80]], dtype=np.uint32)
+
+
+@lru_cache(maxsize=None)
+def glyph_table(one='█', zero=' '):
+    """(256, 8) table of code points: the 8 glyphs drawn for every byte value."""
+    bits = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1)
+    return np.where(bits == 1, ord(one), ord(zero)).astype(np.uint32)
+
+
+def _codes_to_lines(codes):
+    """Turn a (rows, width) array of code points into one string per row."""
+    if codes.size == 0:
+        return [''] * codes.shape[0]
+    text = np.ascontiguousarray(codes, dtype='<u4').tobytes().decode('utf-32-le')
+    width = codes.shape[1]
+    return [text[i:i + width] for i in range(0, len(text), width)]
+
+
+def _packed_blocks(grid):
+    """Yield (first_row, packed rows) blocks, one byte row per grid row."""
+    if grid.row_bytes is not None:
+        yield 0, grid.packed_rows
+        return
+    for start, block in grid.iter_row_blocks():
+        yield start, np.packbits(block, axis=1)
+
+
+def render_full(grid, one='█', zero=' '):
+    """One string per grid row, one character per bit, via the byte glyph table."""
+    table = glyph_table(one, zero)
+    lines = []
+    for _, packed in _packed_blocks(grid):
+        codes = table[packed].reshape(packed.shape[0], -1)[:, :grid.cols]
+        lines.extend(_codes_to_lines(codes))
+    return lines
+
+
+def _cells(grid, cell_rows, cell_cols):
+    """Grid bits padded with zeros to whole cells, as (cell rows, cell_rows, cell cols, cell_cols)."""
+    bits = grid.to_array()
+    pad_rows = (-bits.shape[0]) % cell_rows
+    pad_cols = (-bits.shape[1]) % cell_cols
+    bits = np.pad(bits, ((0, pad_rows), (0, pad_cols)))
+    return bits.reshape(bits.shape[0] // cell_rows, cell_rows, bits.shape[1] // cell_cols, cell_cols)
+
+
+def render_half(grid):
+    """One string per pair of grid rows: upper/lower half blocks."""
+    cells = _cells(grid, 2, 1)
+    index = cells[:, 0, :, 0].astype(np.intp) * 2 + cells[:, 1, :, 0]
+    return _codes_to_lines(HALF_BLOCKS[index])
+
+
+def render_braille(grid):
+    """One string per four grid rows: braille characters holding 2 × 4 bits each."""
+    cells = _cells(grid, 4, 2).astype(np.uint32)
+    dots = np.einsum('aibj,ij->ab', cells, BRAILLE_DOTS)
+    return _codes_to_lines(dots + BRAILLE_BASE)
+
+
+def render_lines(grid, mode='full'):
+    """Render a grid in the given mode; returns one string per character row."""
+    if mode == 'full':
+        return render_full(grid)
+    if mode == 'half':
+        return render_half(grid)
+    if mode == 'braille':
+        return render_braille(grid)
+    raise ValueError(f"Unknown render mode: {mode} (expected one of {', '.join(MODES)})")
+
+
+def format_rows(rows):
+    """Compress sorted row numbers into text such as '11-13, 16, 18-19'."""
+    parts = []
+    for row in rows:
+        if parts and row == parts[-1][1] + 1:
+            parts[-1][1] = row
+        else:
+            parts.append([row, row])
+    return ', '.join(f"{a}" if a == b else f"{a}-{b}" for a, b in parts)
+
+
+def section_colors(grid, layout, figure=None):
+    """
+    Colour of every row, computed once from the section layout:
+    header (numbers) cyan, footer blue, dense bars yellow, the figure's
+    rows red, rows between the header and the last bar above the footer
+    green, others white.
+    Returns (colors, legend) where legend lists (color, name, rows text).
+    """
+    colors = np.full(grid.rows, WHITE, dtype=object)
+    named = {}
+
+    def paint(color, name, start, end):
+        # Earlier (higher priority) sections keep their rows
+        rows = [r for r in range(start, end + 1) if colors[r] == WHITE]
+        colors[rows] = color
+        named.setdefault((color, name), []).extend(rows)
+
+    header_end = layout.header[1] if layout.header else -1
+    footer_start = layout.footer[0] if layout.footer else grid.rows
+    if layout.header:
+        paint(CYAN, "Numbers", *layout.header)
+    if layout.footer:
+        paint(BLUE, "Bottom section", *layout.footer)
+    bars = [bar for bar in layout.bars if header_end < bar[0] and bar[1] < footer_start]
+    for start, end in bars:
+        paint(YELLOW, "DNA structure", start, end)
+    if figure is not None:
+        paint(RED, "Human figure", figure.row_start, figure.row_end)
+    if bars:
+        paint(GREEN, "Atomic numbers", header_end + 1, bars[-1][1])
+
+    order = [CYAN, GREEN, YELLOW, RED, BLUE]
+    legend = [(color, name, format_rows(sorted(rows)))
+              for (color, name), rows in sorted(named.items(), key=lambda item: order.index(item[0][0]))
+              if rows]
+    return colors.tolist(), legend
+
+
+def legend_lines(legend):
+    """Colour legend text, one line per section: '  Cyan: Numbers (rows 0-9)'."""
+    return [f"  {color}{COLOR_NAMES[color]}{RESET}: {name} (rows {rows_text})" for color, name, rows_text in legend]
+
+
+def frame(lines, colors=None, start=0, step=1, label_width=2):
+    """
+    Join rendered lines into one frame of text, each prefixed with the
+    number of the first grid row it draws and wrapped in its row colour.
+    """
+    out = []
+    for k, line in enumerate(lines):
+        row = start + k * step
+        if colors is not None:
+            out.append(f"{row:{label_width}d}: {colors[min(row, len(colors) - 1)]}{line}{RESET}\n")
+        else:
+            out.append(f"{row:{label_width}d}: {line}\n")
+    return ''.join(out)
+
+
+def write_frame(text, stream=None):
+    """Write a whole frame with one buffered write."""
+    stream = stream or sys.stdout
+    stream.write(text)
+    stream.flush()
+
+
+def draw(grid, mode='full', colors=None, stream=None):
+    """Render and write a grid as a single frame; returns the number of lines drawn."""
+    lines = render_lines(grid, mode)
+    write_frame(frame(lines, colors, step=CELL_SHAPE[mode][0]), stream)
+    return len(lines)
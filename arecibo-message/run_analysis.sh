@@ -19,6 +19,8 @@ RUN_COMPLETE=prompt  # prompt, true, false
 COLOR_MODE=false
 PAGE_MODE=true  # paging enabled by default
 DEBUG_MODE=false  # debug output for troubleshooting
+CACHE_MODE=use  # use, off, refresh (cached step outputs, see cache.py)
+PROFILE_MODE=false  # per-stage timing summary and Chrome trace (see profiling.py)
 
 # Function to show help
 show_help() {
@@ -32,7 +34,11 @@ OPTIONS:
     -t, --pause-time SEC    Set pause time in seconds for auto mode (default: 3)
     -c, --color             Enable colored terminal output for visualizations
     --no-page               Disable paged output (use original continuous output)
-    --debug                  Enable debug output (shows line counting details)
+    --debug                 Enable debug output (shows page size and page breaks)
+    --no-cache              Recompute every step without reading or writing the cache
+    --refresh-cache         Recompute every step and overwrite its cached output
+    --profile               Print per-stage wall/CPU time and memory, write arecibo-trace-1-6.json
+                            (and arecibo-trace-complete.json for the complete analysis)
     --complete              Always run complete analysis (skip prompt)
     --no-complete           Skip the prompt and don't run complete analysis
     -h, --help              Show this help message
@@ -117,6 +123,18 @@ while [[ $# -gt 0 ]]; do
             DEBUG_MODE=true
             shift
             ;;
+        --no-cache)
+            CACHE_MODE=off
+            shift
+            ;;
+        --refresh-cache)
+            CACHE_MODE=refresh
+            shift
+            ;;
+        --profile)
+            PROFILE_MODE=true
+            shift
+            ;;
         -h|--help)
             show_help
             exit 0
@@ -162,125 +180,10 @@ if [ "$RUN_COMPLETE" = "prompt" ]; then
     fi
 fi
 
-# Build color flag for Python scripts
-COLOR_FLAG=""
-if [ "$COLOR_MODE" = true ]; then
-    COLOR_FLAG="--color"
-fi
-
 # Script directory
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 cd "$SCRIPT_DIR"
 
-# Function to get terminal height with fallback
-get_terminal_height() {
-    local height=24  # default fallback
-    local method=""
-    
-    # Method 1: Try environment variable first (most reliable, set by terminal)
-    if [ -n "${LINES:-}" ] && [[ "${LINES}" =~ ^[0-9]+$ ]] && [ "${LINES}" -gt 0 ]; then
-        height="${LINES}"
-        method="LINES env var"
-    # Method 2: Try stty size (most reliable when stdin may be redirected)
-    elif [ -c /dev/tty ]; then
-        local stty_size=$(stty size < /dev/tty 2>/dev/null | awk '{print $1}')
-        if [ -n "$stty_size" ] && [[ "$stty_size" =~ ^[0-9]+$ ]] && [ "$stty_size" -gt 0 ]; then
-            height="$stty_size"
-            method="stty size < /dev/tty"
-        else
-            # Fallback: try tput with /dev/tty
-            height=$(tput lines < /dev/tty 2>/dev/null || echo 24)
-            method="tput lines < /dev/tty (fallback)"
-        fi
-    # Method 3: Try regular tput (works when stdin is terminal)
-    elif [ -t 0 ]; then
-        height=$(tput lines 2>/dev/null || echo 24)
-        method="tput lines (stdin is terminal)"
-    # Method 4: Last resort - try tput anyway
-    else
-        height=$(tput lines 2>/dev/null || echo 24)
-        method="tput lines (last resort)"
-    fi
-    
-    # Debug output (only show if called from run_step, not from initial check)
-    if [ "$DEBUG_MODE" = true ] && [ "${CALLED_FROM_RUN_STEP:-false}" = "true" ]; then
-        echo "[DEBUG] Terminal height detection:" >&2
-        echo "[DEBUG]   Method used: $method" >&2
-        echo "[DEBUG]   Raw terminal height: $height" >&2
-    fi
-    
-    # Calculate available lines for Python output:
-    # Terminal height - header lines (~9 lines: main header + STEP header) - prompt (~1 line)
-    # For larger terminals, use proportionally less overhead to maximize screen usage
-    local page_size
-    if [ $height -gt 50 ]; then
-        # Very large terminal (60+): minimal overhead, maximize content
-        # Subtract only header (~9) + prompt (~1) = 10 lines overhead
-        page_size=$((height - 10))
-    elif [ $height -gt 30 ]; then
-        # Medium terminal: moderate overhead
-        page_size=$((height - 9))
-    else
-        # Small terminal: more conservative to avoid overflow
-        page_size=$((height - 8))
-    fi
-    
-    # Debug output (only show if called from run_step)
-    if [ "$DEBUG_MODE" = true ] && [ "${CALLED_FROM_RUN_STEP:-false}" = "true" ]; then
-        echo "[DEBUG]   Calculated page size: $page_size lines" >&2
-    fi
-    
-    echo $page_size
-}
-
-# Function to page output by counting lines and pausing at terminal height
-page_output() {
-    local max_lines=$1
-    local line_count=0
-    local IFS=''
-    
-    # Debug output (minimal - only show pause events)
-    # Removed initial call message to reduce verbosity
-    
-    # Open terminal for reading (file descriptor 3)
-    exec 3< /dev/tty
-    
-    while IFS= read -r line; do
-        echo "$line"
-        ((line_count++))
-        
-        # Debug output every 20 lines (reduced verbosity for cleaner output)
-        if [ "$DEBUG_MODE" = true ] && [ $((line_count % 20)) -eq 0 ] && [ $line_count -gt 0 ]; then
-            echo "[DEBUG] Line count: $line_count / $max_lines" >&2
-        fi
-        
-        if [ $line_count -ge $max_lines ]; then
-            if [ "$DEBUG_MODE" = true ]; then
-                echo "[DEBUG] PAUSING at line $line_count (max_lines=$max_lines)" >&2
-            fi
-            
-            if [ "$AUTO_MODE" = true ]; then
-                sleep "$PAUSE_TIME"
-            else
-                echo ""
-                echo -e "${YELLOW}Press Enter to continue...${NC}"
-                # Read from terminal (fd 3), not from stdin (which is the pipe)
-                read -r <&3
-            fi
-            line_count=0
-            
-            if [ "$DEBUG_MODE" = true ]; then
-                echo "[DEBUG] Resuming, line_count reset to 0" >&2
-            fi
-        fi
-    done
-    
-    # Close file descriptor
-    exec 3<&-
-    
-    # Removed final debug message to reduce verbosity
-}
-
 # Display header
 echo -e "${BLUE}========================================${NC}"
 if [ "$AUTO_MODE" = true ]; then
@@ -299,9 +202,6 @@ if [ "$PAGE_MODE" = true ]; then
 fi
 if [ "$DEBUG_MODE" = true ]; then
     echo -e "${YELLOW}Debug mode: Enabled${NC}"
-    echo "[DEBUG] Script start - checking terminal detection..." >&2
-    test_height=$(get_terminal_height)
-    echo "[DEBUG] Initial terminal height check: $test_height lines" >&2
 fi
 echo ""
 
@@ -326,73 +226,45 @@ pause() {
     fi
 }
 
-# Function to run a step script
-run_step() {
-    local step_num=$1
-    local script_name=$2
-    local description=$3
-    
-    echo -e "${GREEN}========================================${NC}"
-    echo -e "${GREEN}STEP $step_num: $description${NC}"
-    echo -e "${GREEN}========================================${NC}"
-    echo ""
-    
-    if [ ! -f "$script_name" ]; then
-        echo -e "${YELLOW}Warning: $script_name not found, skipping...${NC}"
-        return
+# Function to run analysis steps in a single Python process
+# The pipeline loads the message and factorizes its length once, prints the
+# step banners and pauses between steps itself (timed in auto mode)
+run_steps() {
+    local steps=$1
+    local args=(-m arecibo run --steps "$steps")
+
+    if [ "$COLOR_MODE" = true ]; then
+        args+=(--color)
     fi
-    
-    # Run script with paged output (default behavior)
-    if [ "$PAGE_MODE" != false ]; then
-        CALLED_FROM_RUN_STEP=true
-        local terminal_height=$(get_terminal_height)
-        unset CALLED_FROM_RUN_STEP
-        
-        if [ "$DEBUG_MODE" = true ]; then
-            echo "[DEBUG] run_step() - script: $script_name, page size: $terminal_height lines" >&2
-        fi
-        
-        # Use -u flag for unbuffered output to ensure paging works correctly
-        if [ "$COLOR_MODE" = true ] && ([[ "$script_name" == *"step2"* ]] || [[ "$script_name" == *"step4"* ]] || [[ "$script_name" == *"decode_analysis"* ]]); then
-            python3 -u "$script_name" $COLOR_FLAG 2>&1 | page_output "$terminal_height"
-        else
-            python3 -u "$script_name" 2>&1 | page_output "$terminal_height"
-        fi
+    if [ "$AUTO_MODE" = true ]; then
+        args+=(--auto --pause-time "$PAUSE_TIME")
     else
-        # Original behavior (no paging) - only when --no-page is used
-        if [ "$COLOR_MODE" = true ] && ([[ "$script_name" == *"step2"* ]] || [[ "$script_name" == *"step4"* ]] || [[ "$script_name" == *"decode_analysis"* ]]); then
-            python3 "$script_name" $COLOR_FLAG
-        else
-            python3 "$script_name"
-        fi
+        args+=(--pause)
     fi
-    
-    if [ $? -eq 0 ]; then
-        echo ""
-        echo -e "${GREEN}✓ Step $step_num completed successfully${NC}"
-    else
-        echo ""
-        echo -e "${YELLOW}⚠ Step $step_num completed with warnings${NC}"
+    if [ "$CACHE_MODE" = off ]; then
+        args+=(--no-cache)
+    elif [ "$CACHE_MODE" = refresh ]; then
+        args+=(--refresh-cache)
+    fi
+    if [ "$PROFILE_MODE" = true ]; then
+        # One trace per run, so the complete analysis does not overwrite steps 1-6
+        args+=(--profile --profile-trace "arecibo-trace-${steps}.json")
     fi
-}
-
-# Run all steps in order
-run_step 1 "step1_analyze_structure.py" "Analyze Structure - Determine Grid Dimensions"
-pause
-
-run_step 2 "step2_visualize_patterns.py" "Visualize Patterns - Display Bitmap"
-pause
-
-run_step 3 "step3_identify_sections.py" "Identify Sections - Bit Density Analysis"
-pause
 
-run_step 4 "step4_find_human_figure.py" "Find Human Figure - Pattern Recognition"
-pause
+    # Paged output (default behavior): the pipeline pages itself, sizing
+    # pages once from the terminal and writing one page at a time (see pager.py)
+    if [ "$PAGE_MODE" != false ]; then
+        args+=(--page)
+        if [ "$DEBUG_MODE" = true ]; then
+            args+=(--page-debug)
+        fi
+    fi
 
-run_step 5 "step5_decode_numbers.py" "Decode Numbers - Attempt Number Decoding"
-pause
+    python3 "${args[@]}"
+}
 
-run_step 6 "step6_decode_atomic_numbers.py" "Decode Atomic Numbers - Attempt Element Decoding"
+# Run all steps in order (one interpreter, shared grid and factorization)
+run_steps "1-6"
 
 # Optional: Run complete analysis
 if [ "$RUN_COMPLETE" = true ]; then
@@ -402,7 +274,7 @@ if [ "$RUN_COMPLETE" = true ]; then
     echo -e "${BLUE}Complete Analysis${NC}"
     echo -e "${BLUE}========================================${NC}"
     echo ""
-    run_step "Complete" "decode_analysis.py" "Complete Analysis - All Steps Combined"
+    run_steps "complete"
 elif [ "$RUN_COMPLETE" = "prompt" ] && [ "$AUTO_MODE" != true ]; then
     # Prompt user in interactive mode
     pause
@@ -414,7 +286,7 @@ elif [ "$RUN_COMPLETE" = "prompt" ] && [ "$AUTO_MODE" != true ]; then
     read -r response
     if [[ "$response" =~ ^[Yy]$ ]]; then
         echo ""
-        run_step "Complete" "decode_analysis.py" "Complete Analysis - All Steps Combined"
+        run_steps "complete"
     fi
 fi
 # If RUN_COMPLETE=false, skip complete analysis entirely
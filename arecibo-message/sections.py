@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Section segmentation engine.
+Computes row and column popcounts in one vectorized pass, classifies rows
+(and columns) as dense/medium/sparse, finds section boundaries by
+run-length encoding the class vector and returns 2-D bounding boxes of the
+content blocks separated by blank rows and columns. The resulting layout
+replaces hard-coded row ranges in the later steps.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+# Density classes (thresholds are fractions of the busiest row/column)
+DENSE_FRACTION = 0.7
+SPARSE_FRACTION = 0.1
+SPARSE, MEDIUM, DENSE = 0, 1, 2
+CLASS_NAMES = {SPARSE: 'sparse', MEDIUM: 'medium', DENSE: 'dense'}
+
+# A row/column with at most this many ones separates content blocks
+BLANK_MAX = 0
+
+Section = namedtuple('Section', ['axis', 'kind', 'start', 'end'])  # end is inclusive
+Block = namedtuple('Block', ['row_start', 'row_end', 'col_start', 'col_end', 'ones'])  # inclusive
+Layout = namedtuple('Layout', ['row_counts', 'col_counts', 'sections', 'separators', 'bands',
+                               'bars', 'header', 'footer', 'blocks'])
+
+
+def density_profiles(grid):
+    """Return (row_counts, col_counts) from a single pass over the packed grid."""
+    row_counts = np.zeros(grid.rows, dtype=np.int64)
+    col_counts = np.zeros(grid.cols, dtype=np.int64)
+    for start, block in grid.iter_row_blocks():
+        row_counts[start:start + block.shape[0]] = block.sum(axis=1, dtype=np.int64)
+        col_counts += block.sum(axis=0, dtype=np.int64)
+    return row_counts, col_counts
+
+
+def top_k(counts, k, largest=True):
+    """
+    Return (index, count) pairs for the k largest (or smallest) counts,
+    ordered like a stable sort: by count, then by index. Uses
+    np.argpartition, so only the selected entries are sorted.
+    """
+    counts = np.asarray(counts)
+    k = min(k, counts.size)
+    if k <= 0:
+        return []
+    keys = -counts if largest else counts
+    kth = np.partition(keys, k - 1)[k - 1]
+    strictly = np.flatnonzero(keys < kth)
+    ties = np.flatnonzero(keys == kth)[:k - strictly.size]
+    chosen = np.concatenate((strictly, ties))
+    chosen = chosen[np.lexsort((chosen, keys[chosen]))]
+    return list(zip(chosen.tolist(), counts[chosen].tolist()))
+
+
+def classify(counts, dense_fraction=DENSE_FRACTION, sparse_fraction=SPARSE_FRACTION):
+    """Classify each entry as SPARSE, MEDIUM or DENSE relative to the maximum."""
+    counts = np.asarray(counts)
+    peak = counts.max() if counts.size else 0
+    classes = np.full(counts.size, MEDIUM, dtype=np.int8)
+    classes[counts <= peak * sparse_fraction] = SPARSE
+    classes[counts >= peak * dense_fraction] = DENSE
+    return classes
+
+
+def run_lengths(values):
+    """Run-length encode a 1-D array: returns (starts, ends_inclusive, values)."""
+    values = np.asarray(values)
+    if values.size == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, values[:0]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(values)) + 1))
+    ends = np.concatenate((starts[1:] - 1, [values.size - 1]))
+    return starts, ends, values[starts]
+
+
+def segment(counts, axis='row', dense_fraction=DENSE_FRACTION, sparse_fraction=SPARSE_FRACTION):
+    """Split a row or column profile into runs of equal density class."""
+    starts, ends, classes = run_lengths(classify(counts, dense_fraction, sparse_fraction))
+    return [Section(axis, CLASS_NAMES[int(c)], int(s), int(e))
+            for s, e, c in zip(starts.tolist(), ends.tolist(), classes.tolist())]
+
+
+def _runs_where(mask):
+    """(start, end_inclusive) pairs of the True runs in a boolean array."""
+    starts, ends, values = run_lengths(np.asarray(mask, dtype=bool))
+    return [(int(s), int(e)) for s, e, v in zip(starts.tolist(), ends.tolist(), values.tolist()) if v]
+
+
+def band_blocks(grid, row_start, row_end, blank_max=BLANK_MAX):
+    """The blocks of one band of rows, split at its blank columns."""
+    band_cols = grid.region(row_start, row_end + 1).sum(axis=0, dtype=np.int64)
+    return blocks_from_columns(row_start, row_end, band_cols, blank_max)
+
+
+def blocks_from_columns(row_start, row_end, band_cols, blank_max=BLANK_MAX):
+    """The blocks of a band given its column popcounts."""
+    return [Block(row_start, row_end, col_start, col_end, int(band_cols[col_start:col_end + 1].sum()))
+            for col_start, col_end in _runs_where(band_cols > blank_max)]
+
+
+def content_blocks(grid, row_counts=None, blank_max=BLANK_MAX):
+    """
+    Bounding boxes of content: bands of non-blank rows, each split into
+    blocks at blank columns within the band.
+    """
+    if row_counts is None:
+        row_counts = grid.row_counts()
+    blocks = []
+    for row_start, row_end in _runs_where(np.asarray(row_counts) > blank_max):
+        blocks.extend(band_blocks(grid, row_start, row_end, blank_max))
+    return blocks
+
+
+def find_layout(grid, dense_fraction=DENSE_FRACTION, sparse_fraction=SPARSE_FRACTION, blank_max=BLANK_MAX):
+    """
+    Segment the grid along both axes and derive the named regions used by
+    the other steps:
+      separators - runs of blank rows
+      bands      - runs of non-blank rows between separators
+      bars       - dense rows (solid horizontal dividers)
+      header     - rows above the separator that precedes the first bar's band
+      footer     - rows from the last separator to the end of the grid
+    Ranges are (start, end) with the end row included.
+    """
+    row_counts, col_counts = density_profiles(grid)
+    return layout_from_profiles(row_counts, col_counts,
+                                lambda start, end: band_blocks(grid, start, end, blank_max),
+                                dense_fraction, sparse_fraction, blank_max)
+
+
+def layout_from_profiles(row_counts, col_counts, blocks_of_band, dense_fraction=DENSE_FRACTION,
+                         sparse_fraction=SPARSE_FRACTION, blank_max=BLANK_MAX):
+    """
+    The layout of find_layout from row/column popcounts alone; only the
+    content blocks need the bits, through blocks_of_band(row_start, row_end).
+    """
+    sections = (segment(row_counts, 'row', dense_fraction, sparse_fraction)
+                + segment(col_counts, 'col', dense_fraction, sparse_fraction))
+    blank = row_counts <= blank_max
+    separators = _runs_where(blank)
+    bands = _runs_where(~blank)
+    bars = [(s.start, s.end) for s in sections if s.axis == 'row' and s.kind == 'dense']
+
+    header = None
+    if bars:
+        before = [sep for sep in separators if sep[1] < bars[0][0]]
+        if before and before[-1][0] > 0:
+            header = (0, before[-1][0] - 1)
+    elif bands:
+        header = bands[0]
+
+    footer = None
+    rows = len(row_counts)
+    if separators and separators[-1][1] < rows - 1:
+        footer = (separators[-1][0], rows - 1)
+
+    blocks = [block for start, end in bands for block in blocks_of_band(start, end)]
+    return Layout(row_counts, col_counts, sections, separators, bands, bars, header, footer, blocks)
+
+
+def header_range(grid, layout=None):
+    """Rows of the header section (the numbers), falling back to the first 10 rows."""
+    if layout is None:
+        layout = find_layout(grid)
+    if layout.header:
+        return layout.header
+    return (0, min(10, grid.rows) - 1)
+
+
+def atomic_block(grid, layout=None):
+    """
+    Bounds (first row, last row, first column, last column; inclusive) of
+    the atomic numbers: the last content band inside the header, after the
+    counting rows and before the first bar, cropped to its set columns and
+    without the marker rows under the digits. Falls back to rows 5-8,
+    columns 9-13 when the header has no such band.
+    """
+    if layout is None:
+        layout = find_layout(grid)
+    header_first, header_last = header_range(grid, layout)
+    bar = layout.bars[0][0] if layout.bars else grid.rows
+    bands = [(first, last) for first, last in layout.bands
+             if header_first < first <= header_last and last < bar]
+    if not bands:
+        return (min(5, grid.rows - 1), min(8, grid.rows - 1), min(9, grid.cols - 1), min(13, grid.cols - 1))
+    first, last = bands[-1]
+    cols = np.flatnonzero(grid.region(first, last + 1).any(axis=0))
+    col_first, col_last = int(cols[0]), int(cols[-1])
+    while last > first and grid.region(last, last + 1, col_first, col_last + 1).all():
+        last -= 1
+    return (first, last, col_first, col_last)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test sender standing in for a receiver: streams a message file to a live
+decoder (stream.py) over TCP, a Unix socket or a FIFO, in small chunks at
+a fixed bit rate. Writes wait on the transport's drain(), so a decoder
+that falls behind slows the sender down.
+
+Usage:
+    python3 sender.py tcp:127.0.0.1:7700 --rate 2000
+    python3 sender.py unix:/tmp/arecibo.sock -f arecibo-message.txt --chunk 23
+    python3 sender.py /tmp/bits --rate 0        # as fast as the decoder takes it
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from grid import MESSAGE_FILE
+from stream import parse_source
+
+# Seconds between connection attempts while the decoder is not listening yet
+RETRY_INTERVAL = 0.1
+
+
+async def open_sink(spec, timeout=10.0):
+    """A StreamWriter for the destination, retrying until the decoder listens."""
+    kind, address = parse_source(spec)
+    loop = asyncio.get_running_loop()
+    if kind == 'pipe':
+        # Opening a FIFO for writing blocks until the decoder opens it for reading
+        pipe = await asyncio.to_thread(open, address, 'wb', 0)
+        transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, pipe)
+        return asyncio.StreamWriter(transport, protocol, None, loop)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if kind == 'tcp':
+                _, writer = await asyncio.open_connection(*address)
+            else:
+                _, writer = await asyncio.open_unix_connection(address)
+            return writer
+        except (ConnectionRefusedError, FileNotFoundError):
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(RETRY_INTERVAL)
+
+
+async def send(path, spec, rate=2000, chunk=64):
+    """Send the file's bits in `chunk`-bit pieces at `rate` bits per second (0: unpaced)."""
+    with open(path, 'rb') as f:
+        data = bytes(b for b in f.read() if b in b'01')
+    writer = await open_sink(spec)
+    started = time.perf_counter()
+    try:
+        for offset in range(0, len(data), chunk):
+            writer.write(data[offset:offset + chunk])
+            await writer.drain()
+            if rate:
+                delay = started + (offset + chunk) / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - started
+    print(f"Sent {len(data):,} bits in {elapsed:.2f} s", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a message file to a live decoder")
+    parser.add_argument('destination', help="tcp:HOST:PORT, unix:PATH or a FIFO path")
+    parser.add_argument('-f', '--file', default=MESSAGE_FILE, help=f"Message file (default: {MESSAGE_FILE})")
+    parser.add_argument('--rate', type=float, default=2000, help="Bits per second, 0 for unpaced (default: 2000)")
+    parser.add_argument('--chunk', type=int, default=64, help="Bits per write (default: 64)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(send(args.file, args.destination, args.rate, max(1, args.chunk)))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
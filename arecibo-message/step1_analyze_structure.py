@@ -4,64 +4,75 @@ Step 1: Analyze the raw binary data structure
 Determine grid dimensions from the data itself, not assumptions.
 """
 
-data = open('arecibo-message.txt').read().strip()
+from autocorrelation import detect_widths
+from get_dimensions import candidate_dimensions, factor_pairs
+from grid import load_grid
 
-print("=" * 70)
-print("STEP 1: RAW DATA STRUCTURE ANALYSIS")
-print("=" * 70)
-print(f"\nTotal characters: {len(data)}")
-print(f"All binary (0s and 1s): {all(c in '01' for c in data)}")
-print(f"Zeros: {data.count('0')}, Ones: {data.count('1')}")
-print(f"Ratio: {data.count('1')/len(data):.2%} ones, {data.count('0')/len(data):.2%} zeros")
 
-# Factor analysis to find possible grid dimensions
-n = len(data)
-print(f"\nFactoring {n} to find possible grid dimensions:")
-print("-" * 70)
+def run(grid):
+    """Print the raw structure analysis and return the chosen (rows, cols)."""
 
-factors = []
-for i in range(1, int(n**0.5) + 1):
-    if n % i == 0:
-        factors.append((i, n // i))
-        if i != n // i:
-            factors.append((n // i, i))
+    print("=" * 70)
+    print("STEP 1: RAW DATA STRUCTURE ANALYSIS")
+    print("=" * 70)
+    print(f"\nTotal characters: {len(grid)}")
+    print(f"All binary (0s and 1s): {grid.is_binary}")
+    print(f"Zeros: {grid.zeros}, Ones: {grid.ones}")
+    print(f"Ratio: {grid.ones/len(grid):.2%} ones, {grid.zeros/len(grid):.2%} zeros")
 
-factors.sort()
+    # Factor analysis to find possible grid dimensions
+    n = len(grid)
+    print(f"\nFactoring {n} to find possible grid dimensions:")
+    print("-" * 70)
 
-print("\nPossible rectangular grid dimensions (rows × cols):")
-for r, c in factors:
-    print(f"  {r:4d} × {c:4d} = {r*c}")
+    factors = factor_pairs(n)
+    candidates = candidate_dimensions(n)
 
-# Look for reasonable aspect ratios (not too wide or tall)
-print("\nReasonable aspect ratios (between 1:4 and 4:1):")
-reasonable = []
-for r, c in factors:
-    if r == 1 or c == 1:  # Skip 1×N and N×1
-        continue
-    ratio = r/c if r <= c else c/r
-    if 1/4 <= ratio <= 4:  # More inclusive to catch 23×73 (ratio ~0.315)
-        reasonable.append((r, c))
-        print(f"  {r:4d} × {c:4d} (ratio: {ratio:.2f})")
+    print("\nPossible rectangular grid dimensions (rows × cols):")
+    for r, c in factors:
+        print(f"  {r:4d} × {c:4d} = {r*c}")
 
-# The most likely candidates are those with reasonable aspect ratios
-# For 1679, we have 23×73 and 73×23 - both are reasonable
-# We'll prefer taller format (more rows) for bitmap images
-if reasonable:
-    print(f"\nMost likely dimensions: {reasonable}")
-    # Use the one with more rows (taller format) for better visualization
-    rows, cols = max(reasonable, key=lambda x: x[0])
-    print(f"Using taller format: {rows} rows × {cols} columns")
-else:
-    # Fallback: use the pair closest to square, excluding 1×N
-    non_trivial = [(r, c) for r, c in factors if r > 1 and c > 1]
-    if non_trivial:
-        rows, cols = min(non_trivial, key=lambda x: abs(x[0]/x[1] - 1))
+    # Look for reasonable aspect ratios (not too wide or tall)
+    print("\nReasonable aspect ratios (between 1:4 and 4:1):")
+    reasonable = sorted((c for c in candidates if c.reasonable), key=lambda c: c.rows)
+    for candidate in reasonable:
+        print(f"  {candidate.rows:4d} × {candidate.cols:4d} (ratio: {candidate.ratio:.2f})")
+
+    # The most likely candidates are those with reasonable aspect ratios
+    # For 1679, we have 23×73 and 73×23 - both are reasonable
+    # Candidates are ranked with the taller format (more rows) first for bitmap images
+    rows, cols = candidates[0].rows, candidates[0].cols
+    if reasonable:
+        print(f"\nMost likely dimensions: {[(c.rows, c.cols) for c in reasonable]}")
+        print(f"Using taller format: {rows} rows × {cols} columns")
+    elif rows > 1 and cols > 1:
+        # Fallback: the pair closest to square, excluding 1×N
         print(f"\nUsing closest to square: {rows} rows × {cols} columns")
     else:
-        rows, cols = factors[1]  # Skip 1×N, use second
         print(f"\nUsing: {rows} rows × {cols} columns")
 
-print("\n" + "=" * 70)
-print("CONCLUSION: Grid dimensions determined from data factorization")
-print(f"  Rows: {rows}, Columns: {cols}")
-print("=" * 70)
+    # Cross-check with the content: which row widths make the columns line up?
+    print("\nAutocorrelation check (row widths where vertical structure lines up):")
+    estimates = detect_widths(grid, top=5)
+    for estimate in estimates:
+        exact = "exact" if estimate.remainder == 0 else f"{estimate.remainder} leftover bits"
+        print(f"  width {estimate.width:4d}: score {estimate.score:.3f} ({estimate.rows} rows, {exact})")
+    if estimates and estimates[0].width == cols:
+        print(f"Autocorrelation agrees: best width is {cols} columns")
+    elif estimates:
+        print(f"Autocorrelation prefers width {estimates[0].width} (factorization chose {cols})")
+
+    print("\n" + "=" * 70)
+    print("CONCLUSION: Grid dimensions determined from data factorization")
+    print(f"  Rows: {rows}, Columns: {cols}")
+    print("=" * 70)
+    return rows, cols
+
+
+def main():
+    """Run this step on arecibo-message.txt."""
+    run(load_grid())
+
+
+if __name__ == "__main__":
+    main()
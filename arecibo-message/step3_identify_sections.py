@@ -4,80 +4,87 @@ Step 3: Identify distinct sections by analyzing bit density
 Look for natural breaks and patterns.
 """
 
-from get_dimensions import get_dimensions
-
-# Get dimensions using helper function
-data = open('arecibo-message.txt').read().strip()
-rows, cols = get_dimensions(len(data))
-
-print("=" * 70)
-print("STEP 3: SECTION IDENTIFICATION")
-print("=" * 70)
-print(f"\nAnalyzing bit density per row to find sections...")
-
-# Count ones per row
-ones_per_row = []
-for i in range(rows):
-    row = data[i*cols:(i+1)*cols]
-    ones_per_row.append(row.count('1'))
-
-# Find rows with significant content
-print("\nRows with most '1' bits (likely content rows):")
-top_rows = sorted(enumerate(ones_per_row), key=lambda x: x[1], reverse=True)[:20]
-for i, count in top_rows:
-    print(f"  Row {i:2d}: {count:2d} ones")
-
-# Find rows with few or no ones (likely separators)
-print("\nRows with fewest '1' bits (likely separators/empty):")
-empty_rows = sorted(enumerate(ones_per_row), key=lambda x: x[1])[:20]
-for i, count in empty_rows:
-    print(f"  Row {i:2d}: {count:2d} ones")
-
-# Look for patterns in density changes
-print("\n" + "-" * 70)
-print("Bit density analysis (looking for natural breaks):")
-print("-" * 70)
-
-# Group rows by density
-dense_threshold = max(ones_per_row) * 0.7
-sparse_threshold = max(ones_per_row) * 0.1
-
-dense_sections = []
-sparse_sections = []
-current_section_start = 0
-current_type = None
-
-for i, count in enumerate(ones_per_row):
-    if count >= dense_threshold:
-        section_type = 'dense'
-    elif count <= sparse_threshold:
-        section_type = 'sparse'
-    else:
-        section_type = 'medium'
-    
-    if current_type != section_type:
-        if current_type:
-            if current_type == 'dense':
-                dense_sections.append((current_section_start, i-1))
-            elif current_type == 'sparse':
-                sparse_sections.append((current_section_start, i-1))
-        current_section_start = i
-        current_type = section_type
-
-# Add final section
-if current_type == 'dense':
-    dense_sections.append((current_section_start, rows-1))
-elif current_type == 'sparse':
-    sparse_sections.append((current_section_start, rows-1))
-
-print("\nDense content sections (rows with many ones):")
-for start, end in dense_sections:
-    print(f"  Rows {start:2d}-{end:2d}")
-
-print("\nSparse/separator sections (rows with few ones):")
-for start, end in sparse_sections:
-    print(f"  Rows {start:2d}-{end:2d}")
-
-print("\n" + "=" * 70)
-print("HYPOTHESIS: Sections identified based on bit density")
-print("=" * 70)
+from grid import load_grid
+from sections import find_layout, segment, top_k
+
+
+def find_density_sections(ones_per_row):
+    """Return (dense_sections, sparse_sections) as lists of (start_row, end_row)."""
+    row_sections = segment(ones_per_row)
+    dense_sections = [(s.start, s.end) for s in row_sections if s.kind == 'dense']
+    sparse_sections = [(s.start, s.end) for s in row_sections if s.kind == 'sparse']
+    return dense_sections, sparse_sections
+
+
+def run(grid):
+    """Print the bit-density section analysis."""
+    rows, cols = grid.shape
+
+    print("=" * 70)
+    print("STEP 3: SECTION IDENTIFICATION")
+    print("=" * 70)
+    print(f"\nAnalyzing bit density per row to find sections...")
+
+    # Row and column popcounts in one vectorized pass, then segment both axes
+    layout = find_layout(grid)
+    ones_per_row = layout.row_counts
+
+    # Find rows with significant content
+    print("\nRows with most '1' bits (likely content rows):")
+    for i, count in top_k(ones_per_row, 20):
+        print(f"  Row {i:2d}: {count:2d} ones")
+
+    # Find rows with few or no ones (likely separators)
+    print("\nRows with fewest '1' bits (likely separators/empty):")
+    for i, count in top_k(ones_per_row, 20, largest=False):
+        print(f"  Row {i:2d}: {count:2d} ones")
+
+    # Look for patterns in density changes
+    print("\n" + "-" * 70)
+    print("Bit density analysis (looking for natural breaks):")
+    print("-" * 70)
+
+    dense_sections, sparse_sections = find_density_sections(ones_per_row)
+
+    print("\nDense content sections (rows with many ones):")
+    for start, end in dense_sections:
+        print(f"  Rows {start:2d}-{end:2d}")
+
+    print("\nSparse/separator sections (rows with few ones):")
+    for start, end in sparse_sections:
+        print(f"  Rows {start:2d}-{end:2d}")
+
+    print("\nColumn density sections (columns, left to right):")
+    for section in layout.sections:
+        if section.axis == 'col':
+            print(f"  Cols {section.start:2d}-{section.end:2d}: {section.kind}")
+
+    print("\n" + "-" * 70)
+    print("Layout derived from blank rows and dense bars:")
+    print("-" * 70)
+    separators = ', '.join(f"{s}-{e}" if s != e else f"{s}" for s, e in layout.separators)
+    print(f"\nBlank separator rows: {separators or 'none'}")
+    bars = ', '.join(f"{s}-{e}" if s != e else f"{s}" for s, e in layout.bars)
+    print(f"Dense bars: {bars or 'none'}")
+    if layout.header:
+        print(f"Header (above the first bar's band): rows {layout.header[0]}-{layout.header[1]}")
+    if layout.footer:
+        print(f"Footer (after the last separator): rows {layout.footer[0]}-{layout.footer[1]}")
+
+    print(f"\nContent blocks (2-D bounding boxes, {len(layout.blocks)} found):")
+    for block in layout.blocks:
+        print(f"  Rows {block.row_start:2d}-{block.row_end:2d} × "
+              f"cols {block.col_start:2d}-{block.col_end:2d}: {block.ones:3d} ones")
+
+    print("\n" + "=" * 70)
+    print("HYPOTHESIS: Sections identified based on bit density")
+    print("=" * 70)
+
+
+def main():
+    """Run this step on arecibo-message.txt."""
+    run(load_grid())
+
+
+if __name__ == "__main__":
+    main()
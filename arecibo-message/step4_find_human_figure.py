@@ -1,79 +1,139 @@
 #!/usr/bin/env python3
 """
 Step 4: Look for recognizable shapes - human figure
-Search for anthropomorphic patterns.
+Search for anthropomorphic patterns. The figure is located by
+connected-component labelling (see components.py) instead of fixed rows.
 Supports optional color output using ANSI color codes for terminal.
 """
 
 import sys
-from get_dimensions import get_dimensions
-
-# ANSI color codes
-RESET = '\033[0m'
-RED = '\033[91m'       # Human figure (rows 40-54)
-CYAN = '\033[96m'      # Other sections for contrast
-
-# Get dimensions using helper function
-data = open('arecibo-message.txt').read().strip()
-rows, cols = get_dimensions(len(data))
-
-# Check for color output flag
-color_output = '--color' in sys.argv or '-c' in sys.argv
-
-print("=" * 70)
-print("STEP 4: PATTERN RECOGNITION - Looking for Human Figure")
-print("=" * 70)
-if color_output:
-    print("Color mode: Enabled (human figure highlighted in red)")
-print(f"\nSearching for anthropomorphic patterns...")
-print("Looking for:")
-print("  - Vertical symmetry")
-print("  - Head-like structure (smaller, centered)")
-print("  - Torso (wider)")
-print("  - Arms extending horizontally")
-print("  - Legs (vertical, possibly split)")
-
-# Visualize all rows to look for patterns
-print("\n" + "-" * 70)
-print("Full visualization (looking for human-like shape):")
-print("-" * 70)
-
-for i in range(rows):
-    row = data[i*cols:(i+1)*cols]
-    visual = ''.join('█' if bit == '1' else ' ' for bit in row)
-    ones_count = row.count('1')
-    
+
+import numpy as np
+
+from components import MIN_FIGURE_AREA, find_components, find_figure
+from grid import load_grid
+from render import RED, RESET, render_full, write_frame
+from symmetry import MIN_OVERLAP_FRACTION, best_axes, symmetry_map, window_mismatches
+
+# Heat-map shading: symmetry score below 0.6, 0.7, 0.8, 0.9 and above
+HEAT_SHADES = ' ░▒▓█'
+HEAT_LEVELS = [0.6, 0.7, 0.8, 0.9]
+
+
+def run(grid, color_output=False):
+    """Print the row-by-row search for the human figure."""
+    rows, cols = grid.shape
+
+    print("=" * 70)
+    print("STEP 4: PATTERN RECOGNITION - Looking for Human Figure")
+    print("=" * 70)
+    if color_output:
+        print("Color mode: Enabled (human figure highlighted in red)")
+    print(f"\nSearching for anthropomorphic patterns...")
+    print("Looking for:")
+    print("  - Vertical symmetry (mirror heat-map over every axis position)")
+    print("  - Head-like structure (smaller, centered)")
+    print("  - Torso (wider)")
+    print("  - Arms extending horizontally")
+    print("  - Legs (vertical, possibly split)")
+
+    # Visualize all rows to look for patterns
+    print("\n" + "-" * 70)
+    print("Full visualization (looking for human-like shape):")
+    print("-" * 70)
+
+    bits = grid.to_array()
+    ones_per_row = bits.sum(axis=1)
+
     # Look for patterns that might indicate human figure
-    # - Symmetry around center
-    center = cols // 2
-    left_half = row[:center]
-    right_half = row[center:]
-    symmetry_score = sum(1 for j in range(min(len(left_half), len(right_half))) 
-                       if left_half[-(j+1)] == right_half[j])
-    
-    # Color code: red for human figure section (rows 40-54), normal for others
-    if color_output and 40 <= i <= 54:
-        color_code = RED
-        reset_code = RESET
+    # - Symmetry around center: matching pairs about the axis between
+    #   columns cols//2 - 1 and cols//2 (taken from the full heat-map)
+    heat = symmetry_map(bits)
+    center_axis = 2 * (cols // 2) - 1
+    if center_axis >= 0:
+        symmetry_scores = (heat.overlaps[center_axis] - heat.row_mismatches[:, center_axis]) // 2
     else:
-        color_code = ''
-        reset_code = ''
-    
-    # Flag interesting rows
-    marker = ""
-    if ones_count > 5 and symmetry_score > 2:
-        marker = " <-- potential human figure part"
-    
-    print(f"Row {i:2d}: {color_code}{visual}{reset_code} | ones:{ones_count:2d} sym:{symmetry_score}{marker}")
-
-print("\n" + "=" * 70)
-print("ANALYSIS: Manually identify rows that form human figure")
-print("Look for:")
-print("  - Head: small, centered, rows ~40-47")
-print("  - Torso: wider, rows ~48-52")
-print("  - Arms: horizontal extensions, rows ~40-43")
-print("  - Legs: vertical, possibly split, rows ~53-54")
-if color_output:
-    print(f"\n{RED}Red highlighted section{RESET}: Human figure (rows 40-54)")
-    print("Use --color or -c flag to enable colored output")
-print("=" * 70)
+        symmetry_scores = np.zeros(rows, dtype=np.int64)
+
+    labels, components = find_components(grid)
+    figure = find_figure(components)
+
+    # Rows are rendered through the byte glyph table and written as one frame
+    out = []
+    for i, visual in enumerate(render_full(grid)):
+        ones_count = int(ones_per_row[i])
+        symmetry_score = int(symmetry_scores[i])
+
+        # Color code: red for the bits of the detected figure, normal for others
+        if color_output and figure is not None and figure.row_start <= i <= figure.row_end:
+            in_figure = labels[i] == figure.label
+            visual = ''.join(f"{RED}{ch}{RESET}" if hit else ch for ch, hit in zip(visual, in_figure))
+
+        # Flag interesting rows
+        marker = ""
+        if ones_count > 5 and symmetry_score > 2:
+            marker = " <-- potential human figure part"
+
+        out.append(f"Row {i:2d}: {visual} | ones:{ones_count:2d} sym:{symmetry_score}{marker}\n")
+    write_frame(''.join(out))
+
+    # Mirror symmetry over every axis position
+    usable = np.flatnonzero(heat.overlaps >= MIN_OVERLAP_FRACTION * cols)
+    row_best, row_score = best_axes(heat.row_scores, heat.overlaps)
+    print("\n" + "-" * 70)
+    print(f"Mirror-symmetry heat-map (axis columns {heat.axes[usable[0]]:g}-{heat.axes[usable[-1]]:g} "
+          f"in half-column steps; '{HEAT_SHADES[1:]}' = {HEAT_LEVELS[0]:.0%} to {HEAT_LEVELS[-1]:.0%}+):")
+    print("-" * 70)
+    for i in range(rows):
+        shades = np.digitize(heat.row_scores[i, usable], HEAT_LEVELS)
+        visual = ''.join(HEAT_SHADES[k] for k in shades.tolist())
+        print(f"Row {i:2d}: {visual} | best axis {heat.axes[row_best[i]]:4.1f} ({row_score[i]:.0%})")
+
+    # Windows of rows that are symmetric about one axis and hold content
+    window_best, window_score = best_axes(heat.window_scores, heat.overlaps)
+    window_ones = np.convolve(ones_per_row, np.ones(heat.window, dtype=np.int64), mode='valid')
+    mismatches = window_mismatches(heat.row_mismatches, heat.window)[np.arange(len(window_best)), window_best]
+    ranked = np.argsort(-(window_ones - mismatches), kind='stable')[:5]
+    print(f"\nMost symmetric {heat.window}-row windows (content minus mismatches):")
+    for i in ranked.tolist():
+        print(f"  Rows {i:2d}-{i + heat.window - 1:2d}: axis {heat.axes[window_best[i]]:4.1f}, "
+              f"{window_score[i]:.0%} symmetric, {int(window_ones[i])} ones")
+
+    # Connected components (8-connected '1' bits)
+    print("\n" + "-" * 70)
+    print(f"Connected components ({len(components)} total, area >= {MIN_FIGURE_AREA} shown):")
+    print("-" * 70)
+    print(f"{'#':>3}  {'rows':>7}  {'cols':>7}  {'area':>4}  {'centroid':>11}  {'sym':>4}")
+    for c in components:
+        if c.area < MIN_FIGURE_AREA:
+            continue
+        flag = "  <-- figure" if figure is not None and c.label == figure.label else ""
+        print(f"{c.label:3d}  {c.row_start:3d}-{c.row_end:<3d}  {c.col_start:3d}-{c.col_end:<3d}  {c.area:4d}  "
+              f"({c.centroid_row:4.1f},{c.centroid_col:4.1f})  {c.symmetry:4.2f}{flag}")
+
+    print("\n" + "=" * 70)
+    if figure is None:
+        print("ANALYSIS: No tall, symmetric component found")
+    else:
+        print(f"ANALYSIS: Human figure found at rows {figure.row_start}-{figure.row_end}, "
+              f"columns {figure.col_start}-{figure.col_end}")
+        print(f"  - Area: {figure.area} bits, centroid ({figure.centroid_row:.1f}, {figure.centroid_col:.1f})")
+        print(f"  - Mirror symmetry: {figure.symmetry:.0%} of its bits have a mirror partner")
+        print("Look for:")
+        print("  - Head: small, centered, at the top of the figure")
+        print("  - Arms: horizontal extensions below the head")
+        print("  - Torso: narrow, centered")
+        print("  - Legs: vertical, split at the bottom")
+        if color_output:
+            print(f"\n{RED}Red highlighted bits{RESET}: Human figure (rows {figure.row_start}-{figure.row_end})")
+    print("=" * 70)
+
+
+def main():
+    """Run this step on arecibo-message.txt."""
+    color_output = '--color' in sys.argv or '-c' in sys.argv
+    run(load_grid(), color_output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,155 @@
 #!/usr/bin/env python3
 """
 Step 5: Attempt to decode numbers
-Try different encoding methods to decode the first 10 rows.
+Try different encoding methods to decode the header rows (the section
+above the first dense bar, found by sections.py: rows 0-9 here).
 """
 
-from get_dimensions import get_dimensions
-
-# Get dimensions using helper function
-data = open('arecibo-message.txt').read().strip()
-rows, cols = get_dimensions(len(data))
-
-print("=" * 70)
-print("STEP 5: DECODING NUMBERS (Rows 0-9)")
-print("=" * 70)
-print("\nAttempting different decoding methods...")
-
-print("\n" + "-" * 70)
-print("Method 1: Read each row as binary number")
-print("-" * 70)
-for i in range(10):
-    row = data[i*cols:(i+1)*cols]
-    decimal = int(row, 2) if row.strip() else 0
-    visual = ''.join('█' if bit == '1' else ' ' for bit in row)
-    print(f"Row {i:2d}: {visual} | Decimal: {decimal:8d}")
-
-print("\n" + "-" * 70)
-print("Method 2: Read rightmost columns as binary")
-print("-" * 70)
-for i in range(10):
-    row = data[i*cols:(i+1)*cols]
-    # Try last 5, 6, 7, 8, 9 bits
-    for width in [5, 6, 7, 8, 9]:
-        if len(row) >= width:
-            right_part = row[-width:]
-            decimal = int(right_part, 2) if right_part.strip() else 0
-            if i == 0:  # Show format on first row
-                print(f"  Trying last {width} bits:")
-            visual = ''.join('█' if bit == '1' else ' ' for bit in right_part)
-            if decimal > 0 and decimal <= 10:
-                print(f"Row {i:2d}: {visual} | Decimal: {decimal} ✓")
-            elif i < 3:  # Show first few for debugging
-                print(f"Row {i:2d}: {visual} | Decimal: {decimal}")
-
-print("\n" + "-" * 70)
-print("Method 3: Read leftmost columns as binary")
-print("-" * 70)
-for i in range(10):
-    row = data[i*cols:(i+1)*cols]
-    # Try first 5, 6, 7, 8, 9 bits
-    for width in [5, 6, 7, 8, 9]:
-        if len(row) >= width:
-            left_part = row[:width]
-            decimal = int(left_part, 2) if left_part.strip() else 0
-            if i == 0:
-                print(f"  Trying first {width} bits:")
-            visual = ''.join('█' if bit == '1' else ' ' for bit in left_part)
-            if decimal > 0 and decimal <= 10:
-                print(f"Row {i:2d}: {visual} | Decimal: {decimal} ✓")
-            elif i < 3:
-                print(f"Row {i:2d}: {visual} | Decimal: {decimal}")
-
-print("\n" + "-" * 70)
-print("Method 4: Pattern recognition (visual digit encoding)")
-print("-" * 70)
-print("These appear to be visual representations, not binary numbers.")
-print("Each row likely represents a digit 1-10 as a pattern:")
-for i in range(10):
-    row = data[i*cols:(i+1)*cols]
-    visual = ''.join('█' if bit == '1' else ' ' for bit in row)
-    print(f"Row {i:2d}: {visual}")
-
-print("\n" + "=" * 70)
-print("CONCLUSION: Numbers appear to be pattern-encoded, not binary")
-print("Requires visual pattern matching to decode")
-print("=" * 70)
+import numpy as np
+
+from bitfields import describe, search
+from glyphs import MARGIN, read_numbers
+from grid import bits_to_int, bits_to_str, load_grid
+from sections import header_range
+
+WIDTHS = [5, 6, 7, 8, 9]
+
+# Target vocabulary for the bit-field search: the numbers 1-10
+NUMBERS = range(1, 11)
+
+
+def edge_values(bits, from_right):
+    """Decode the first/last `width` bits of every row for each width at once."""
+    values = {}
+    for width in WIDTHS:
+        if bits.shape[1] < width:
+            continue
+        part = bits[:, -width:] if from_right else bits[:, :width]
+        weights = 1 << np.arange(width - 1, -1, -1, dtype=np.int64)
+        values[width] = part.astype(np.int64) @ weights
+    return values
+
+
+def decode_numbers(grid):
+    """Return the row readings of the header rows: whole row, last and first N bits."""
+    first, last = header_range(grid)
+    return decode_number_rows(grid.region(first, last + 1), first)
+
+
+def decode_number_rows(number_rows, first=0):
+    """Readings of header rows given as a bit array starting at grid row `first`."""
+    right_values = edge_values(number_rows, from_right=True)
+    left_values = edge_values(number_rows, from_right=False)
+    result = search(number_rows, NUMBERS, top=1, origin=(first, 0))
+    return {
+        'rows': [bits_to_int(row) for row in number_rows],
+        'last_bits': {width: values.tolist() for width, values in right_values.items()},
+        'first_bits': {width: values.tolist() for width, values in left_values.items()},
+        'search': result.hypotheses[0]._asdict() if result.hypotheses else None,
+        'digits': [m.label for m in read_numbers(number_rows, NUMBERS)],
+    }
+
+
+def run(grid):
+    """Print the number decoding attempts for the header rows."""
+    rows, cols = grid.shape
+    first, last = header_range(grid)
+    number_rows = grid.region(first, last + 1)
+
+    print("=" * 70)
+    print(f"STEP 5: DECODING NUMBERS (Rows {first}-{last})")
+    print("=" * 70)
+    print("\nAttempting different decoding methods...")
+
+    print("\n" + "-" * 70)
+    print("Method 1: Read each row as binary number")
+    print("-" * 70)
+    for i, row in enumerate(number_rows, start=first):
+        decimal = bits_to_int(row)
+        visual = bits_to_str(row, '█', ' ')
+        print(f"Row {i:2d}: {visual} | Decimal: {decimal:8d}")
+
+    print("\n" + "-" * 70)
+    print("Method 2: Read rightmost columns as binary")
+    print("-" * 70)
+    right_values = edge_values(number_rows, from_right=True)
+    for i, row in enumerate(number_rows, start=first):
+        # Try last 5, 6, 7, 8, 9 bits
+        for width in WIDTHS:
+            if width in right_values:
+                decimal = int(right_values[width][i - first])
+                if i == first:  # Show format on first row
+                    print(f"  Trying last {width} bits:")
+                visual = bits_to_str(row[-width:], '█', ' ')
+                if decimal > 0 and decimal <= 10:
+                    print(f"Row {i:2d}: {visual} | Decimal: {decimal} ✓")
+                elif i < first + 3:  # Show first few for debugging
+                    print(f"Row {i:2d}: {visual} | Decimal: {decimal}")
+
+    print("\n" + "-" * 70)
+    print("Method 3: Read leftmost columns as binary")
+    print("-" * 70)
+    left_values = edge_values(number_rows, from_right=False)
+    for i, row in enumerate(number_rows, start=first):
+        # Try first 5, 6, 7, 8, 9 bits
+        for width in WIDTHS:
+            if width in left_values:
+                decimal = int(left_values[width][i - first])
+                if i == first:
+                    print(f"  Trying first {width} bits:")
+                visual = bits_to_str(row[:width], '█', ' ')
+                if decimal > 0 and decimal <= 10:
+                    print(f"Row {i:2d}: {visual} | Decimal: {decimal} ✓")
+                elif i < first + 3:
+                    print(f"Row {i:2d}: {visual} | Decimal: {decimal}")
+
+    print("\n" + "-" * 70)
+    print("Method 4: Pattern recognition (visual digit encoding)")
+    print("-" * 70)
+    print("These appear to be visual representations, not binary numbers.")
+    print("Each row likely represents a digit 1-10 as a pattern:")
+    for i, row in enumerate(number_rows, start=first):
+        visual = bits_to_str(row, '█', ' ')
+        print(f"Row {i:2d}: {visual}")
+
+    print("\n" + "-" * 70)
+    print("Method 5: Exhaustive bit-field search (target: 1-10)")
+    print("-" * 70)
+    result = search(number_rows, NUMBERS, top=5, origin=(first, 0))
+    print(f"Scored {result.searched} hypotheses in {result.seconds * 1000:.0f} ms "
+          f"({result.searched / max(result.seconds, 1e-9):,.0f}/s)")
+    for h in result.hypotheses:
+        print(f"  {describe(h)}")
+        print(f"    values {h.values} | {h.distinct} distinct, score {h.score}")
+
+    print("\n" + "-" * 70)
+    print("Method 6: Template matching (number glyphs: 3-bit columns + marker bit)")
+    print("-" * 70)
+    digits = read_numbers(number_rows, NUMBERS)
+    for m in digits:
+        # Report the glyph itself, without the blank margin columns
+        print(f"  {m.label:2d} at rows {m.row + first}-{m.row + first + m.height - 1}, "
+              f"cols {m.col + MARGIN}-{m.col + m.width - 1 - MARGIN} (score {m.score:.0%})")
+    if not digits:
+        print("  No number glyphs matched")
+
+    print("\n" + "=" * 70)
+    best = result.hypotheses[0] if result.hypotheses else None
+    if digits:
+        print(f"CONCLUSION: Numbers decoded by template matching: {' '.join(str(m.label) for m in digits)}")
+    elif best is not None and best.distinct >= len(NUMBERS) // 2:
+        print(f"CONCLUSION: Best reading covers {best.distinct} of the numbers 1-10:")
+        print(f"  {describe(best)}")
+    else:
+        print("CONCLUSION: Numbers appear to be pattern-encoded, not binary")
+        print("Requires visual pattern matching to decode")
+    print("=" * 70)
+
+
+def main():
+    """Run this step on arecibo-message.txt."""
+    run(load_grid())
+
+
+if __name__ == "__main__":
+    main()
@@ -4,73 +4,135 @@ Step 6: Attempt to decode atomic numbers
 Try different reading directions and column selections.
 """
 
-from get_dimensions import get_dimensions
-
-# Get dimensions using helper function
-data = open('arecibo-message.txt').read().strip()
-rows, cols = get_dimensions(len(data))
-
-print("=" * 70)
-print("STEP 6: DECODING ATOMIC NUMBERS")
-print("=" * 70)
-print("\nLooking for atomic numbers in sections between dense bars...")
-print("Common DNA elements: H=1, C=6, N=7, O=8, P=15")
-
-# Identify sections between bars (rows 10-12, 15-22)
-print("\n" + "-" * 70)
-print("Method 1: Read columns vertically (top to bottom)")
-print("-" * 70)
-print("Columns 0-4, rows 10-12:")
-for col in range(5):
-    bits = ''.join(data[row*cols + col] for row in range(10, 13))
-    decimal = int(bits, 2) if bits.strip() else 0
-    visual = ' '.join(data[row*cols + col] for row in range(10, 13))
-    element_match = ""
-    if decimal in [1, 6, 7, 8, 15]:
-        elements = {1: "H", 6: "C", 7: "N", 8: "O", 15: "P"}
-        element_match = f" ✓ {elements[decimal]}"
-    print(f"  Col {col}: {visual} = {decimal:2d}{element_match}")
-
-print("\nColumns 0-4, rows 15-22:")
-for col in range(5):
-    bits = ''.join(data[row*cols + col] for row in range(15, 23))
-    decimal = int(bits, 2) if bits.strip() else 0
-    visual = ' '.join(data[row*cols + col] for row in range(15, 23))
-    element_match = ""
-    if decimal in [1, 6, 7, 8, 15]:
-        elements = {1: "H", 6: "C", 7: "N", 8: "O", 15: "P"}
-        element_match = f" ✓ {elements[decimal]}"
-    print(f"  Col {col}: {visual} = {decimal:2d}{element_match}")
-
-print("\n" + "-" * 70)
-print("Method 2: Read columns vertically (bottom to top)")
-print("-" * 70)
-print("Columns 0-4, rows 15-22 (reversed):")
-for col in range(5):
-    bits = ''.join(data[row*cols + col] for row in range(22, 14, -1))
-    decimal = int(bits, 2) if bits.strip() else 0
-    element_match = ""
-    if decimal in [1, 6, 7, 8, 15]:
-        elements = {1: "H", 6: "C", 7: "N", 8: "O", 15: "P"}
-        element_match = f" ✓ {elements[decimal]}"
-    print(f"  Col {col}: Binary {bits} = {decimal:2d}{element_match}")
-
-print("\n" + "-" * 70)
-print("Method 3: Read horizontally in groups")
-print("-" * 70)
-print("Rows 11-12, trying different bit group sizes:")
-for i in [11, 12]:
-    row = data[i*cols:(i+1)*cols]
-    visual = ''.join('█' if bit == '1' else ' ' for bit in row)
-    print(f"\nRow {i}: {visual}")
-    for group_size in [4, 5, 6]:
-        groups = [row[j:j+group_size] for j in range(0, len(row), group_size)]
-        decimals = [int(g, 2) for g in groups if g.strip()]
-        matches = [d for d in decimals if d in [1, 6, 7, 8, 15]]
-        match_str = f" ✓ Matches: {matches}" if matches else ""
-        print(f"  {group_size}-bit groups: {decimals}{match_str}")
-
-print("\n" + "=" * 70)
-print("CONCLUSION: Need to determine correct encoding method")
-print("Try different columns, reading directions, and bit groupings")
-print("=" * 70)
+import numpy as np
+
+from bitfields import describe, search
+from grid import bits_to_int, bits_to_str, load_grid
+from sections import atomic_block
+
+ELEMENTS = {1: "H", 6: "C", 7: "N", 8: "O", 15: "P"}
+
+
+def column_values(block):
+    """Read every column of a bit block top to bottom as a binary number."""
+    weights = 1 << np.arange(block.shape[0] - 1, -1, -1, dtype=np.int64)
+    return weights @ block.astype(np.int64)
+
+
+def group_values(row, group_size):
+    """Split a row into fixed-width groups and decode each as a binary number."""
+    full = len(row) // group_size * group_size
+    weights = 1 << np.arange(group_size - 1, -1, -1, dtype=np.int64)
+    values = (row[:full].reshape(-1, group_size).astype(np.int64) @ weights).tolist()
+    if full < len(row):
+        values.append(bits_to_int(row[full:]))
+    return values
+
+
+def element_match(decimal, prefix):
+    """Return the element marker for a decoded value, if it is a known atomic number."""
+    if decimal in ELEMENTS:
+        return f" {prefix} {ELEMENTS[decimal]}"
+    return ""
+
+
+def decode_atomic_numbers(grid):
+    """
+    Return the column and group readings tried below (over the atomic-number
+    block in the header) and the best bit-field search hypothesis, plus the
+    element symbols matched by any of them.
+    """
+    first, last, col_first, col_last = atomic_block(grid)
+    block = grid.region(first, last + 1, col_first, col_last + 1)
+    readings = {
+        'rows': [first, last],
+        'cols': [col_first, col_last],
+        'columns': column_values(block).tolist(),
+        'columns_reversed': column_values(block[::-1]).tolist(),
+        'row_groups': {i: {size: group_values(grid.row(i), size) for size in (4, 5, 6)}
+                       for i in range(first, last + 1)},
+    }
+    result = search(grid.to_array(), ELEMENTS, top=1)
+    readings['search'] = result.hypotheses[0]._asdict() if result.hypotheses else None
+    values = readings['columns'] + readings['columns_reversed']
+    for groups in readings['row_groups'].values():
+        for decimals in groups.values():
+            values.extend(decimals)
+    if readings['search']:
+        values.extend(readings['search']['values'])
+    readings['elements'] = sorted({ELEMENTS[v] for v in values if v in ELEMENTS})
+    return readings
+
+
+def run(grid):
+    """Print the atomic number decoding attempts."""
+    rows, cols = grid.shape
+    first, last, col_first, col_last = atomic_block(grid)
+
+    print("=" * 70)
+    print("STEP 6: DECODING ATOMIC NUMBERS")
+    print("=" * 70)
+    print("\nLooking for atomic numbers in the header, between the counting rows and the first bar...")
+    print("Common DNA elements: H=1, C=6, N=7, O=8, P=15")
+
+    print("\n" + "-" * 70)
+    print("Method 1: Read columns vertically (top to bottom)")
+    print("-" * 70)
+    print(f"Columns {col_first}-{col_last}, rows {first}-{last}:")
+    block = grid.region(first, last + 1, col_first, col_last + 1)
+    for col, decimal in enumerate(column_values(block).tolist(), start=col_first):
+        visual = ' '.join(bits_to_str(block[:, col - col_first]))
+        print(f"  Col {col:2d}: {visual} = {decimal:2d}{element_match(decimal, '✓')}")
+
+    print("\n" + "-" * 70)
+    print("Method 2: Read columns vertically (bottom to top)")
+    print("-" * 70)
+    print(f"Columns {col_first}-{col_last}, rows {first}-{last} (reversed):")
+    block = block[::-1]
+    for col, decimal in enumerate(column_values(block).tolist(), start=col_first):
+        bits = bits_to_str(block[:, col - col_first])
+        print(f"  Col {col:2d}: Binary {bits} = {decimal:2d}{element_match(decimal, '✓')}")
+
+    print("\n" + "-" * 70)
+    print("Method 3: Read horizontally in groups")
+    print("-" * 70)
+    print(f"Rows {first}-{last}, trying different bit group sizes:")
+    for i in range(first, last + 1):
+        row = grid.row(i)
+        visual = bits_to_str(row, '█', ' ')
+        print(f"\nRow {i}: {visual}")
+        for group_size in [4, 5, 6]:
+            decimals = group_values(row, group_size)
+            matches = [d for d in decimals if d in ELEMENTS]
+            match_str = f" ✓ Matches: {matches}" if matches else ""
+            print(f"  {group_size}-bit groups: {decimals}{match_str}")
+
+    print("\n" + "-" * 70)
+    print("Method 4: Exhaustive bit-field search (whole grid)")
+    print("-" * 70)
+    result = search(grid.to_array(), ELEMENTS, top=5)
+    print(f"Scored {result.searched} hypotheses in {result.seconds * 1000:.0f} ms "
+          f"({result.searched / max(result.seconds, 1e-9):,.0f}/s)")
+    for h in result.hypotheses:
+        symbols = [ELEMENTS.get(v, str(v)) for v in h.values]
+        print(f"  {describe(h)}")
+        print(f"    values {h.values} = {' '.join(symbols)} | {h.distinct} distinct, score {h.score}")
+
+    print("\n" + "=" * 70)
+    best = result.hypotheses[0] if result.hypotheses else None
+    if best is not None and best.distinct == len(ELEMENTS):
+        print("CONCLUSION: All five elements found:")
+        print(f"  {describe(best)}")
+    else:
+        print("CONCLUSION: Need to determine correct encoding method")
+        print("Try different columns, reading directions, and bit groupings")
+    print("=" * 70)
+
+
+def main():
+    """Run this step on arecibo-message.txt."""
+    run(load_grid())
+
+
+if __name__ == "__main__":
+    main()
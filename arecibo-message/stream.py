@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Live decoding of a message while its bits are still arriving.
+Bits ('0'/'1' text, whitespace ignored) are read from a TCP or Unix socket
+(the decoder listens and takes one sender), a FIFO, a file or stdin. A reader
+task hands raw chunks to the decoder through a bounded asyncio queue: when
+the decoder falls behind, the queue fills, the reader stops reading and
+the socket or pipe buffer pushes back on the sender.
+
+The decoder packs the bits into a growing buffer and re-estimates the row
+width by autocorrelation each time the stream doubles in length (up to
+ESTIMATE_MAX_BITS), switching only when another width clearly scores
+higher. Once a width is known, rows are segmented as soon as they are complete, and
+events are emitted without waiting for the end of the stream:
+
+  width    - the width estimate changed (rows seen so far are re-segmented)
+  band     - a run of non-blank rows closed by a blank row, with its blocks
+  bar      - a dense (near-solid) row
+  header   - the rows above the first bar's band, with the numbers read
+             from them (glyphs.read_numbers)
+  complete - at end of stream: the full decode record (as in batch.py)
+
+Every event carries the time since the first bit and, for row events, the
+latency from the arrival of the chunk that completed the row.
+
+Usage:
+    python3 stream.py tcp:127.0.0.1:7700        # then: python3 sender.py tcp:127.0.0.1:7700
+    python3 stream.py unix:/tmp/arecibo.sock --json
+    mkfifo /tmp/bits && python3 stream.py /tmp/bits
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import stat
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from autocorrelation import autocorrelation, detect_widths, score_widths
+from batch import decode_grid
+from glyphs import read_numbers
+from grid import BitGrid
+from ingest import iter_bit_chunks
+from sections import BLANK_MAX, DENSE_FRACTION, content_blocks
+
+# Bytes requested per read from the source
+READ_SIZE = 1 << 12
+
+# Chunks that may wait between the reader and the decoder (the backpressure bound)
+QUEUE_CHUNKS = 16
+
+# First width estimate after this many bits; later ones each time the stream doubles
+FIRST_ESTIMATE_BITS = 256
+
+# Width estimates stop once this many bits have been seen (the prefix settles it)
+ESTIMATE_MAX_BITS = 1 << 20
+
+# The current width is replaced when another scores this many times higher,
+# or at least CONFIRM_MARGIN times higher at two estimates in a row
+# (structured sections, such as runs of 6-bit groups, briefly outscore the
+# true width on a short prefix)
+SWITCH_MARGIN = 1.5
+CONFIRM_MARGIN = 1.1
+
+# Headers larger than this are reported without reading their numbers (the
+# glyph templates are one cell per bit, and matching must not stall the stream)
+HEADER_MAX_BITS = 1 << 14
+
+Event = namedtuple('Event', ['kind', 'elapsed', 'bits', 'data'])
+
+
+class PackedBuffer:
+    """Append-only packed bit buffer; capacity doubles as bits arrive."""
+
+    def __init__(self, capacity=1 << 12):
+        self._packed = np.zeros(capacity, dtype=np.uint8)
+        self._carry = np.zeros(0, dtype=np.uint8)
+        self.length = 0
+
+    def append(self, bits):
+        if self._carry.size:
+            bits = np.concatenate((self._carry, bits))
+        full = bits.size // 8 * 8
+        start = (self.length - self._carry.size) // 8
+        needed = start + full // 8 + 1
+        if needed > self._packed.size:
+            grown = np.zeros(max(needed, self._packed.size * 2), dtype=np.uint8)
+            grown[:start] = self._packed[:start]
+            self._packed = grown
+        self._packed[start:start + full // 8] = np.packbits(bits[:full])
+        self.length += bits.size - self._carry.size
+        self._carry = bits[full:].copy()
+
+    def grid(self, rows=None, cols=None):
+        """The bits so far as a BitGrid (a view; valid until the next append)."""
+        stop = (self.length - self._carry.size) // 8
+        if self._carry.size:
+            self._packed[stop] = np.packbits(self._carry)[0]
+            stop += 1
+        return BitGrid(self._packed[:stop], self.length, rows, cols)
+
+
+class StreamDecoder:
+    """
+    Incremental decoder: feed() chunks of raw text as they arrive and
+    collect the events each one completes; finish() at end of stream.
+    """
+
+    def __init__(self, width=None, final=True):
+        self.buffer = PackedBuffer()
+        self.fixed_width = width
+        self.final = final
+        self.width = width
+        self.score = None
+        self.candidate = None  # width that beat the current one at the last estimate
+        self.started = None
+        self.next_estimate = FIRST_ESTIMATE_BITS
+        self.is_binary = True
+        self._reset_rows()
+
+    def _reset_rows(self):
+        self.rows_done = 0
+        self.band_start = None        # first row of the open band
+        self.blank_start = None       # first row of the open run of blank rows
+        self.separator_start = None   # first row of the blank run before the open band
+        self.header_done = False
+
+    def _event(self, kind, **data):
+        return Event(kind, time.perf_counter() - self.started, self.buffer.length, data)
+
+    def feed(self, chunk, arrived=None):
+        """Add one chunk of raw text; returns the events it completed."""
+        arrived = arrived if arrived is not None else time.perf_counter()
+        if self.started is None:
+            self.started = arrived
+        stats = {}
+        for bits in iter_bit_chunks([chunk], stats):
+            self.buffer.append(bits)
+        self.is_binary &= stats.get('is_binary', True)
+        events = []
+        while self.fixed_width is None and self.next_estimate <= min(self.buffer.length, ESTIMATE_MAX_BITS):
+            events.extend(self._estimate(self.next_estimate))
+            self.next_estimate *= 2
+        if self.width:
+            events.extend(self._rows(arrived))
+        return events
+
+    def _estimate(self, n):
+        """Re-estimate the width from the first n bits (fixed prefixes keep it independent of chunking)."""
+        ac = autocorrelation(self.buffer.grid().span(0, n))
+        widths = detect_widths(None, top=1, ac=ac)
+        if not widths or widths[0].score <= 0:
+            return []
+        if widths[0].width == self.width:
+            self.candidate = None
+            return []
+        if self.width and self.width < n:
+            current = score_widths(ac, self.width, self.width)[1][0]
+            gain = widths[0].score / current if current > 0 else float('inf')
+            confirmed = self.candidate == widths[0].width and gain >= CONFIRM_MARGIN
+            self.candidate = widths[0].width if gain >= CONFIRM_MARGIN else None
+            if gain < SWITCH_MARGIN and not confirmed:
+                return []
+        self.candidate = None
+        self.width, self.score = widths[0].width, widths[0].score
+        self._reset_rows()
+        return [self._event('width', width=self.width, score=round(self.score, 4),
+                            rows=self.buffer.length // self.width)]
+
+    def _rows(self, arrived):
+        """Segment the rows completed since the last call."""
+        cols = self.width
+        rows = self.buffer.length // cols
+        if rows <= self.rows_done:
+            return []
+        grid = self.buffer.grid().with_shape(rows, cols)
+        counts = grid.region(self.rows_done, rows).sum(axis=1, dtype=np.int64)
+        events = []
+        for i, count in enumerate(counts.tolist(), self.rows_done):
+            if count > BLANK_MAX:
+                if self.band_start is None:
+                    self.band_start, self.separator_start, self.blank_start = i, self.blank_start, None
+                if count >= DENSE_FRACTION * cols:
+                    events.append(self._row_event('bar', arrived, row=i, ones=count))
+                    if not self.header_done:
+                        events.extend(self._header(grid, arrived))
+            else:
+                if self.band_start is not None:
+                    events.append(self._band(grid, self.band_start, i - 1, arrived))
+                    self.band_start = None
+                if self.blank_start is None:
+                    self.blank_start = i
+        self.rows_done = rows
+        return events
+
+    def _row_event(self, kind, arrived, **data):
+        event = self._event(kind, **data)
+        event.data['latency_ms'] = round((time.perf_counter() - arrived) * 1000, 3)
+        return event
+
+    def _band(self, grid, start, end, arrived):
+        band = BitGrid.from_bits(grid.region(start, end + 1))
+        blocks = [(b.row_start + start, b.row_end + start, b.col_start, b.col_end, b.ones)
+                  for b in content_blocks(band)]
+        return self._row_event('band', arrived, row_start=start, row_end=end,
+                               ones=int(band.ones), blocks=blocks)
+
+    def _header(self, grid, arrived):
+        """The header: rows above the blank run that precedes the first bar's band."""
+        self.header_done = True
+        if self.separator_start is None or self.separator_start == 0:
+            return []
+        end = self.separator_start - 1
+        numbers = None
+        if (end + 1) * grid.cols <= HEADER_MAX_BITS:
+            numbers = [m.label for m in read_numbers(grid.region(0, end + 1))]
+        return [self._row_event('header', arrived, row_start=0, row_end=end, numbers=numbers)]
+
+    def finish(self):
+        """End of stream: the final band and the complete decode record."""
+        events = []
+        if self.started is None:
+            return events
+        now = time.perf_counter()
+        if self.width and self.band_start is not None:
+            grid = self.buffer.grid().with_shape(self.buffer.length // self.width, self.width)
+            events.append(self._band(grid, self.band_start, self.rows_done - 1, now))
+            self.band_start = None
+        if self.final:
+            grid = self.buffer.grid()
+            grid.is_binary = self.is_binary
+            try:
+                record = decode_grid(grid)
+            except ValueError as e:
+                record = {'error': str(e)}
+            events.append(self._event('complete', **record))
+        return events
+
+
+# -- sources ------------------------------------------------------------------
+
+def parse_source(spec):
+    """('tcp', (host, port)), ('unix', path) or ('pipe', path) from a source string."""
+    if spec.startswith('tcp:'):
+        host, _, port = spec[4:].rpartition(':')
+        if not port.isdigit():
+            raise ValueError(f"Expected tcp:HOST:PORT, got {spec}")
+        return 'tcp', (host or '127.0.0.1', int(port))
+    if spec.startswith('unix:'):
+        return 'unix', spec[5:]
+    return 'pipe', spec
+
+
+async def _accept_one(kind, address):
+    """Listen on the address and return the reader of the first connection."""
+    connected = asyncio.get_running_loop().create_future()
+
+    async def handle(reader, writer):
+        if not connected.done():
+            connected.set_result((reader, writer))
+        else:
+            writer.close()
+
+    if kind == 'tcp':
+        server = await asyncio.start_server(handle, *address)
+    else:
+        server = await asyncio.start_unix_server(handle, address)
+    print(f"Listening on {kind}:{':'.join(map(str, address)) if kind == 'tcp' else address}",
+          file=sys.stderr)
+    reader, writer = await connected
+    server.close()
+    return reader, writer
+
+
+class _FileReader:
+    """StreamReader stand-in for a regular file."""
+
+    def __init__(self, f):
+        self.f = f
+
+    async def read(self, n):
+        return await asyncio.to_thread(self.f.read, n)
+
+
+async def open_source(spec):
+    """A StreamReader for the source and a close() callback."""
+    kind, address = parse_source(spec)
+    if kind != 'pipe':
+        reader, writer = await _accept_one(kind, address)
+        return reader, writer.close
+    loop = asyncio.get_running_loop()
+    if address == '-':
+        pipe = sys.stdin.buffer
+    else:
+        # Opening a FIFO blocks until a writer opens it
+        pipe = await asyncio.to_thread(open, address, 'rb', 0)
+    if stat.S_ISREG(os.fstat(pipe.fileno()).st_mode):
+        # Regular files cannot be watched by the event loop; read them in a thread
+        return _FileReader(pipe), pipe.close
+    reader = asyncio.StreamReader(limit=READ_SIZE * 4)
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    return reader, transport.close
+
+
+async def _read(reader, queue):
+    """Reader task: raw chunks with their arrival time; None marks the end."""
+    try:
+        while True:
+            chunk = await reader.read(READ_SIZE)
+            if not chunk:
+                break
+            await queue.put((chunk, time.perf_counter()))  # waits while the queue is full
+    finally:
+        await queue.put(None)
+
+
+async def decode_stream(reader, emit, width=None, final=True, queue_chunks=QUEUE_CHUNKS):
+    """Decode everything from `reader`, calling emit(event) as events occur; returns the decoder."""
+    decoder = StreamDecoder(width, final)
+    queue = asyncio.Queue(maxsize=queue_chunks)
+    task = asyncio.create_task(_read(reader, queue))
+    try:
+        while (item := await queue.get()) is not None:
+            for event in decoder.feed(*item):
+                emit(event)
+        for event in decoder.finish():
+            emit(event)
+    finally:
+        task.cancel()
+    return decoder
+
+
+def format_event(event):
+    """One human-readable line per event."""
+    d = event.data
+    head = f"[{event.elapsed * 1000:9.1f} ms] {event.bits:>10,} bits  {event.kind:8s}"
+    latency = f" (+{d['latency_ms']:.1f} ms)" if 'latency_ms' in d else ""
+    if event.kind == 'width':
+        return f"{head} {d['width']} columns (score {d['score']:.3f}, {d['rows']} rows so far)"
+    if event.kind == 'band':
+        return (f"{head} rows {d['row_start']}-{d['row_end']}, {d['ones']} ones, "
+                f"{len(d['blocks'])} block(s){latency}")
+    if event.kind == 'bar':
+        return f"{head} row {d['row']} ({d['ones']} ones){latency}"
+    if event.kind == 'header':
+        numbers = d['numbers'] if d['numbers'] is not None else "not read (too large)"
+        return f"{head} rows {d['row_start']}-{d['row_end']}, numbers {numbers}{latency}"
+    if 'error' in d:
+        return f"{head} error: {d['error']}"
+    figure = d.get('figure')
+    figure = f", figure at rows {figure['row_start']}-{figure['row_end']}" if figure else ""
+    return f"{head} {d['rows']} rows × {d['cols']} columns{figure}, elements {d['atomic_numbers']['elements']}"
+
+
+def add_stream_arguments(parser):
+    parser.add_argument('source', help="tcp:HOST:PORT or unix:PATH to listen on, a FIFO path, or - for stdin")
+    parser.add_argument('--width', type=int, default=None, help="Row width (default: estimated as bits arrive)")
+    parser.add_argument('--json', action='store_true', help="Write events as JSON lines")
+    parser.add_argument('--no-final', action='store_true', help="Skip the complete decode at end of stream")
+
+
+async def _run(args):
+    if args.json:
+        def emit(event):
+            print(json.dumps(event._asdict()), flush=True)
+    else:
+        def emit(event):
+            print(format_event(event), flush=True)
+    reader, close = await open_source(args.source)
+    try:
+        await decode_stream(reader, emit, args.width, not args.no_final)
+    finally:
+        close()
+
+
+def run_stream(args):
+    """Decode a live stream for parsed command-line arguments; returns the exit code."""
+    try:
+        asyncio.run(_run(args))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode a message while its bits are arriving")
+    add_stream_arguments(parser)
+    return run_stream(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
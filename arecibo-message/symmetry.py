@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Bitwise mirror-symmetry analysis.
+Rows are packed into 64-bit words and reversed with a byte bit-reversal
+table, so mirroring a row about any axis is a word shift of its reversed
+copy. XOR + popcount against each shift scores every candidate axis
+position of every row at once; summing the per-row mismatches over a
+sliding window of rows scores whole shapes (such as the human figure).
+"""
+
+import functools
+from collections import namedtuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from grid import POPCOUNT_TABLE
+
+WORD_BITS = 64
+
+# Bit-reversed value of every possible byte
+REVERSE_TABLE = np.packbits(np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1)[:, ::-1], axis=1)[:, 0]
+
+# Rows of the heat-map window used to score shapes
+WINDOW_ROWS = 5
+
+# Axes whose mirror overlap covers less than this share of the row are
+# ignored when picking the best axis (near the edges almost anything matches)
+MIN_OVERLAP_FRACTION = 0.5
+
+# Upper bound on the number of words compared per vectorized step
+BLOCK_WORDS = 1 << 20
+
+SymmetryMap = namedtuple('SymmetryMap', ['axes', 'overlaps', 'row_mismatches', 'row_scores',
+                                         'window', 'window_scores'])
+
+
+def popcount_words(words):
+    """Number of set bits in every element of a uint64 array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words)
+    counts = POPCOUNT_TABLE[np.ascontiguousarray(words).view(np.uint8)]
+    return counts.reshape(words.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def pack_words(bits, words_per_row):
+    """Pack a 2-D bit array into rows of big-endian-ordered uint64 words (MSB first)."""
+    packed = np.packbits(np.asarray(bits, dtype=np.uint8), axis=1)
+    padded = np.zeros((packed.shape[0], words_per_row * 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded, padded.view('>u8').astype(np.uint64)
+
+
+def reverse_words(padded):
+    """Reverse every padded row bit by bit: byte order flipped, then each byte through REVERSE_TABLE."""
+    return REVERSE_TABLE[padded[:, ::-1]].view('>u8').astype(np.uint64)
+
+
+def axis_overlaps(cols):
+    """
+    Number of positions compared for each mirror axis. Axis a pairs column
+    j with column a - j, so a runs over 0 .. 2*cols-2 (axis position a / 2).
+    """
+    a = np.arange(2 * cols - 1)
+    return np.minimum(a, cols - 1) - np.maximum(0, a - cols + 1) + 1
+
+
+@functools.lru_cache(maxsize=8)
+def _axis_masks(cols, words_per_row):
+    """Per-axis word masks selecting the columns that have a mirror partner (cached; read-only)."""
+    a = np.arange(2 * cols - 1)[:, None]
+    j = np.arange(words_per_row * WORD_BITS)[None, :]
+    inside = (j >= np.maximum(0, a - cols + 1)) & (j <= np.minimum(cols - 1, a))
+    return np.packbits(inside, axis=1).view('>u8').astype(np.uint64)
+
+
+def mirror_mismatches(bits):
+    """
+    Mismatch counts for every row and mirror axis: entry [i, a] is the
+    number of columns j in row i with bit j != bit (a - j). Each pair is
+    counted from both sides, so a row is symmetric about a when it is 0.
+    """
+    bits = np.asarray(bits)
+    rows, cols = bits.shape
+    result = np.zeros((rows, max(0, 2 * cols - 1)), dtype=np.int64)
+    if rows == 0 or cols == 0:
+        return result
+    W = -(-cols // WORD_BITS)
+    masks = _axis_masks(cols, W)
+
+    # Axis a compares the row with its reversal shifted by D = 128W - 1 - a
+    # bits (with W zero words of padding on both sides of the reversal)
+    a = np.arange(2 * cols - 1)
+    D = 2 * W * WORD_BITS - 1 - a
+    q_of, k_of = D // WORD_BITS, D % WORD_BITS
+
+    rows_per_block = max(1, BLOCK_WORDS // (2 * W * W))
+    for start in range(0, rows, rows_per_block):
+        block = bits[start:start + rows_per_block]
+        padded, x = pack_words(block, W)
+        rp = np.zeros((block.shape[0], 3 * W), dtype=np.uint64)
+        rp[:, W:2 * W] = reverse_words(padded)
+        for k in np.unique(k_of).tolist():
+            if k == 0:
+                shifted = rp[:, :-1]
+            else:
+                shifted = (rp[:, :-1] << np.uint64(k)) | (rp[:, 1:] >> np.uint64(WORD_BITS - k))
+            axes = np.flatnonzero(k_of == k)
+            windows = sliding_window_view(shifted, W, axis=1)[:, q_of[axes], :]
+            diff = (x[:, None, :] ^ windows) & masks[axes][None, :, :]
+            result[start:start + block.shape[0], axes] = popcount_words(diff).sum(axis=2, dtype=np.int64)
+    return result
+
+
+def window_mismatches(row_mismatches, window=WINDOW_ROWS):
+    """Sum per-row mismatches over every run of `window` consecutive rows."""
+    window = max(1, min(window, row_mismatches.shape[0]))
+    totals = np.cumsum(np.vstack((np.zeros((1, row_mismatches.shape[1]), dtype=np.int64),
+                                  row_mismatches)), axis=0)
+    return totals[window:] - totals[:-window]
+
+
+def symmetry_map(bits, window=WINDOW_ROWS):
+    """
+    Heat-map of mirror symmetry: scores in [0, 1] (share of compared
+    columns that match their mirror image) for every row and every window
+    of rows, over every axis position.
+    """
+    bits = np.asarray(bits)
+    cols = bits.shape[1]
+    overlaps = axis_overlaps(cols)
+    row_mismatches = mirror_mismatches(bits)
+    row_scores = 1.0 - row_mismatches / overlaps
+    window = max(1, min(window, bits.shape[0]))
+    window_scores = 1.0 - window_mismatches(row_mismatches, window) / (overlaps * window)
+    axes = np.arange(2 * cols - 1) / 2
+    return SymmetryMap(axes, overlaps, row_mismatches, row_scores, window, window_scores)
+
+
+def best_axes(scores, overlaps, min_overlap_fraction=MIN_OVERLAP_FRACTION):
+    """
+    Best axis per heat-map row, ignoring axes with a short overlap.
+    Returns (axis indices, scores); the axis position is index / 2.
+    """
+    cols = (len(overlaps) + 1) // 2
+    usable = overlaps >= min_overlap_fraction * cols
+    masked = np.where(usable[None, :], scores, -1.0)
+    best = masked.argmax(axis=1)
+    return best, masked[np.arange(len(best)), best]
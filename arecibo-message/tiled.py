@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Tiled parallel analysis of very large grids.
+The row-aligned packed grid is copied once into shared memory and cut into
+tiles of whole rows. Worker processes attach to the shared block by name
+and analyse their tiles in place - no bits are pickled or copied - writing
+per-row results straight into shared output arrays:
+
+  density profiles - row popcounts and the tile's column popcounts, plus
+                     the column popcounts of every run of non-blank rows
+                     (bands are joined across tile edges by the parent)
+  mirror symmetry  - per-row mismatches of the tile's rows; the window
+                     totals read WINDOW_ROWS - 1 halo rows below the tile,
+                     so windows that cross a tile edge are exact
+  components       - each tile is labelled with one halo row below it;
+                     the labels that halo row gets are matched with the
+                     next tile's first row, and the parent joins the
+                     touching tile components with one union-find over
+                     tile components (not pixels)
+
+A second pass relabels every tile in place with the global labels (in the
+reading order of each component's first pixel, as components.label numbers
+them) and scores component symmetry, which only needs pixels of the same
+row. The merged layout, labels, components and symmetry equal the
+single-process results exactly.
+
+Usage:
+    python3 tiled.py --workers 16 --scale 40
+    python3 tiled.py -f huge.arcb --tile-rows 2048 --verify
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from components import Component, _union_find, find_components, find_figure, label
+from grid import MESSAGE_FILE, BitGrid, load_grid
+from sections import BLANK_MAX, blocks_from_columns, find_layout, layout_from_profiles
+from symmetry import WINDOW_ROWS, mirror_mismatches, window_mismatches
+
+# Tiles handed out per worker, so a slow tile does not leave the other workers idle
+TILES_PER_WORKER = 4
+
+# Smallest tile worth a task
+MIN_TILE_ROWS = 64
+
+TiledAnalysis = namedtuple('TiledAnalysis', ['layout', 'labels', 'components', 'figure', 'row_mismatches',
+                                             'window_mismatches', 'tiles'])
+
+# Per-tile results of the first pass. Component statistics are indexed by
+# tile-local label (entry 0 unused); first_pixel is row * cols + col of the
+# first pixel in reading order (-1 for labels only seen in the halo row).
+TileResult = namedtuple('TileResult', ['start', 'stop', 'row_counts', 'col_counts', 'bands', 'count',
+                                       'area', 'row_start', 'row_end', 'col_start', 'col_end',
+                                       'row_sums', 'col_sums', 'first_pixel', 'halo_labels'])
+
+
+# -- shared memory -------------------------------------------------------------
+
+class SharedArrays:
+    """
+    NumPy arrays in named shared-memory blocks. The creating process owns
+    and unlinks them; workers attach with attach_arrays(specs).
+    """
+
+    def __init__(self):
+        self.blocks = []
+        self.arrays = {}
+        self.specs = {}
+
+    def create(self, key, shape, dtype):
+        dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        self.blocks.append(block)
+        self.arrays[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        self.specs[key] = (block.name, shape, dtype.str)
+        return self.arrays[key]
+
+    def close(self):
+        self.arrays.clear()
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Arrays seen by the tile functions: the shared views in a worker, the
+# parent's own arrays when running in-process
+_arrays = {}
+_blocks = []
+
+
+def attach_arrays(specs):
+    """Pool initializer: map every shared array of the analysis into this process."""
+    for key, (name, shape, dtype) in specs.items():
+        # Pool workers share the parent's resource tracker, so attaching
+        # registers nothing new and only the parent's unlink releases the block
+        block = shared_memory.SharedMemory(name=name)
+        _blocks.append(block)
+        _arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+# -- tile passes ----------------------------------------------------------------
+
+def analyse_tile(start, stop, cols, window, blank_max, symmetry):
+    """First pass over rows [start, stop): profiles, bands, mismatches and tile labels."""
+    packed = _arrays['grid']
+    rows = packed.shape[0]
+    halo = max(1, window - 1) if symmetry else 1
+    bits = np.unpackbits(packed[start:min(rows, stop + halo)], axis=1, count=cols)
+    own = bits[:stop - start]
+
+    row_counts = own.sum(axis=1, dtype=np.int64)
+    col_counts = own.sum(axis=0, dtype=np.int64)
+    content = np.concatenate(([False], row_counts > blank_max, [False]))
+    edges = np.flatnonzero(np.diff(content.astype(np.int8)))
+    bands = [(start + s, start + e - 1, own[s:e].sum(axis=0, dtype=np.int64))
+             for s, e in zip(edges[::2].tolist(), edges[1::2].tolist())]
+
+    if symmetry:
+        mismatches = mirror_mismatches(bits[:min(rows, stop + window - 1) - start])
+        _arrays['mismatches'][start:stop] = mismatches[:stop - start]
+        last = min(stop, rows - window + 1)
+        if last > start:
+            _arrays['windows'][start:last] = window_mismatches(mismatches, window)[:last - start]
+
+    labels, count = label(bits[:min(rows, stop + 1) - start])
+    _arrays['labels'][start:stop] = labels[:stop - start]
+    halo_labels = labels[stop - start].copy() if stop < rows else None
+
+    pixel_rows, pixel_cols = np.nonzero(labels[:stop - start])
+    ids = labels[pixel_rows, pixel_cols]
+    pixel_rows = pixel_rows + start
+    area = np.bincount(ids, minlength=count + 1)
+    row_start = np.full(count + 1, rows)
+    row_end = np.full(count + 1, -1)
+    col_start = np.full(count + 1, cols)
+    col_end = np.full(count + 1, -1)
+    np.minimum.at(row_start, ids, pixel_rows)
+    np.maximum.at(row_end, ids, pixel_rows)
+    np.minimum.at(col_start, ids, pixel_cols)
+    np.maximum.at(col_end, ids, pixel_cols)
+    row_sums = np.bincount(ids, weights=pixel_rows, minlength=count + 1)
+    col_sums = np.bincount(ids, weights=pixel_cols, minlength=count + 1)
+    first_pixel = np.full(count + 1, -1, dtype=np.int64)
+    seen, first = np.unique(ids, return_index=True)
+    first_pixel[seen] = pixel_rows[first].astype(np.int64) * cols + pixel_cols[first]
+    return TileResult(start, stop, row_counts, col_counts, bands, count, area, row_start, row_end,
+                      col_start, col_end, row_sums, col_sums, first_pixel, halo_labels)
+
+
+def relabel_tile(start, stop, lookup, col_start, col_end):
+    """
+    Second pass: replace the tile's local labels with global ones and count,
+    per local label, the pixels whose mirror image about the component's
+    vertical centre line (given per local label) is in the same component.
+    """
+    labels = _arrays['labels'][start:stop]
+    pixel_rows, pixel_cols = np.nonzero(labels)
+    local = labels[pixel_rows, pixel_cols]
+    labels[pixel_rows, pixel_cols] = lookup[local]
+    mirror_cols = col_start[local] + col_end[local] - pixel_cols
+    matches = labels[pixel_rows, mirror_cols] == lookup[local]
+    return np.bincount(local, weights=matches, minlength=lookup.size)
+
+
+# -- merging --------------------------------------------------------------------
+
+def tile_bounds(rows, workers, tile_rows=None):
+    """(start, stop) row ranges covering the grid."""
+    if tile_rows is None:
+        tile_rows = max(MIN_TILE_ROWS, -(-rows // (workers * TILES_PER_WORKER)))
+    tile_rows = max(1, tile_rows)
+    return [(start, min(rows, start + tile_rows)) for start in range(0, rows, tile_rows)]
+
+
+def merge_bands(tiles):
+    """Join the bands of all tiles: {(row_start, row_end): column popcounts}."""
+    bands = {}
+    current = None
+    for tile in tiles:
+        for row_start, row_end, band_cols in tile.bands:
+            if current is not None and current[1] == row_start - 1:
+                current = (current[0], row_end, current[2] + band_cols)
+            else:
+                if current is not None:
+                    bands[current[:2]] = current[2]
+                current = (row_start, row_end, band_cols)
+    if current is not None:
+        bands[current[:2]] = current[2]
+    return bands
+
+
+def merge_components(tiles, labels):
+    """
+    Join tile components that touch across tile edges. Returns (lookups,
+    statistics): per tile, the global label of every local label, and the
+    global bounding boxes, areas and coordinate sums indexed by global label.
+    """
+    counts = np.array([tile.count for tile in tiles], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    total = int(offsets[-1])
+    a, b = [], []
+    for t, tile in enumerate(tiles[:-1]):
+        touching = np.flatnonzero(tile.halo_labels)
+        if touching.size:
+            # Local labels of the next tile, not yet relabelled
+            below = labels[tile.stop, touching]
+            a.append(offsets[t] + tile.halo_labels[touching] - 1)
+            b.append(offsets[t + 1] + below - 1)
+    a = np.concatenate(a) if a else np.zeros(0, dtype=np.int64)
+    b = np.concatenate(b) if b else np.zeros(0, dtype=np.int64)
+    roots = _union_find(total, a, b) if total else np.zeros(0, dtype=np.int64)
+
+    def gather(field):
+        return np.concatenate([getattr(tile, field)[1:] for tile in tiles]) if tiles else np.zeros(0)
+
+    first_pixel = gather('first_pixel')
+    has_pixels = first_pixel >= 0
+    # Number the components by their first pixel in reading order
+    group_first = np.full(total, np.iinfo(np.int64).max)
+    np.minimum.at(group_first, roots[has_pixels], first_pixel[has_pixels])
+    groups = np.unique(roots)
+    order = np.argsort(group_first[groups], kind='stable')
+    group_label = np.zeros(total, dtype=np.int32)
+    group_label[groups[order]] = np.arange(1, groups.size + 1, dtype=np.int32)
+    node_label = group_label[roots] if total else np.zeros(0, dtype=np.int32)
+
+    n = groups.size
+    stats = {}
+    for field, reduce, initial in (('row_start', np.minimum, np.iinfo(np.int64).max),
+                                   ('col_start', np.minimum, np.iinfo(np.int64).max),
+                                   ('row_end', np.maximum, -1), ('col_end', np.maximum, -1)):
+        values = np.full(n + 1, initial, dtype=np.int64)
+        reduce.at(values, node_label[has_pixels], gather(field)[has_pixels])
+        stats[field] = values
+    for field in ('area', 'row_sums', 'col_sums'):
+        stats[field] = np.bincount(node_label, weights=gather(field), minlength=n + 1)
+    lookups = [np.concatenate(([0], node_label[offsets[t]:offsets[t + 1]])).astype(np.int32)
+               for t in range(len(tiles))]
+    return lookups, stats
+
+
+# -- driver ---------------------------------------------------------------------
+
+def _map(executor, function, *iterables):
+    if executor is None:
+        return list(map(function, *iterables))
+    return list(executor.map(function, *iterables))
+
+
+def analyse(grid, workers=None, tile_rows=None, window=WINDOW_ROWS, symmetry=True, blank_max=BLANK_MAX):
+    """
+    Sections, components, figure and (optionally) mirror
+    symmetry of a grid, computed tile by tile on `workers` processes
+    (default: CPU count; 1 runs in-process). Returns a TiledAnalysis.
+    """
+    workers = workers or os.cpu_count() or 1
+    rows, cols = grid.shape
+    window = max(1, min(window, rows))
+    bounds = tile_bounds(rows, workers, tile_rows)
+    with SharedArrays() as shared:
+        packed = shared.create('grid', (rows, (cols + 7) // 8), np.uint8)
+        source = grid if grid.row_bytes is not None else grid.row_aligned()
+        packed[:] = source.packed_rows
+        labels = shared.create('labels', (rows, cols), np.int32)
+        if symmetry:
+            mismatches = shared.create('mismatches', (rows, max(0, 2 * cols - 1)), np.int64)
+            windows = shared.create('windows', (rows - window + 1, max(0, 2 * cols - 1)), np.int64)
+
+        if workers == 1:
+            _arrays.update(shared.arrays)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=attach_arrays,
+                                           initargs=(shared.specs,))
+        try:
+            starts, stops = zip(*bounds) if bounds else ((), ())
+            n = len(bounds)
+            tiles = _map(executor, analyse_tile, starts, stops, [cols] * n, [window] * n,
+                         [blank_max] * n, [symmetry] * n)
+            lookups, stats = merge_components(tiles, labels)
+            matches = _map(executor, relabel_tile, starts, stops, lookups,
+                           [stats['col_start'][lookup] for lookup in lookups],
+                           [stats['col_end'][lookup] for lookup in lookups])
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            _arrays.clear()
+
+        symmetric = np.zeros(len(stats['area']))
+        for lookup, counts in zip(lookups, matches):
+            np.add.at(symmetric, lookup, counts)
+        area = stats['area']
+        components = [Component(k, int(stats['row_start'][k]), int(stats['row_end'][k]),
+                                int(stats['col_start'][k]), int(stats['col_end'][k]), int(area[k]),
+                                float(stats['row_sums'][k] / area[k]), float(stats['col_sums'][k] / area[k]),
+                                float(symmetric[k] / area[k]))
+                      for k in range(1, len(area))]
+
+        row_counts = np.concatenate([tile.row_counts for tile in tiles]) if tiles else np.zeros(0, np.int64)
+        col_counts = sum((tile.col_counts for tile in tiles), np.zeros(cols, dtype=np.int64))
+        bands = merge_bands(tiles)
+        layout = layout_from_profiles(row_counts, col_counts,
+                                      lambda start, end: blocks_from_columns(start, end, bands[start, end],
+                                                                             blank_max),
+                                      blank_max=blank_max)
+        return TiledAnalysis(layout, labels.copy(), components, find_figure(components),
+                             mismatches.copy() if symmetry else None,
+                             windows.copy() if symmetry else None, len(bounds))
+
+
+def check(grid, result):
+    """True when a TiledAnalysis equals the single-process results."""
+    layout = find_layout(grid)
+    labels, components = find_components(grid)
+    same_layout = all(np.array_equal(a, b) if isinstance(a, np.ndarray) else a == b
+                      for a, b in zip(result.layout, layout))
+    same = (same_layout and np.array_equal(result.labels, labels) and result.components == components
+            and result.figure == find_figure(components))
+    if result.row_mismatches is not None:
+        mismatches = mirror_mismatches(grid.to_array())
+        same = (same and np.array_equal(result.row_mismatches, mismatches)
+                and np.array_equal(result.window_mismatches,
+                                   window_mismatches(mismatches, min(WINDOW_ROWS, grid.rows))))
+    return same
+
+
+def scaled(grid, factor):
+    """The grid with every bit blown up to a factor × factor square."""
+    bits = grid.to_array().repeat(factor, axis=0).repeat(factor, axis=1)
+    return BitGrid.from_bits(bits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse a large grid in parallel row tiles")
+    parser.add_argument('-f', '--file', default=MESSAGE_FILE, help=f"Message file (default: {MESSAGE_FILE})")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Worker processes (default: CPU count; 1 runs in-process)")
+    parser.add_argument('--tile-rows', type=int, default=None,
+                        help=f"Rows per tile (default: {TILES_PER_WORKER} tiles per worker, "
+                             f"at least {MIN_TILE_ROWS} rows)")
+    parser.add_argument('--scale', type=int, default=1,
+                        help="Blow every bit up to an N × N square first, for a large test grid")
+    parser.add_argument('--no-symmetry', action='store_true', help="Skip the mirror-symmetry maps")
+    parser.add_argument('--verify', action='store_true', help="Compare with the single-process analysis")
+    args = parser.parse_args()
+
+    grid = load_grid(args.file)
+    if args.scale > 1:
+        grid = scaled(grid, args.scale)
+    started = time.perf_counter()
+    result = analyse(grid, args.workers, args.tile_rows, symmetry=not args.no_symmetry)
+    elapsed = time.perf_counter() - started
+    layout = result.layout
+    print(f"{grid.rows}×{grid.cols} grid in {result.tiles} tiles on "
+          f"{args.workers or os.cpu_count()} worker(s): {elapsed:.3f} s")
+    print(f"  {len(layout.bands)} bands, {len(layout.bars)} bars, {len(layout.blocks)} blocks, "
+          f"{len(result.components)} components")
+    if result.figure:
+        f = result.figure
+        print(f"  figure: rows {f.row_start}-{f.row_end}, columns {f.col_start}-{f.col_end}, "
+              f"symmetry {f.symmetry:.2f}")
+    if args.verify:
+        started = time.perf_counter()
+        same = check(grid, result)
+        print(f"  matches the single-process analysis: {same} "
+              f"({time.perf_counter() - started:.3f} s to recompute)")
+        return 0 if same else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Interactive curses viewer for large messages.
+Only the part of the grid on screen is ever rendered: a frame reads just
+the visible rows and byte columns of the packed grid (or of one pyramid
+level) and draws them with the renderer's half-block or braille modes, so
+the time per frame depends on the terminal size, not on the message size.
+
+Zooming out reads a mip pyramid: level k pools every 2^k × 2^k square of
+bits into one cell, either by OR (any bit set; exact from level k - 1,
+kept packed 8 cells per byte) or by majority (at least half set; kept as
+per-cell popcounts). A level is built once from the level below, block by
+block, the first time it is shown for a shape and pooling.
+
+Keys:
+  arrows / hjkl   pan one character        PgUp / PgDn   pan one screen
+  + / -           zoom in / out            f             fit the grid
+  w / W           next / previous width    p             OR / majority pooling
+  m               cycle half / braille / full            g / G  top / bottom
+  q               quit
+
+Usage:
+    python3 viewer.py huge.arcb
+    python3 -m arecibo view arecibo-message.txt --mode braille
+    python3 viewer.py huge.arcb --bench 200     # frame times without a terminal
+"""
+
+import argparse
+import curses
+import locale
+import sys
+import time
+
+import numpy as np
+
+from get_dimensions import candidate_dimensions
+from grid import MESSAGE_FILE, BitGrid, load_grid
+from render import CELL_SHAPE, MODES, render_lines
+
+POOLINGS = ('or', 'majority')
+
+# Rows of level k - 1 pooled per step while a level is built
+BUILD_ROWS = 1 << 12
+
+# Lines kept free below the grid for the status line
+STATUS_LINES = 1
+
+
+class Pyramid:
+    """
+    Pooled levels of one grid shape. Level 0 is the row-aligned grid itself;
+    level k has ceil(rows / 2^k) × ceil(cols / 2^k) cells.
+    """
+
+    def __init__(self, grid, pooling='or'):
+        if pooling not in POOLINGS:
+            raise ValueError(f"Unknown pooling: {pooling} (expected {', '.join(POOLINGS)})")
+        self.grid = grid if grid.row_bytes is not None else grid.row_aligned()
+        self.pooling = pooling
+        self.levels = {}
+        self.build_seconds = 0.0
+        self.top_level = max(0, (max(grid.rows, grid.cols) - 1).bit_length())
+
+    def shape(self, level):
+        size = 1 << level
+        return -(-self.grid.rows // size), -(-self.grid.cols // size)
+
+    def _build(self, level):
+        """Pool level - 1 into level, BUILD_ROWS input rows at a time."""
+        started, built = time.perf_counter(), self.build_seconds
+        rows, cols = self.shape(level)
+        below_rows, below_cols = self.shape(level - 1)
+        counts = self.pooling == 'majority'
+        if counts:
+            data = np.empty((rows, cols), dtype=np.min_scalar_type(4 ** level))
+        else:
+            data = np.empty((rows, (cols + 7) // 8), dtype=np.uint8)
+        for start in range(0, below_rows, BUILD_ROWS):
+            stop = min(below_rows, start + BUILD_ROWS)
+            block = self._values(level - 1, start, stop, 0, below_cols)
+            block = np.pad(block, ((0, (stop - start) % 2), (0, below_cols % 2)))
+            quads = block.reshape(block.shape[0] // 2, 2, cols, 2)
+            if counts:
+                data[start // 2:start // 2 + quads.shape[0]] = quads.sum(axis=(1, 3), dtype=data.dtype)
+            else:
+                data[start // 2:start // 2 + quads.shape[0]] = np.packbits(quads.max(axis=(1, 3)), axis=1)
+        self.levels[level] = data
+        # Includes the levels below that were built on the way
+        self.build_seconds = built + time.perf_counter() - started
+
+    def _values(self, level, row_start, row_stop, col_start, col_stop):
+        """Cells of a level as stored: bits for level 0 and OR levels, popcounts for majority levels."""
+        if level == 0:
+            return self.grid.region(row_start, row_stop, col_start, col_stop)
+        if level not in self.levels:
+            self._build(level)
+        data = self.levels[level]
+        if self.pooling == 'majority':
+            return data[row_start:row_stop, col_start:col_stop]
+        first_byte = col_start // 8
+        bits = np.unpackbits(data[row_start:row_stop, first_byte:(col_stop + 7) // 8], axis=1)
+        offset = col_start - first_byte * 8
+        return bits[:, offset:offset + max(0, col_stop - col_start)]
+
+    def cells(self, level, row_start, row_stop, col_start, col_stop):
+        """0/1 cells of a level over the given range, clipped to the level's shape."""
+        rows, cols = self.shape(level)
+        row_stop, col_stop = min(row_stop, rows), min(col_stop, cols)
+        if row_stop <= row_start or col_stop <= col_start:
+            return np.zeros((max(0, row_stop - row_start), max(0, col_stop - col_start)), dtype=np.uint8)
+        values = self._values(level, row_start, row_stop, col_start, col_stop)
+        if self.pooling == 'majority' and level > 0:
+            return (values.astype(np.int64) * 2 >= 4 ** level).astype(np.uint8)
+        return values
+
+
+class Viewer:
+    """Viewport state and frame rendering, independent of curses."""
+
+    def __init__(self, grid, mode='half', pooling='or'):
+        self.bits = grid
+        self.candidates = [c for c in candidate_dimensions(len(grid)) if c.rows > 1 and c.cols > 1] \
+            or list(candidate_dimensions(len(grid)))
+        shape = grid.shape
+        self.index = next((i for i, c in enumerate(self.candidates) if (c.rows, c.cols) == shape), 0)
+        self.mode = mode
+        self.pooling = pooling
+        self.pyramids = {}
+        self.level = 0
+        self.top = 0
+        self.left = 0
+        self.frame_ms = 0.0
+
+    @property
+    def shape(self):
+        candidate = self.candidates[self.index]
+        return candidate.rows, candidate.cols
+
+    def pyramid(self):
+        """The pyramid of the current shape and pooling (built level by level on demand)."""
+        key = (self.shape, self.pooling)
+        if key not in self.pyramids:
+            grid = self.bits if self.bits.shape == self.shape else self.bits.with_shape(*self.shape)
+            # Keep the pyramids of one shape at a time: other shapes are rebuilt when revisited
+            self.pyramids = {k: p for k, p in self.pyramids.items() if k[0] == self.shape}
+            self.pyramids[key] = Pyramid(grid, self.pooling)
+        return self.pyramids[key]
+
+    # -- geometry ---------------------------------------------------------
+
+    def _label_width(self):
+        return len(str(max(0, self.shape[0] - 1)))
+
+    def view_cells(self, height, width):
+        """Rows and columns of level cells that fit on a height × width screen."""
+        cell_rows, cell_cols = CELL_SHAPE[self.mode]
+        text_cols = max(1, width - self._label_width() - 3)
+        return max(1, height - STATUS_LINES) * cell_rows, text_cols * cell_cols
+
+    def clamp(self):
+        rows, cols = self.shape
+        self.level = max(0, min(self.level, self.pyramid().top_level))
+        self.top = max(0, min(self.top, rows - 1))
+        self.left = max(0, min(self.left, cols - 1))
+
+    def pan(self, d_rows, d_cols, height, width, page=False):
+        """Move by whole characters (or whole screens when `page`)."""
+        cell_rows, cell_cols = CELL_SHAPE[self.mode]
+        if page:
+            view_rows, view_cols = self.view_cells(height, width)
+            step_rows, step_cols = view_rows - cell_rows, view_cols - cell_cols
+        else:
+            step_rows, step_cols = cell_rows, cell_cols
+        self.top += d_rows * (step_rows << self.level)
+        self.left += d_cols * (step_cols << self.level)
+        self.clamp()
+
+    def zoom(self, delta, height, width):
+        """Change the pyramid level, keeping the centre of the view in place."""
+        view_rows, view_cols = self.view_cells(height, width)
+        rows, cols = self.shape
+        # Centre of the part of the grid on screen
+        centre_row = (self.top + min(rows, self.top + (view_rows << self.level))) // 2
+        centre_col = (self.left + min(cols, self.left + (view_cols << self.level))) // 2
+        self.level = max(0, min(self.level + delta, self.pyramid().top_level))
+        self.top = centre_row - (view_rows << self.level) // 2
+        self.left = centre_col - (view_cols << self.level) // 2
+        self.clamp()
+
+    def fit(self, height, width):
+        """The finest level at which the whole grid fits on screen."""
+        view_rows, view_cols = self.view_cells(height, width)
+        rows, cols = self.shape
+        self.level = 0
+        while (-(-rows >> self.level) > view_rows or -(-cols >> self.level) > view_cols) \
+                and self.level < self.pyramid().top_level:
+            self.level += 1
+        self.top = self.left = 0
+
+    def switch_width(self, step, height, width):
+        """Show the grid at the next (or previous) candidate shape."""
+        self.index = (self.index + step) % len(self.candidates)
+        self.top = self.left = 0
+        self.clamp()
+
+    # -- rendering --------------------------------------------------------
+
+    def render(self, height, width):
+        """The lines of one frame: the visible cells plus a status line."""
+        started, built = time.perf_counter(), self.pyramid().build_seconds
+        rows, cols = self.shape
+        cell_rows = CELL_SHAPE[self.mode][0]
+        view_rows, view_cols = self.view_cells(height, width)
+        top, left = self.top >> self.level, self.left >> self.level
+        cells = self.pyramid().cells(self.level, top, top + view_rows, left, left + view_cols)
+        lines = render_lines(BitGrid.from_bits(cells), self.mode) if cells.size else []
+        label_width = self._label_width()
+        out = [f"{(top + i * cell_rows) << self.level:{label_width}d}: {line}" for i, line in enumerate(lines)]
+        out += [''] * (max(1, height - STATUS_LINES) - len(out))
+        # Building a pyramid level is a one-off cost, not part of the frame
+        built = self.pyramid().build_seconds - built
+        self.frame_ms = (time.perf_counter() - started - built) * 1000
+        scale = f"1:{1 << self.level} {self.pooling}" if self.level else "1:1"
+        timing = f"{self.frame_ms:.1f} ms" + (f" (+{built:.2f} s building)" if built else "")
+        out.append(f"{rows}×{cols} (width {self.index + 1}/{len(self.candidates)})  zoom {scale}  "
+                   f"row {self.top} col {self.left}  {self.mode}  {timing}  "
+                   f"[arrows pan, +/- zoom, w width, p pooling, m mode, q quit]")
+        return [line[:max(0, width - 1)] for line in out]
+
+
+# -- curses front end ---------------------------------------------------------
+
+def _loop(screen, viewer):
+    curses.curs_set(0)
+    screen.keypad(True)
+    height, width = screen.getmaxyx()
+    viewer.fit(height, width)
+    while True:
+        height, width = screen.getmaxyx()
+        viewer.clamp()
+        screen.erase()
+        for y, line in enumerate(viewer.render(height, width)[:height]):
+            try:
+                screen.addstr(y, 0, line, curses.A_REVERSE if y == height - 1 else curses.A_NORMAL)
+            except curses.error:
+                pass  # writing the bottom-right cell moves the cursor off screen
+        screen.refresh()
+        key = screen.getch()
+        if key in (ord('q'), 27):
+            return
+        elif key in (curses.KEY_UP, ord('k')):
+            viewer.pan(-1, 0, height, width)
+        elif key in (curses.KEY_DOWN, ord('j')):
+            viewer.pan(1, 0, height, width)
+        elif key in (curses.KEY_LEFT, ord('h')):
+            viewer.pan(0, -1, height, width)
+        elif key in (curses.KEY_RIGHT, ord('l')):
+            viewer.pan(0, 1, height, width)
+        elif key == curses.KEY_PPAGE:
+            viewer.pan(-1, 0, height, width, page=True)
+        elif key in (curses.KEY_NPAGE, ord(' ')):
+            viewer.pan(1, 0, height, width, page=True)
+        elif key in (ord('+'), ord('=')):
+            viewer.zoom(-1, height, width)
+        elif key in (ord('-'), ord('_')):
+            viewer.zoom(1, height, width)
+        elif key == ord('f'):
+            viewer.fit(height, width)
+        elif key in (ord('w'), ord('W')):
+            viewer.switch_width(1 if key == ord('w') else -1, height, width)
+            viewer.fit(height, width)
+        elif key == ord('p'):
+            viewer.pooling = POOLINGS[(POOLINGS.index(viewer.pooling) + 1) % len(POOLINGS)]
+        elif key == ord('m'):
+            viewer.mode = MODES[(MODES.index(viewer.mode) + 1) % len(MODES)]
+        elif key == ord('g'):
+            viewer.top = 0
+        elif key == ord('G'):
+            viewer.top = viewer.shape[0] - (viewer.view_cells(height, width)[0] << viewer.level)
+
+
+def view(grid, mode='half', pooling='or'):
+    """Run the interactive viewer until the user quits."""
+    locale.setlocale(locale.LC_ALL, '')
+    curses.wrapper(_loop, Viewer(grid, mode, pooling))
+
+
+def bench(grid, frames, height=50, width=160, mode='half', pooling='or', seed=0):
+    """Render frames at random positions and zoom levels; returns the frame times in ms."""
+    rng = np.random.default_rng(seed)
+    viewer = Viewer(grid, mode, pooling)
+    top_level = viewer.pyramid().top_level
+    started = time.perf_counter()
+    for level in range(1, top_level + 1):
+        viewer.pyramid().cells(level, 0, 1, 0, 1)
+    build = time.perf_counter() - started
+    times = []
+    for _ in range(frames):
+        viewer.level = int(rng.integers(0, top_level + 1))
+        viewer.top = int(rng.integers(0, grid.rows))
+        viewer.left = int(rng.integers(0, grid.cols))
+        viewer.render(height, width)
+        times.append(viewer.frame_ms)
+    return build, np.array(times)
+
+
+def frame_count(text):
+    """argparse type for --bench: a positive number of frames."""
+    try:
+        frames = int(text)
+    except ValueError:
+        frames = 0
+    if frames < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive number of frames, got {text!r}")
+    return frames
+
+
+def add_view_arguments(parser):
+    parser.add_argument('input', nargs='?', default=MESSAGE_FILE,
+                        help=f"Message file (.txt or .arcb, default: {MESSAGE_FILE})")
+    parser.add_argument('--mode', choices=MODES, default='half', help="Rendering mode (default: half)")
+    parser.add_argument('--pooling', choices=POOLINGS, default='or',
+                        help="How zoomed-out cells combine bits (default: or)")
+    parser.add_argument('--bench', type=frame_count, metavar='N', default=None,
+                        help="Time N frames at random positions instead of opening the viewer")
+
+
+def run_view(args):
+    """Open the viewer (or time frames) for parsed command-line arguments; returns the exit code."""
+    try:
+        grid = load_grid(args.input)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.bench is not None:
+        build, times = bench(grid, args.bench, mode=args.mode, pooling=args.pooling)
+        print(f"{grid.rows}×{grid.cols} grid: pyramid built in {build:.3f} s; {len(times)} frames, "
+              f"median {np.median(times):.2f} ms, max {times.max():.2f} ms")
+        return 0
+    if not sys.stdout.isatty():
+        print("Error: the viewer needs a terminal (use --bench to time frames)", file=sys.stderr)
+        return 1
+    view(grid, args.mode, args.pooling)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Browse a large message in an interactive viewport")
+    add_view_arguments(parser)
+    return run_view(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())